@@ -0,0 +1,464 @@
+"""
+Server-side aggregation over the actual-reading chains.
+
+Statistics are computed with SQL aggregates per inspection type and merged in
+Python from their parts (count, mean, population variance, min, max), so the
+database never ships individual readings for the summary numbers.
+"""
+import math
+from datetime import timedelta
+
+from django.db.models import Avg, Case, Count, F, FloatField, IntegerField, Max, Min, Q, Sum, Value, Variance, When
+from django.db.models.functions import Floor, Trunc
+from django.utils import timezone
+
+from .readings import SCHEDULE, actual_readings_queryset, chain_models, schedule_lookups
+
+DEFAULT_SERIES_POINTS = 500
+MAX_SERIES_POINTS = 5000
+DEFAULT_HISTOGRAM_BINS = 10
+MAX_HISTOGRAM_BINS = 200
+
+# Spec-relative buckets: below LSL, five equal slices of LSL..USL, above USL
+SPEC_BUCKET_LABELS = ("<LSL", "0-20%", "20-40%", "40-60%", "60-80%", "80-100%", ">USL")
+
+# Trunc kind -> approximate width, smallest first
+TIME_BUCKETS = (
+    ("minute", timedelta(minutes=1)),
+    ("hour", timedelta(hours=1)),
+    ("day", timedelta(days=1)),
+    ("week", timedelta(weeks=1)),
+    ("month", timedelta(days=31)),
+    ("year", timedelta(days=366)),
+)
+
+
+def out_of_spec_q():
+    """Readings below their schedule's LSL or above its USL."""
+    return Q(r_value__lt=F(f"{SCHEDULE}lsl")) | Q(r_value__gt=F(f"{SCHEDULE}usl"))
+
+
+def analytics_querysets(inspection_types, filters, days=None):
+    """Per-type querysets of readings with a value, limited to the last ``days``."""
+    since = timezone.now() - timedelta(days=days) if days else None
+    querysets = {}
+    for inspection_type in inspection_types:
+        qs = actual_readings_queryset(inspection_type, filters).filter(r_value__isnull=False)
+        if since:
+            qs = qs.filter(created_at__gte=since)
+        querysets[inspection_type] = qs.order_by()
+    return querysets
+
+
+def merge_moments(parts):
+    """
+    Combine per-type aggregate rows into count/mean/min/max/stddev.
+
+    Each part carries its own count, mean and population variance; they are
+    pooled with the parallel-variance formula, which stays accurate when the
+    spread is tiny compared to the mean (unlike a sum of squares).
+    """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for p in parts:
+        n = p["count"] or 0
+        if not n:
+            continue
+        delta = p["mean"] - mean
+        total = count + n
+        mean += delta * n / total
+        m2 += (p["variance"] or 0.0) * n + delta * delta * count * n / total
+        count = total
+    if not count:
+        return None
+    return {
+        "count": count,
+        "mean": mean,
+        "min": min(p["min"] for p in parts if p["min"] is not None),
+        "max": max(p["max"] for p in parts if p["max"] is not None),
+        "stddev": math.sqrt(m2 / (count - 1)) if count > 1 else None,
+    }
+
+
+def capability(mean, stddev, lsl, usl):
+    """Cp and Cpk for the given spec limits, ``None`` where undefined."""
+    if not stddev:
+        return None, None
+    cp = None
+    if lsl is not None and usl is not None:
+        cp = (usl - lsl) / (6 * stddev)
+    sides = []
+    if usl is not None:
+        sides.append((usl - mean) / (3 * stddev))
+    if lsl is not None:
+        sides.append((mean - lsl) / (3 * stddev))
+    cpk = min(sides) if sides else None
+    return cp, cpk
+
+
+# Schedule columns behind the spec payload, and the payload when no schedule matches
+SPEC_FIELDS = ("lsl", "usl", "target_value", "item_code__unit")
+NO_SPEC = {"lsl": None, "usl": None, "target": None, "unit": ""}
+
+
+def spec_row(row, prefix=""):
+    """The spec payload from a ``values()`` row of ``SPEC_FIELDS`` (behind ``prefix``)."""
+    return {
+        "lsl": row[f"{prefix}lsl"],
+        "usl": row[f"{prefix}usl"],
+        "target": row[f"{prefix}target_value"],
+        "unit": row[f"{prefix}item_code__unit"] or "",
+    }
+
+
+def spec_for(querysets):
+    """Spec limits of the first matching schedule, mirroring the run chart's reference lines."""
+    for qs in querysets.values():
+        spec = qs.order_by(f"{SCHEDULE}id").values(*(f"{SCHEDULE}{name}" for name in SPEC_FIELDS)).first()
+        if spec:
+            return spec_row(spec, SCHEDULE)
+    return dict(NO_SPEC)
+
+
+def schedule_spec_for(inspection_types, filters):
+    """
+    Spec limits of the first active schedule matching ``filters``, read from
+    the schedule tables alone, for callers that never touch the readings.
+    """
+    for inspection_type in inspection_types:
+        schedule_model, _, _ = chain_models(inspection_type)
+        spec = (
+            schedule_model.objects.filter(**schedule_lookups(inspection_type, filters))
+            .order_by("id")
+            .values(*SPEC_FIELDS)
+            .first()
+        )
+        if spec:
+            return spec_row(spec)
+    return dict(NO_SPEC)
+
+
+def summary_stats(querysets, spec):
+    """Count, mean, min, max, stddev, out-of-spec count and Cp/Cpk in one query per type."""
+    parts = [
+        qs.aggregate(
+            count=Count("r_value"),
+            mean=Avg("r_value"),
+            variance=Variance("r_value"),
+            min=Min("r_value"),
+            max=Max("r_value"),
+            out_of_spec=Count("id", filter=out_of_spec_q()),
+            first_at=Min("created_at"),
+            last_at=Max("created_at"),
+        )
+        for qs in querysets.values()
+    ]
+    moments = merge_moments(parts)
+    if moments is None:
+        return None
+    cp, cpk = capability(moments["mean"], moments["stddev"], spec["lsl"], spec["usl"])
+    return {
+        **moments,
+        "out_of_spec": sum(p["out_of_spec"] for p in parts),
+        "cp": cp,
+        "cpk": cpk,
+        "first_at": min(p["first_at"] for p in parts if p["first_at"]),
+        "last_at": max(p["last_at"] for p in parts if p["last_at"]),
+    }
+
+
+def raw_series(querysets):
+    """Every (timestamp, value) pair across the types, oldest first."""
+    first, *rest = [qs.values_list("created_at", "r_value") for qs in querysets.values()]
+    rows = first.union(*rest, all=True) if rest else first
+    return list(rows.order_by("created_at"))
+
+
+def pick_time_bucket(first_at, last_at, points):
+    """Smallest ``Trunc`` kind that keeps the series within ``points`` buckets."""
+    span = last_at - first_at
+    for kind, width in TIME_BUCKETS:
+        if span / width <= points:
+            return kind
+    return TIME_BUCKETS[-1][0]
+
+
+def bucketed_series(querysets, kind):
+    """Mean/min/max/count per time bucket, grouped in the database."""
+    buckets = {}
+    for qs in querysets.values():
+        rows = (
+            qs.annotate(bucket=Trunc("created_at", kind))
+            .values("bucket")
+            .annotate(count=Count("r_value"), total=Sum("r_value"), min=Min("r_value"), max=Max("r_value"))
+        )
+        for row in rows:
+            merged = buckets.setdefault(row["bucket"], {"count": 0, "total": 0.0, "min": row["min"], "max": row["max"]})
+            merged["count"] += row["count"]
+            merged["total"] += row["total"]
+            merged["min"] = min(merged["min"], row["min"])
+            merged["max"] = max(merged["max"], row["max"])
+    return [
+        {
+            "timestamp": bucket.isoformat(),
+            "value": b["total"] / b["count"],
+            "min": b["min"],
+            "max": b["max"],
+            "count": b["count"],
+        }
+        for bucket, b in sorted(buckets.items())
+    ]
+
+
+def lttb(rows, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of ``(timestamp, value)`` rows.
+
+    Keeps the first and last points and, for each bucket in between, the point
+    forming the largest triangle with the previously kept point and the mean
+    of the next bucket, which preserves the visual shape of the run chart.
+    """
+    n = len(rows)
+    if threshold >= n or threshold < 3:
+        return rows
+    xs = [ts.timestamp() for ts, _ in rows]
+    ys = [value for _, value in rows]
+    sampled = [rows[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(math.floor((i + 1) * every)) + 1
+        end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = sum(xs[start:end]) / (end - start)
+        avg_y = sum(ys[start:end]) / (end - start)
+
+        range_start = int(math.floor(i * every)) + 1
+        range_end = int(math.floor((i + 1) * every)) + 1
+        ax, ay = xs[a], ys[a]
+        best_area = -1.0
+        best = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(rows[best])
+        a = best
+    sampled.append(rows[-1])
+    return sampled
+
+
+def run_chart_series(querysets, stats, points, method):
+    """
+    Run-chart points, downsampled to at most ``points`` entries.
+
+    ``method`` is ``time`` (database time buckets) or ``lttb``. Series short
+    enough to fit are returned unsampled either way.
+    """
+    if stats["count"] <= points:
+        rows = raw_series(querysets)
+        return [{"timestamp": ts.isoformat(), "value": value} for ts, value in rows], {"method": "none"}
+    if method == "lttb":
+        rows = lttb(raw_series(querysets), points)
+        return [{"timestamp": ts.isoformat(), "value": value} for ts, value in rows], {"method": "lttb"}
+    kind = pick_time_bucket(stats["first_at"], stats["last_at"], points)
+    return bucketed_series(querysets, kind), {"method": "time", "bucket": kind}
+
+
+def parameter_series_and_stats(inspection_types, filters, days=None, points=DEFAULT_SERIES_POINTS, method="time"):
+    """Spec, summary statistics and a downsampled run chart, or ``None`` without readings."""
+    querysets = analytics_querysets(inspection_types, filters, days)
+    spec = spec_for(querysets)
+    stats = summary_stats(querysets, spec) if querysets else None
+    if stats is None:
+        return None
+    series, downsample = run_chart_series(querysets, stats, points, method)
+    downsample["points"] = len(series)
+    first_at, last_at = stats.pop("first_at"), stats.pop("last_at")
+    return {
+        "spec": spec,
+        "stats": stats,
+        "series": series,
+        "downsample": downsample,
+        "range": {"start": first_at.isoformat(), "end": last_at.isoformat()},
+    }
+
+
+def distinct_operations(querysets):
+    """Distinct (operation_id, operation_name) pairs across the types, via DISTINCT."""
+    seen = {}
+    for qs in querysets.values():
+        rows = qs.values_list(
+            f"{SCHEDULE}operation__operation_id", f"{SCHEDULE}operation__operation_name"
+        ).distinct()
+        for operation_id, operation_name in rows:
+            if operation_name:
+                seen.setdefault((operation_id, operation_name), None)
+    return [
+        {"operation_id": operation_id, "operation_name": operation_name}
+        for operation_id, operation_name in sorted(seen, key=lambda k: (k[1], k[0] or ""))
+    ]
+
+
+def parameter_ranges(querysets):
+    """Per-parameter count/min/max across the types, grouped in the database."""
+    ranges = {}
+    for qs in querysets.values():
+        rows = (
+            qs.values(f"{SCHEDULE}inspection_parameter_name")
+            .annotate(count=Count("r_value"), min=Min("r_value"), max=Max("r_value"))
+        )
+        for row in rows:
+            name = row[f"{SCHEDULE}inspection_parameter_name"]
+            if name is None:
+                continue
+            merged = ranges.setdefault(name, {"count": 0, "min": row["min"], "max": row["max"]})
+            merged["count"] += row["count"]
+            merged["min"] = min(merged["min"], row["min"])
+            merged["max"] = max(merged["max"], row["max"])
+    return ranges
+
+
+def bin_width(lo, hi, bins):
+    # A constant parameter still gets one populated bin of unit width
+    return (hi - lo) / bins if hi > lo else 1.0
+
+
+def histogram_counts(querysets, ranges, bins):
+    """
+    Per (parameter, bin) reading and out-of-spec counts.
+
+    Every parameter has its own range, so the bin index is a CASE over the
+    parameter names; one grouped query per type covers all parameters.
+    """
+    parameter = f"{SCHEDULE}inspection_parameter_name"
+    bin_index = Case(
+        *[
+            When(
+                **{parameter: name},
+                then=Floor(
+                    (F("r_value") - Value(r["min"], output_field=FloatField()))
+                    / Value(bin_width(r["min"], r["max"], bins), output_field=FloatField())
+                ),
+            )
+            for name, r in ranges.items()
+        ],
+        output_field=FloatField(),
+    )
+    counts = {}
+    for qs in querysets.values():
+        rows = (
+            qs.filter(**{f"{parameter}__in": list(ranges)})
+            .annotate(bin=bin_index)
+            .values(parameter, "bin")
+            .annotate(count=Count("id"), out_of_spec=Count("id", filter=out_of_spec_q()))
+        )
+        for row in rows:
+            # The maximum lands exactly on the upper edge; fold it into the last bin
+            index = min(max(int(row["bin"]), 0), bins - 1)
+            key = (row[parameter], index)
+            merged = counts.setdefault(key, [0, 0])
+            merged[0] += row["count"]
+            merged[1] += row["out_of_spec"]
+    return counts
+
+
+def parameter_distribution(inspection_types, filters, days=None, bins=DEFAULT_HISTOGRAM_BINS):
+    """Distinct operations and parameters plus a fixed-bin histogram per parameter."""
+    querysets = analytics_querysets(inspection_types, filters, days)
+    if not querysets:
+        return None
+    ranges = parameter_ranges(querysets)
+    if not ranges:
+        return None
+    counts = histogram_counts(querysets, ranges, bins)
+    histograms = []
+    for name in sorted(ranges):
+        r = ranges[name]
+        width = bin_width(r["min"], r["max"], bins)
+        histograms.append({
+            "parameter": name,
+            "count": r["count"],
+            "min": r["min"],
+            "max": r["max"],
+            "bin_width": width,
+            "bins": [
+                {
+                    "lower": r["min"] + i * width,
+                    "upper": r["min"] + (i + 1) * width,
+                    "count": counts.get((name, i), (0, 0))[0],
+                    "out_of_spec": counts.get((name, i), (0, 0))[1],
+                }
+                for i in range(bins)
+            ],
+        })
+    return {
+        "operations": distinct_operations(querysets),
+        "parameters": sorted(ranges),
+        "histograms": histograms,
+    }
+
+
+def spec_range(querysets, spec):
+    """
+    (lower, upper, derived): the spec limits, or the observed min/max when
+    a limit is missing or both are equal (min..min+1 for a constant series),
+    the same fallback as the chatbot's LSL/USL chart.
+    """
+    lsl, usl = spec["lsl"], spec["usl"]
+    if lsl is not None and usl is not None and usl != lsl:
+        return lsl, usl, False
+    parts = [qs.aggregate(min=Min("r_value"), max=Max("r_value")) for qs in querysets.values()]
+    lows = [p["min"] for p in parts if p["min"] is not None]
+    highs = [p["max"] for p in parts if p["max"] is not None]
+    if not lows:
+        return 0.0, 1.0, True
+    lower, upper = min(lows), max(highs)
+    return lower, (upper if upper != lower else lower + 1), True
+
+
+def spec_bucket_counts(querysets, lower, upper):
+    """
+    (counts per ``SPEC_BUCKET_LABELS`` entry, readings seen), one grouped
+    query per type. With ``upper < lower`` there is no in-spec span to
+    slice, so only the two out-of-range buckets are counted.
+    """
+    span = upper - lower
+    # Compared against the slice edges rather than floor((r - lower) / span * 5), which puts
+    # some readings exactly on an edge (e.g. 10.2 in 9..11) into the slice below it
+    edges = [lower + span * k / 5 for k in range(1, 5)] if span > 0 else []
+    bucket = Case(
+        When(r_value__lt=lower, then=Value(0)),
+        When(r_value__gt=upper, then=Value(6)),
+        *[When(r_value__lt=edge, then=Value(index)) for index, edge in enumerate(edges, 1)],
+        # A reading exactly at the upper limit falls in the last in-spec slice
+        default=Value(5) if edges else Value(None),
+        output_field=IntegerField(),
+    )
+    counts = [0] * len(SPEC_BUCKET_LABELS)
+    seen = 0
+    for qs in querysets.values():
+        for row in qs.annotate(bucket=bucket).values("bucket").annotate(count=Count("id")):
+            seen += row["count"]
+            if row["bucket"] is not None:
+                counts[row["bucket"]] += row["count"]
+    return counts, seen
+
+
+def lsl_usl_distribution(inspection_types, filters, days=None):
+    """Spec and counts of readings per spec-relative bucket, or ``None`` without readings."""
+    querysets = analytics_querysets(inspection_types, filters, days)
+    if not querysets:
+        return None
+    spec = spec_for(querysets)
+    lower, upper, derived = spec_range(querysets, spec)
+    counts, seen = spec_bucket_counts(querysets, lower, upper)
+    if not seen:
+        return None
+    return {
+        "spec": spec,
+        "range": {"lower": lower, "upper": upper, "derived": derived},
+        "buckets": [{"label": label, "count": count} for label, count in zip(SPEC_BUCKET_LABELS, counts)],
+        "count": sum(counts),
+    }
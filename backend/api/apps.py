@@ -5,4 +5,18 @@ class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
 
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .caching import MASTER_DATA_MODELS, invalidate_master_data
+        from .registry import REGISTRY_MODELS, invalidate_master_registry
+        from .spc import bump_spc_version, spc_models
 
+        for model in MASTER_DATA_MODELS:
+            post_save.connect(invalidate_master_data, sender=model, dispatch_uid=f"master-data-version-save-{model.__name__}")
+            post_delete.connect(invalidate_master_data, sender=model, dispatch_uid=f"master-data-version-delete-{model.__name__}")
+        for model in REGISTRY_MODELS:
+            post_save.connect(invalidate_master_registry, sender=model, dispatch_uid=f"master-registry-save-{model.__name__}")
+            post_delete.connect(invalidate_master_registry, sender=model, dispatch_uid=f"master-registry-delete-{model.__name__}")
+        for model in spc_models():
+            post_save.connect(bump_spc_version, sender=model, dispatch_uid=f"spc-version-save-{model.__name__}")
+            post_delete.connect(bump_spc_version, sender=model, dispatch_uid=f"spc-version-delete-{model.__name__}")
@@ -0,0 +1,183 @@
+"""
+Async versions of the chatbot read endpoints, for ASGI deployments.
+
+DRF's ``APIView`` has no async dispatch, so these are plain async Django
+views that return the same payloads (rendered with DRF's JSON encoder) and
+the same error shapes as their ``APIView`` counterparts in ``views.py``.
+``urls.py`` routes to them when ``ASYNC_READ_VIEWS`` is on, which
+``qchat.asgi`` enables by default.
+
+Queries that do not depend on each other are awaited together with
+``asyncio.gather``. Django 5.0 still runs async ORM calls on the request's
+single database thread, so those queries do not overlap on the database.
+What is gained is that a request waiting on PostgreSQL no longer holds a
+worker thread.
+"""
+import asyncio
+import json
+from functools import wraps
+
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+
+from .caching import acached_master_data, master_data_condition, readings_conditional
+from .models import (
+    MasterPlantmaster, MasterProductionplanner, MasterItemmaster,
+    MasterParameterlist, MasterOperationmaster,
+)
+from .export import aexport_chunks
+from .registry import amaster_registry
+from .readings import afetch_readings, afetch_reading_page, astream_readings, parse_inspection_types
+from .renderers import dumps, to_columnar
+from reporting.flat import FlatReadingsUnavailable, acheck_flat_readings, flat_ordered_readings
+from .views import (
+    DEFAULT_READINGS_PAGE_SIZE, MAX_READINGS_PAGE_SIZE, READING_SOURCES,
+    export_options, export_response, factory_sections, filtered_inspections, inspection_filter_row,
+    parse_positive_int, purchase_order_payload, reading_filters,
+)
+
+
+def json_response(request, data, status=200):
+    """Rendered like the DRF views, including ``?format=columnar``."""
+    if request.GET.get("format") == "columnar":
+        data = to_columnar(data)
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def async_api_view(*methods):
+    """
+    Method check, 404 handling and CSRF exemption for an async view,
+    answering with the same JSON bodies as ``APIView``.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in methods and not (request.method == "HEAD" and "GET" in methods):
+                response = json_response(request, {"detail": f'Method "{request.method}" not allowed.'}, status=405)
+                response["Allow"] = ", ".join(methods)
+                return response
+            try:
+                return await view(request, *args, **kwargs)
+            except Http404 as e:
+                return json_response(request, {"detail": str(e)}, status=404)
+        return csrf_exempt(inner)
+    return decorator
+
+
+async def alist(qs):
+    return [row async for row in qs]
+
+
+@async_api_view("GET")
+@master_data_condition
+async def initial_data(request):
+    async def build():
+        plants, items, parameters, operations = await asyncio.gather(
+            alist(MasterPlantmaster.objects.all().values("id", "plant_id", "plant_name")),
+            alist(MasterItemmaster.objects.all().values("id", "item_code", "item_description")),
+            alist(MasterParameterlist.objects.all().values("id", "inspection_parameter_id", "inspection_parameter")),
+            alist(MasterOperationmaster.objects.all().values("id", "operation_id", "operation_name")),
+        )
+        return {
+            "plants": plants,
+            "items": items,
+            "parameters": parameters,
+            "operations": operations,
+        }
+
+    return json_response(request, await acached_master_data(request, build))
+
+
+@async_api_view("GET")
+async def sections_by_factory(request, factory_id: str):
+    return json_response(request, {"sections": factory_sections(await amaster_registry(), factory_id)})
+
+
+@async_api_view("GET")
+async def purchase_order_status(request, po_id: str):
+    registry, po = await asyncio.gather(
+        amaster_registry(), aget_object_or_404(MasterProductionplanner, order_number=po_id)
+    )
+    return json_response(request, purchase_order_payload(registry, po))
+
+
+@async_api_view("POST")
+async def inspections_filter(request):
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError as e:
+            return json_response(request, {"detail": f"JSON parse error - {e}"}, status=400)
+    else:
+        data = request.POST
+    registry = await amaster_registry()
+    rows = await alist(filtered_inspections(registry, data))
+    return json_response(request, {"inspections": [inspection_filter_row(registry, row) for row in rows]})
+
+
+@async_api_view("GET")
+@readings_conditional
+async def actual_inspection_readings(request):
+    inspection_type = request.GET.get('inspection_type')
+    if not inspection_type:
+        return json_response(request, {"error": "inspection_type is required"}, status=400)
+
+    source = request.GET.get('source', 'readings')
+    if source not in READING_SOURCES:
+        return json_response(request, {"error": "source must be 'readings' or 'flat'"}, status=400)
+    rows, ordered = READING_SOURCES[source]
+    if source == 'flat':
+        try:
+            await acheck_flat_readings()
+        except FlatReadingsUnavailable as e:
+            return json_response(request, {"error": str(e)}, status=503)
+
+    filters = reading_filters(request.GET)
+    inspection_types = parse_inspection_types(inspection_type)
+
+    if request.GET.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        async def lines():
+            async for row in astream_readings(inspection_types, filters, ordered=ordered):
+                yield dumps(row) + b"\n"
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+    cursor = request.GET.get('cursor')
+    try:
+        page_size = parse_positive_int(
+            request.GET.get('page_size'), 'page_size',
+            DEFAULT_READINGS_PAGE_SIZE if cursor else None, MAX_READINGS_PAGE_SIZE,
+        )
+    except ValueError as e:
+        return json_response(request, {"error": str(e)}, status=400)
+
+    if page_size:
+        try:
+            results, next_cursor = await afetch_reading_page(inspection_types, filters, page_size, cursor, ordered=ordered)
+        except ValueError as e:
+            return json_response(request, {"error": str(e)}, status=400)
+        return json_response(request, {'readings': results, 'count': len(results), 'next_cursor': next_cursor})
+
+    results = await afetch_readings(inspection_types, filters, rows=rows)
+    return json_response(request, {'readings': results, 'count': len(results)})
+
+
+@async_api_view("GET")
+async def reading_export(request):
+    inspection_type = request.GET.get('inspection_type')
+    if not inspection_type:
+        return json_response(request, {"error": "inspection_type is required"}, status=400)
+
+    try:
+        output, ordered = export_options(request.GET)
+    except ValueError as e:
+        return json_response(request, {"error": str(e)}, status=400)
+    if ordered is flat_ordered_readings:
+        try:
+            await acheck_flat_readings()
+        except FlatReadingsUnavailable as e:
+            return json_response(request, {"error": str(e)}, status=503)
+
+    inspection_types = parse_inspection_types(inspection_type)
+    chunks = aexport_chunks(inspection_types, reading_filters(request.GET), output, ordered=ordered)
+    return export_response(chunks, inspection_types, output)
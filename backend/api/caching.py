@@ -0,0 +1,180 @@
+"""
+Versioned response cache for master data.
+
+Every cached master-data response is keyed on a single version number that
+is bumped once a transaction that saved or deleted a master-data row commits.
+Bumping earlier would let a concurrent request cache the old rows under the
+new version. Bumping the version orphans all older entries at once, so no
+per-endpoint invalidation is needed. The version is a millisecond timestamp,
+which doubles as ``Last-Modified``; the ETag adds a hash of the URL, since
+pages, ``fields=`` and formats of one endpoint are different representations.
+
+With the default local-memory cache the version is per process; point
+``REDIS_URL`` at a shared Redis so every worker sees the same version.
+
+Actual readings are not cached, but ``readings_conditional`` gives their
+endpoint an ETag built from ``readings_state``, so a revalidation is answered
+before the readings query runs.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from .models import (
+    MasterPlantmaster,
+    MasterBuildingsectionlab,
+    MasterItemmaster,
+    MasterOperationmaster,
+    MasterParameterlist,
+    MasterProductionplanner,
+    MasterInspectionschedule,
+    MasterFaiinspectionschedule,
+    MasterFaiitemmaster,
+    MasterFaioperationmaster,
+)
+from .readings import parse_inspection_types, readings_state
+
+VERSION_KEY = "master-data:version"
+
+# Models whose changes invalidate cached master data (readings are excluded on purpose)
+MASTER_DATA_MODELS = (
+    MasterPlantmaster,
+    MasterBuildingsectionlab,
+    MasterItemmaster,
+    MasterOperationmaster,
+    MasterParameterlist,
+    MasterProductionplanner,
+    MasterInspectionschedule,
+    MasterFaiinspectionschedule,
+    MasterFaiitemmaster,
+    MasterFaioperationmaster,
+)
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_master_data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _now_ms(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_master_data_version():
+    """Move every master-data response to a new version, e.g. after a bulk load that sent no signals."""
+    # Last-Modified has one-second resolution, so each bump lands in a later second
+    next_second = (get_master_data_version() // 1000 + 1) * 1000
+    cache.set(VERSION_KEY, max(_now_ms(), next_second), None)
+
+
+def invalidate_master_data(sender, using=None, **kwargs):
+    """Signal receiver: bump the master-data version once the change is committed."""
+    transaction.on_commit(bump_master_data_version, using=using)
+
+
+def master_data_etag(request, *args, **kwargs):
+    # The negotiated format depends on Accept as well as the URL
+    representation = f"{request.get_full_path()} {request.META.get('HTTP_ACCEPT', '')}"
+    digest = hashlib.md5(representation.encode(), usedforsecurity=False).hexdigest()[:16]
+    return f'"master-{get_master_data_version()}-{digest}"'
+
+
+def master_data_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(get_master_data_version() / 1000, tz=dt_timezone.utc)
+
+
+# Answers If-None-Match / If-Modified-Since with a 304 before the view runs
+master_data_condition = condition(etag_func=master_data_etag, last_modified_func=master_data_last_modified)
+master_data_conditional = method_decorator(master_data_condition)
+
+
+def cached_master_data(request, build):
+    """
+    Return the cached payload for this URL at the current version, calling
+    ``build()`` to produce (and store) it on a miss.
+    """
+    key = f"master-data:{get_master_data_version()}:{request.get_full_path()}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.MASTER_DATA_CACHE_TIMEOUT)
+    return data
+
+
+async def acached_master_data(request, build):
+    """Async ``cached_master_data``; ``build`` is a coroutine function."""
+    version = await sync_to_async(get_master_data_version)()
+    key = f"master-data:{version}:{request.get_full_path()}"
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, settings.MASTER_DATA_CACHE_TIMEOUT)
+    return data
+
+
+class MasterDataCacheMixin:
+    """Cache list and detail responses of a master-data viewset and make them conditional."""
+
+    @master_data_conditional
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        return Response(cached_master_data(request, lambda: build(request, *args, **kwargs).data))
+
+    @master_data_conditional
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        return Response(cached_master_data(request, lambda: build(request, *args, **kwargs).data))
+
+
+def readings_etag(request, *args, **kwargs):
+    """
+    ETag of an actual-readings response, from the state of the reading tables it
+    reads, the master-data version (schedules and masters are joined in) and the
+    URL. None, leaving the body-hash ETag of ``ConditionalGetMiddleware``, for
+    requests without a valid type and for ``source=flat``, which only changes
+    when the flat table is refreshed.
+    """
+    inspection_types = parse_inspection_types(request.GET.get("inspection_type"))
+    if not inspection_types or request.GET.get("source", "readings") != "readings":
+        return None
+    representation = " ".join((
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+        str(get_master_data_version()),
+        repr(readings_state(inspection_types)),
+    ))
+    return f'"readings-{hashlib.md5(representation.encode(), usedforsecurity=False).hexdigest()[:16]}"'
+
+
+def readings_conditional(view):
+    """
+    ``condition(etag_func=readings_etag)`` for a sync or async view. The async
+    path runs the state query in a thread, which ``condition`` itself would not.
+    """
+    if not iscoroutinefunction(view):
+        return condition(etag_func=readings_etag)(view)
+
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        etag = await sync_to_async(readings_etag)(request)
+        response = get_conditional_response(request, etag=etag) if etag else None
+        if response is None:
+            response = await view(request, *args, **kwargs)
+        if etag and request.method in ("GET", "HEAD"):
+            response.headers.setdefault("ETag", etag)
+        return response
+    return inner
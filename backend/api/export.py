@@ -0,0 +1,205 @@
+"""
+Streaming exports of inspection readings.
+
+Rows come from the same keyset-ordered queryset as the actual-readings NDJSON
+stream. They are read through ``iterator()`` (a server-side cursor on
+PostgreSQL) and written out chunk by chunk, so memory is bounded by the
+chunk size, not by the size of the export:
+
+- ``csv``: UTF-8 with a byte order mark (for Excel) and a header row, sent
+  every ``CSV_CHUNK_ROWS`` rows.
+- ``parquet``: one row group per ``ROW_GROUP_ROWS`` rows.
+- ``arrow``: the Arrow IPC stream format, one record batch per
+  ``ROW_GROUP_ROWS`` rows.
+
+Parquet and Arrow need the optional ``pyarrow`` package. Their columns are
+typed: integer ids, float limits and values, and ``timestamp`` in UTC.
+"""
+import csv
+import io
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional; only CSV can be exported then
+    pyarrow = None
+
+from .readings import READING_CHAINS, astream_readings, ordered_readings, stream_readings
+
+CSV_CHUNK_ROWS = 1000
+ROW_GROUP_ROWS = 25000
+
+# output -> (content type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# actual-readings fields before and after the PO/IO number, in payload order
+FIELDS_BEFORE_ORDER_NO = (
+    "schedule_id", "reading_id", "actual_reading_id", "inspection_type",
+    "plant_id", "plant_name", "building_id", "building_name",
+    "item_code", "item_description", "operation_id", "operation_name", "parameter_name",
+)
+FIELDS_AFTER_ORDER_NO = (
+    "lsl", "usl", "target_value", "r_key", "r_value", "unit", "timestamp", "operator", "remarks",
+)
+INTEGER_FIELDS = {"schedule_id", "reading_id", "actual_reading_id"}
+FLOAT_FIELDS = {"lsl", "usl", "target_value", "r_value"}
+
+
+def export_fields(inspection_types):
+    """Export columns: the actual-readings fields, with ``io_no`` and/or ``po_no`` as the types need."""
+    order_fields = dict.fromkeys(READING_CHAINS[t]["order_field"] for t in inspection_types)
+    return [*FIELDS_BEFORE_ORDER_NO, *order_fields, *FIELDS_AFTER_ORDER_NO]
+
+
+def export_filename(inspection_types, output, day):
+    if len(inspection_types) == len(READING_CHAINS):
+        types = "all"
+    else:
+        types = "-".join(t.lower() for t in inspection_types) or "none"
+    return f"readings-{types}-{day:%Y%m%d}.{EXPORT_FORMATS[output][1]}"
+
+
+class CSVExport:
+    """
+    Encodes readings as CSV. ``write`` returns the bytes of every
+    ``CSV_CHUNK_ROWS`` rows (None in between) and ``close`` the rest.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.buffer = io.StringIO()
+        self.buffer.write("\ufeff")
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(fields)
+        self.size = 0
+
+    def write(self, reading):
+        self.writer.writerow(map(reading.get, self.fields))
+        self.size += 1
+        if self.size == CSV_CHUNK_ROWS:
+            return self.flush()
+
+    def flush(self):
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.size = 0
+        return data
+
+    def close(self):
+        return self.flush()
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what pyarrow writes until it is drained into the response."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema(fields):
+    def field_type(name):
+        if name in INTEGER_FIELDS:
+            return pyarrow.int64()
+        if name in FLOAT_FIELDS:
+            return pyarrow.float64()
+        if name == "timestamp":
+            return pyarrow.timestamp("us", tz="UTC")
+        return pyarrow.string()
+    return pyarrow.schema([(name, field_type(name)) for name in fields])
+
+
+class ArrowExport:
+    """
+    Encodes readings as Parquet or an Arrow IPC stream, ``ROW_GROUP_ROWS``
+    rows at a time. Same interface as ``CSVExport``.
+    """
+
+    def __init__(self, fields, output):
+        self.schema = arrow_schema(fields)
+        self.sink = ChunkSink()
+        if output == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+        self.columns = {field: [] for field in fields}
+        self.size = 0
+
+    def write(self, reading):
+        for field, values in self.columns.items():
+            values.append(reading.get(field))
+        self.size += 1
+        if self.size == ROW_GROUP_ROWS:
+            return self.flush()
+
+    def flush(self):
+        if self.size:
+            arrays = []
+            for field in self.schema:
+                values = self.columns[field.name]
+                if field.name == "timestamp":
+                    # serialize_reading renders ISO 8601 strings; Arrow parses them in bulk
+                    arrays.append(pyarrow.array(values, pyarrow.string()).cast(field.type))
+                else:
+                    arrays.append(pyarrow.array(values, field.type))
+            batch = pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+            if isinstance(self.writer, pyarrow.parquet.ParquetWriter):
+                self.writer.write_table(pyarrow.Table.from_batches([batch]))
+            else:
+                self.writer.write_batch(batch)
+            self.columns = {field: [] for field in self.columns}
+            self.size = 0
+        return self.sink.drain()
+
+    def close(self):
+        data = self.flush()
+        self.writer.close()
+        return data + self.sink.drain()
+
+
+def export_encoder(inspection_types, output):
+    fields = export_fields(inspection_types)
+    return CSVExport(fields) if output == "csv" else ArrowExport(fields, output)
+
+
+def export_chunks(inspection_types, filters, output, ordered=ordered_readings):
+    """Bytes of an export of the matching readings, in keyset order, read from a server-side cursor."""
+    encoder = export_encoder(inspection_types, output)
+    for reading in stream_readings(inspection_types, filters, ordered=ordered):
+        data = encoder.write(reading)
+        if data:
+            yield data
+    yield encoder.close()
+
+
+async def aexport_chunks(inspection_types, filters, output, ordered=ordered_readings):
+    encoder = export_encoder(inspection_types, output)
+    async for reading in astream_readings(inspection_types, filters, ordered=ordered):
+        data = encoder.write(reading)
+        if data:
+            yield data
+    yield encoder.close()
@@ -0,0 +1,77 @@
+"""
+Composite, partial (``WHERE is_active``) indexes for the inspection-reading
+hot paths and the master-data lookups behind the chatbot's dropdowns.
+
+The ``master_*`` tables are owned by another application and have no
+migrations here, so the indexes are created by the ``create_reading_indexes``
+management command. On PostgreSQL they are built ``CONCURRENTLY`` so the
+shop floor can keep writing while they build.
+"""
+from .models import (
+    MasterInspectionschedule,
+    MasterFaiinspectionschedule,
+    MasterRminspectionreading,
+    MasterInprocessinspectionreading,
+    MasterFaiinspectionreading,
+    MasterRmactualreading,
+    MasterInprocessactualreading,
+    MasterFaiactualreading,
+    MasterProductionplanner,
+    MasterItemmaster,
+    MasterFaiitemmaster,
+)
+
+# (model, index name, field names, each optionally followed by an operator class); every index is partial on is_active
+READING_INDEXES = [
+    # schedule -> reading headers, filtered by PO/IO number
+    (MasterRminspectionreading, "rmreading_sched_io_active_idx", ["insp_schedule_id", "io_no"]),
+    (MasterInprocessinspectionreading, "ipreading_sched_po_active_idx", ["insp_schedule_id", "po_no"]),
+    (MasterFaiinspectionreading, "faireading_sched_po_active_idx", ["insp_schedule_id", "po_no"]),
+    # reading header -> actual readings, in time order
+    (MasterRmactualreading, "rmactual_reading_time_active_idx", ["reading_id", "created_at"]),
+    (MasterInprocessactualreading, "ipactual_reading_time_active_idx", ["reading_id", "created_at"]),
+    (MasterFaiactualreading, "faiactual_reading_time_active_idx", ["reading_id", "created_at"]),
+    # keyset pagination, streaming and time windows
+    (MasterRmactualreading, "rmactual_time_id_active_idx", ["created_at", "id"]),
+    (MasterInprocessactualreading, "ipactual_time_id_active_idx", ["created_at", "id"]),
+    (MasterFaiactualreading, "faiactual_time_id_active_idx", ["created_at", "id"]),
+    # schedule lookups by plant / item / type / parameter
+    (
+        MasterInspectionschedule,
+        "inspsched_plant_item_type_param_active_idx",
+        ["plant_id", "item_code", "inspection_type", "inspection_parameter_name"],
+    ),
+    (
+        MasterFaiinspectionschedule,
+        "faisched_plant_item_param_active_idx",
+        ["plant_id", "item_code", "inspection_parameter_name"],
+    ),
+    # order numbers by section (+ item), in order, for the PO lookup and its prefix search
+    (MasterProductionplanner, "planner_section_item_order_active_idx", ["section", "item_code", "order_number"]),
+    # item-code pickers by building and type; the pattern operator class lets LIKE 'prefix%' use the index
+    (MasterItemmaster, "item_building_type_code_active_idx", ["building", "item_type", "item_code varchar_pattern_ops"]),
+    (MasterFaiitemmaster, "faiitem_building_type_code_active_idx", ["building", "item_type", "item_code varchar_pattern_ops"]),
+]
+
+
+def index_column(connection, model, field):
+    """``field`` or ``"field opclass"`` as an index column; operator classes only exist on PostgreSQL."""
+    name, _, opclass = field.partition(" ")
+    column = connection.ops.quote_name(model._meta.get_field(name).column)
+    return f"{column} {opclass}" if opclass and connection.vendor == "postgresql" else column
+
+
+def create_index_sql(connection, model, name, fields):
+    quote = connection.ops.quote_name
+    columns = ", ".join(index_column(connection, model, f) for f in fields)
+    concurrently = " CONCURRENTLY" if connection.vendor == "postgresql" else ""
+    return (
+        f"CREATE INDEX{concurrently} IF NOT EXISTS {quote(name)} "
+        f"ON {quote(model._meta.db_table)} ({columns}) "
+        f"WHERE {quote(model._meta.get_field('is_active').column)}"
+    )
+
+
+def drop_index_sql(connection, model, name, fields):
+    concurrently = " CONCURRENTLY" if connection.vendor == "postgresql" else ""
+    return f"DROP INDEX{concurrently} IF EXISTS {connection.ops.quote_name(name)}"
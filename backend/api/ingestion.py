@@ -0,0 +1,222 @@
+"""
+Bulk ingestion of inspection readings.
+
+A payload names one inspection type and carries reading headers, each with
+the schedule it belongs to and many ``r_key``/``r_value`` pairs::
+
+    {
+        "inspection_type": "In-process",
+        "readings": [
+            {"schedule_id": 12, "po_no": "PO-1", "machine_id": "CMM-2",
+             "values": [{"r_key": "1", "r_value": 10.02}, ...]}
+        ]
+    }
+
+The whole payload is validated, with one query for the referenced
+schedules, before anything is written, so a rejected payload writes nothing.
+Rows are then written in transactions of about ``batch_size`` actual
+readings. The headers go through ``bulk_create`` for their ids, and the
+actual readings go through ``COPY`` on PostgreSQL and a single
+``executemany`` elsewhere.
+"""
+import math
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .readings import READING_CHAINS, chain_models
+from .spc import bump_spc_versions
+
+DEFAULT_BATCH_SIZE = 10000
+MAX_ERRORS = 50
+
+HEADER_FIELDS = ("remarks", "machine_id", "input_type", "attachment_document")
+# Column order of the actual-reading rows handed to insert_actual_readings
+ROW_FIELDS = (
+    "created_at", "updated_at", "is_active", "r_key", "r_value",
+    "created_by_id", "updated_by_id", "reading_id_id",
+)
+
+
+class IngestionError(ValueError):
+    """Raised with every problem found in a payload; nothing has been written."""
+
+    def __init__(self, errors):
+        super().__init__("invalid readings payload")
+        self.errors = errors
+
+
+def _max_length(model, name):
+    return model._meta.get_field(name).max_length
+
+
+def parse_value(value):
+    """A finite float or None; raises ValueError otherwise."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError
+    return number
+
+
+def validate_payload(payload):
+    """
+    Check a payload and return ``(inspection_type, headers)`` ready to write.
+
+    Each header comes back as a dict with its schedule id, header columns and
+    a list of ``(r_key, r_value)`` pairs. Raises ``IngestionError`` listing
+    every problem (up to ``MAX_ERRORS``).
+    """
+    if not isinstance(payload, dict):
+        raise IngestionError(["payload must be a JSON object"])
+    inspection_type = payload.get("inspection_type")
+    if inspection_type not in READING_CHAINS:
+        raise IngestionError([f"inspection_type must be one of {', '.join(READING_CHAINS)}"])
+    items = payload.get("readings")
+    if not isinstance(items, list) or not items:
+        raise IngestionError(["readings must be a non-empty list"])
+
+    chain = READING_CHAINS[inspection_type]
+    schedule_model, reading_model, actual_model = chain_models(inspection_type)
+    order_field = chain["order_field"]
+    key_length = _max_length(actual_model, "r_key")
+
+    errors = []
+    headers = []
+    for index, item in enumerate(items):
+        where = f"readings[{index}]"
+        if not isinstance(item, dict):
+            errors.append(f"{where} must be an object")
+            continue
+        header = {"values": []}
+        try:
+            header["schedule_id"] = int(item.get("schedule_id"))
+        except (TypeError, ValueError):
+            errors.append(f"{where}.schedule_id must be an integer")
+        # po_no is accepted for Inward too, as in the reading filters
+        order_no = item.get(order_field, item.get("po_no"))
+        header[order_field] = None if order_no is None else str(order_no)
+        for name in (order_field, *HEADER_FIELDS):
+            if name != order_field:
+                value = item.get(name)
+                header[name] = None if value is None else str(value)
+            if header[name] is not None and len(header[name]) > _max_length(reading_model, name):
+                errors.append(f"{where}.{name} is longer than {_max_length(reading_model, name)} characters")
+
+        values = item.get("values")
+        if not isinstance(values, list) or not values:
+            errors.append(f"{where}.values must be a non-empty list")
+            values = []
+        for position, pair in enumerate(values):
+            if not isinstance(pair, dict) or pair.get("r_key") in (None, ""):
+                errors.append(f"{where}.values[{position}] needs an r_key")
+                continue
+            r_key = str(pair["r_key"])
+            if len(r_key) > key_length:
+                errors.append(f"{where}.values[{position}].r_key is longer than {key_length} characters")
+            try:
+                r_value = parse_value(pair.get("r_value"))
+            except (TypeError, ValueError):
+                errors.append(f"{where}.values[{position}].r_value must be a finite number or null")
+                continue
+            header["values"].append((r_key, r_value))
+        headers.append(header)
+        if len(errors) >= MAX_ERRORS:
+            break
+
+    schedule_ids = {h["schedule_id"] for h in headers if "schedule_id" in h}
+    known = set(
+        schedule_model.objects.filter(
+            id__in=schedule_ids, is_active=True, **chain["schedule_filters"]
+        ).values_list("id", flat=True)
+    )
+    for index, header in enumerate(headers):
+        if "schedule_id" in header and header["schedule_id"] not in known:
+            errors.append(
+                f"readings[{index}].schedule_id {header['schedule_id']} is not an active {inspection_type} schedule"
+            )
+
+    if errors:
+        raise IngestionError(errors[:MAX_ERRORS])
+    return inspection_type, headers
+
+
+def batches(headers, batch_size):
+    """Group headers so each batch holds about ``batch_size`` actual readings."""
+    batch, size = [], 0
+    for header in headers:
+        batch.append(header)
+        size += len(header["values"])
+        if size >= batch_size:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def insert_rows(connection, model, fields, rows):
+    """
+    Write tuples of ``fields`` straight to the model's table: ``COPY`` on
+    PostgreSQL, one ``executemany`` elsewhere. Both skip per-instance model
+    overhead, and with it ``auto_now``/``auto_now_add`` and signals.
+    """
+    columns = ", ".join(
+        connection.ops.quote_name(model._meta.get_field(name).column) for name in fields
+    )
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            placeholders = ", ".join(["%s"] * len(fields))
+            cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", list(rows))
+
+
+def insert_actual_readings(connection, actual_model, rows):
+    """Write ``ROW_FIELDS`` tuples to an actual-reading table with ``insert_rows``."""
+    insert_rows(connection, actual_model, ROW_FIELDS, rows)
+
+
+def ingest_readings(inspection_type, headers, user=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write validated headers and their values; returns the created reading ids
+    and the number of actual readings written.
+    """
+    _, reading_model, actual_model = chain_models(inspection_type)
+    order_field = READING_CHAINS[inspection_type]["order_field"]
+    using = router.db_for_write(actual_model)
+    connection = connections[using]
+    user_id = user.pk if user is not None and user.is_authenticated else None
+
+    reading_ids = []
+    written = 0
+    for batch in batches(headers, batch_size):
+        now = timezone.now()
+        # rows bypass the model layer, so the timestamp is adapted once here
+        stamp = connection.ops.adapt_datetimefield_value(now)
+        with transaction.atomic(using=using):
+            readings = reading_model.objects.using(using).bulk_create([
+                reading_model(
+                    insp_schedule_id_id=header["schedule_id"],
+                    created_by_id=user_id,
+                    updated_by_id=user_id,
+                    **{name: header[name] for name in (order_field, *HEADER_FIELDS)},
+                )
+                for header in batch
+            ])
+            rows = (
+                (stamp, stamp, True, r_key, r_value, user_id, user_id, reading.pk)
+                for reading, header in zip(readings, batch)
+                for r_key, r_value in header["values"]
+            )
+            insert_actual_readings(connection, actual_model, rows)
+            written += sum(len(header["values"]) for header in batch)
+        # rows bypass the model layer, so no signal invalidates the schedules' control charts
+        bump_spc_versions(inspection_type, [header["schedule_id"] for header in batch], using=using)
+        reading_ids.extend(reading.pk for reading in readings)
+    return reading_ids, written
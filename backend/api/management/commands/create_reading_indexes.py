@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.indexes import READING_INDEXES, create_index_sql, drop_index_sql
+
+
+class Command(BaseCommand):
+    help = "Create (or drop) the composite partial indexes for the inspection-reading hot paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to run against.")
+        parser.add_argument("--drop", action="store_true", help="Drop the indexes instead of creating them.")
+        parser.add_argument("--dry-run", action="store_true", help="Print the SQL without running it.")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        build_sql = drop_index_sql if options["drop"] else create_index_sql
+        for model, name, fields in READING_INDEXES:
+            sql = build_sql(connection, model, name, fields)
+            if options["dry_run"]:
+                self.stdout.write(sql + ";")
+                continue
+            # CONCURRENTLY cannot run inside a transaction; Django's cursor is in autocommit here
+            with connection.cursor() as cursor:
+                if not options["drop"] and self.is_invalid(cursor, connection, name):
+                    # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+                    self.stdout.write(f"Rebuilding invalid index {name}")
+                    cursor.execute(drop_index_sql(connection, model, name, fields))
+                cursor.execute(sql)
+            self.stdout.write(f"{'Dropped' if options['drop'] else 'Created'} {name}")
+
+    def is_invalid(self, cursor, connection, name):
+        if connection.vendor != "postgresql":
+            return False
+        cursor.execute(
+            "SELECT NOT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = %s",
+            [name],
+        )
+        row = cursor.fetchone()
+        return bool(row and row[0])
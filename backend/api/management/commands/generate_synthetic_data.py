@@ -0,0 +1,431 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.caching import bump_master_data_version
+from api.ingestion import ROW_FIELDS, insert_rows
+from api.models import (
+    MasterPlantmaster,
+    MasterBuildingsectionlab,
+    MasterItemmaster,
+    MasterOperationmaster,
+    MasterParameterlist,
+    MasterProductionplanner,
+    RbacRole,
+    MasterInspectionschedule,
+    MasterFaiinspectionschedule,
+    MasterFaiitemmaster,
+    MasterFaioperationmaster,
+)
+from api.readings import READING_CHAINS, chain_models
+from api.registry import expire_master_registry
+from api.spc import bump_spc_versions
+
+# scale -> shape of the data; every count but plants is per parent row
+SCALES = {
+    "small": {"plants": 1, "buildings": 2, "items": 5, "operations": 2, "parameters": 2,
+              "orders": 2, "operators": 3, "readings": 10, "samples": 5, "days": 30},
+    "medium": {"plants": 2, "buildings": 3, "items": 10, "operations": 3, "parameters": 3,
+               "orders": 3, "operators": 5, "readings": 40, "samples": 5, "days": 90},
+    "large": {"plants": 3, "buildings": 4, "items": 20, "operations": 3, "parameters": 4,
+              "orders": 4, "operators": 8, "readings": 60, "samples": 5, "days": 180},
+}
+SHAPE_HELP = {
+    "plants": "Plants.",
+    "buildings": "Buildings (sections) per plant.",
+    "items": "Items per building, each with a matching FAI item.",
+    "operations": "Operations per item.",
+    "parameters": "Inspected parameters per item (Inward) or operation (In-process, Final).",
+    "orders": "Production orders per item.",
+    "operators": "Operator users per plant.",
+    "readings": "Reading headers per schedule.",
+    "samples": "Actual readings per header (the schedules' sample size).",
+    "days": "Days of history the readings are spread over, up to now.",
+}
+
+# Modelled on the sample rows in "Qshakti Data.txt": a cartridge case plant
+BUILDING_NAMES = ("FILLING", "CASE", "LOADING", "PRIMING", "ANNEALING", "PACKING")
+ITEM_NAMES = (
+    "Case 5.56MM(Standard)Mkg.", "CASE 5.56X45MM FOR CTG.S.A.BALL5.56", "Ctg.SA 9MM Ball MK.2Z-Bullets Mkg.",
+    "CASE 7.62MM M-80 MAKING", "Ctg.S.A.Ball 5.56MM Bullets Mkg.", "Primer cap No.41",
+)
+OPERATION_NAMES = (
+    "BRING ALL MATERIALS", "WEIGH CUPS & RECORD", "PICKLING OF CUPS.", "ANNEALING",
+    "TRIMMING", "HEAD TURNING", "VISUAL INSPECTION", "GAUGING",
+)
+# (parameter, nominal, tolerance)
+PARAMETERS = (
+    ("Case length", 44.70, 0.10),
+    ("Rim diameter", 9.60, 0.05),
+    ("Neck wall thickness", 0.30, 0.02),
+    ("Mouth diameter", 6.20, 0.03),
+    ("Primer pocket depth", 3.00, 0.05),
+    ("Flash hole diameter", 1.80, 0.05),
+    ("Head hardness", 180.0, 15.0),
+    ("Weight", 6.00, 0.20),
+)
+MACHINES = ("M/C NO.3371", "M/C NO.3374", "M/C NO.6850", "AFK/LT-817", "AFK/LT- 1563")
+METHODS = ("GAUGE", "Vernier caliper", "Micrometer", "Profile projector", "Hardness tester", "Balance")
+FREQUENCIES = ("Every lot", "First piece", "1 per hour", "5 per shift")
+REMARKS = ("", "", "", "OK", "within tolerance", "re-measured", "burr on mouth", "tool changed")
+CAPABILITIES = (0.8, 1.0, 1.33, 1.67, 2.0)
+
+HEADER_FIELDS = (
+    "id", "created_at", "updated_at", "is_active", "remarks", "machine_id", "input_type",
+    "created_by_id", "updated_by_id", "insp_schedule_id_id",
+)
+
+
+def planned_counts(shape):
+    """Rows per model for a shape, before anything is written."""
+    plants = shape["plants"]
+    buildings = plants * shape["buildings"]
+    items = buildings * shape["items"]
+    operations = items * shape["operations"]
+    schedules = {
+        "Inward": items * shape["parameters"],
+        "In-process": operations * shape["parameters"],
+        "Final": operations * shape["parameters"],
+    }
+    counts = {
+        "plants": plants,
+        "buildings": buildings,
+        "items": items,
+        "fai items": items,
+        "operations": operations,
+        "fai operations": operations,
+        "parameters": plants * len(PARAMETERS),
+        "production orders": items * shape["orders"],
+        "users": plants * shape["operators"],
+    }
+    for inspection_type, count in schedules.items():
+        counts[f"{inspection_type} schedules"] = count
+        counts[f"{inspection_type} readings"] = count * shape["readings"]
+        counts[f"{inspection_type} actual readings"] = count * shape["readings"] * shape["samples"]
+    return counts
+
+
+def delete_rows(qs):
+    """DELETE the rows of ``qs`` in one statement, without loading them or sending signals."""
+    connection = connections[qs.db]
+    quote = connection.ops.quote_name
+    sql, params = qs.values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(qs.model._meta.db_table)} WHERE {quote(qs.model._meta.pk.column)} IN ({sql})",
+            params,
+        )
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic plants, master data, schedules and inspection readings "
+        "for load tests and benchmarks. Plant codes start with --prefix, so the data "
+        "can be told apart from real rows and replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(SCALES), default="small", help="Preset shape (default small).")
+        for name, text in SHAPE_HELP.items():
+            parser.add_argument(f"--{name}", type=int, help=f"{text} Overrides the preset.")
+        parser.add_argument("--prefix", default="SYN", help="Code prefix of the generated plants, orders and users (default SYN).")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed; the same seed and shape give the same data.")
+        parser.add_argument("--batch-size", type=int, default=50000, help="Actual readings per transaction (default 50000).")
+        parser.add_argument("--replace", action="store_true", help="Delete synthetic data with the same prefix first.")
+        parser.add_argument(
+            "--refresh-reporting",
+            action="store_true",
+            help="Then rebuild the flat readings table and the rollups, and create the reading indexes.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only print how many rows would be written.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to run against.")
+
+    def handle(self, *args, **options):
+        shape = dict(SCALES[options["scale"]])
+        for name in SHAPE_HELP:
+            if options[name] is not None:
+                if options[name] <= 0:
+                    raise CommandError(f"--{name} must be positive")
+                shape[name] = options[name]
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive")
+        counts = planned_counts(shape)
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        if options["dry_run"]:
+            return
+
+        using = options["database"]
+        self.prefix = options["prefix"]
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+        plants = MasterPlantmaster.objects.using(using).filter(plant_id__startswith=f"{self.prefix}-")
+        if plants.exists():
+            if not options["replace"]:
+                raise CommandError(f"Synthetic plants with prefix {self.prefix} exist; pass --replace to delete them first")
+            self.delete_synthetic(plants)
+
+        start = time.perf_counter()
+        with transaction.atomic(using=using):
+            schedules = self.create_master_data(shape, using)
+        self.stdout.write(f"Master data and schedules written in {time.perf_counter() - start:.1f}s")
+        for inspection_type, rows in schedules.items():
+            self.create_readings(inspection_type, rows, shape, options["batch_size"], using)
+            bump_spc_versions(inspection_type, [row["id"] for row in rows], using=using)
+        # bulk writes send no signals, so the caches are moved on by hand
+        bump_master_data_version()
+        expire_master_registry()
+
+        if options["refresh_reporting"]:
+            call_command("create_reading_indexes", database=using, stdout=self.stdout)
+            call_command("refresh_flat_readings", database=using, rebuild=True, stdout=self.stdout)
+            call_command("refresh_reading_rollups", rebuild=True, stdout=self.stdout)
+        self.stdout.write(f"Done in {time.perf_counter() - start:.1f}s")
+
+    def delete_synthetic(self, plants):
+        """Delete everything hanging off the synthetic plants, children first."""
+        User = get_user_model()
+        deleted = 0
+        for inspection_type in READING_CHAINS:
+            _, reading_model, actual_model = chain_models(inspection_type)
+            deleted += delete_rows(actual_model.objects.using(plants.db).filter(reading_id__insp_schedule_id__plant_id__in=plants))
+            deleted += delete_rows(reading_model.objects.using(plants.db).filter(insp_schedule_id__plant_id__in=plants))
+        for model in (MasterInspectionschedule, MasterFaiinspectionschedule):
+            deleted += delete_rows(model.objects.using(plants.db).filter(plant_id__in=plants))
+        deleted += delete_rows(MasterProductionplanner.objects.using(plants.db).filter(section__plant__in=plants))
+        for model in (
+            MasterOperationmaster, MasterFaioperationmaster, MasterItemmaster, MasterFaiitemmaster,
+            MasterParameterlist, User, RbacRole, MasterBuildingsectionlab,
+        ):
+            deleted += delete_rows(model.objects.using(plants.db).filter(plant__in=plants))
+        deleted += delete_rows(plants)
+        self.stdout.write(f"Deleted {deleted} rows of earlier synthetic data")
+
+    def create_master_data(self, shape, using):
+        """
+        Write plants through schedules with ``bulk_create``; returns, per
+        inspection type, the schedules with what their readings need.
+        """
+        rng = self.rng
+        prefix = self.prefix
+
+        def bulk(model, objs):
+            return model.objects.using(using).bulk_create(objs, batch_size=1000)
+
+        plants = bulk(MasterPlantmaster, [
+            MasterPlantmaster(plant_id=f"{prefix}-P{p + 1:02d}", plant_name=f"Synthetic plant {p + 1}")
+            for p in range(shape["plants"])
+        ])
+        roles = {
+            role.plant_id: role
+            for role in bulk(RbacRole, [
+                RbacRole(created_at=self.now, updated_at=self.now, is_active=True, name="QC Inspector", plant=plant)
+                for plant in plants
+            ])
+        }
+        User = get_user_model()
+        password = make_password(None)
+        users = bulk(User, [
+            User(
+                username=f"{prefix.lower()}-p{p + 1:02d}-op{u + 1:02d}", password=password, user_status="Active",
+                emp_id=f"{prefix}{p + 1:02d}{u + 1:03d}", plant=plant, role=roles[plant.pk],
+            )
+            for p, plant in enumerate(plants)
+            for u in range(shape["operators"])
+        ])
+        self.operators = {}
+        for user in users:
+            self.operators.setdefault(user.plant_id, []).append(user.pk)
+
+        buildings = bulk(MasterBuildingsectionlab, [
+            MasterBuildingsectionlab(
+                building_id=f"{BUILDING_NAMES[b % len(BUILDING_NAMES)][0]}{b + 1}",
+                building_name=f"{BUILDING_NAMES[b % len(BUILDING_NAMES)]} {b + 1}",
+                plant=plant,
+            )
+            for plant in plants
+            for b in range(shape["buildings"])
+        ])
+        parameters = {}
+        for parameter in bulk(MasterParameterlist, [
+            MasterParameterlist(
+                inspection_parameter_id=f"PR{k + 1:03d}", inspection_parameter=name,
+                parameter_description=f"{name}, nominal {nominal} +/- {tolerance}", plant=plant,
+            )
+            for plant in plants
+            for k, (name, nominal, tolerance) in enumerate(PARAMETERS)
+        ]):
+            parameters[parameter.plant_id, parameter.inspection_parameter] = parameter
+
+        item_specs = [
+            (building, f"99{n:08d}", ITEM_NAMES[n % len(ITEM_NAMES)], ("FG", "SFG")[n % 2])
+            for n, building in enumerate(
+                (building for building in buildings for _ in range(shape["items"])), start=1
+            )
+        ]
+        items = bulk(MasterItemmaster, [
+            MasterItemmaster(
+                item_code=code, item_description=name, unit="NOS.", item_type=item_type,
+                building=building, plant_id=building.plant_id,
+            )
+            for building, code, name, item_type in item_specs
+        ])
+        fai_items = bulk(MasterFaiitemmaster, [
+            MasterFaiitemmaster(
+                item_code=code, item_description=name, unit="NOS.", item_type=item_type,
+                building=building, plant_id=building.plant_id,
+            )
+            for building, code, name, item_type in item_specs
+        ])
+
+        def operations_of(model, items):
+            return bulk(model, [
+                model(
+                    operation_id=f"{(o + 1) * 10:04d}",
+                    operation_name=OPERATION_NAMES[o % len(OPERATION_NAMES)],
+                    operation_description=OPERATION_NAMES[o % len(OPERATION_NAMES)],
+                    building_id=item.building_id, item_code=item, plant_id=item.plant_id,
+                )
+                for item in items
+                for o in range(shape["operations"])
+            ])
+
+        operations = operations_of(MasterOperationmaster, items)
+        fai_operations = operations_of(MasterFaioperationmaster, fai_items)
+
+        today = self.now.date()
+        order_days = max(1, shape["days"] // max(1, shape["orders"]))
+        orders = {}
+        planners = []
+        for n, item in enumerate((item for item in items for _ in range(shape["orders"])), start=1):
+            # each order covers the next slice of the history, oldest first
+            start_date = today - timedelta(days=shape["days"]) + timedelta(days=order_days * len(orders.get(item.pk, ())))
+            target_date = start_date + timedelta(days=order_days)
+            order_number = f"{prefix}-PO{n:06d}"
+            orders.setdefault(item.pk, []).append(order_number)
+            planners.append(MasterProductionplanner(
+                order_number=order_number, lot_number=f"Lot-{n:03d}", lot_qty=rng.choice((50, 100, 250, 500)),
+                item_desc=item.item_description, start_date=start_date, target_date=target_date,
+                status="Start" if target_date >= today else "Stop", customer_name="Synthetic customer",
+                item_code=item, section_id=item.building_id,
+            ))
+        bulk(MasterProductionplanner, planners)
+        fai_orders = {fai.pk: orders[item.pk] for item, fai in zip(items, fai_items)}
+
+        def schedules_of(model, inspection_type, targets, order_numbers):
+            """Schedules for ``(item, operation)`` targets; ``parameters`` per target, rotating through PARAMETERS."""
+            specs = []
+            objs = []
+            for t, (item, operation) in enumerate(targets):
+                for k in range(shape["parameters"]):
+                    name, nominal, tolerance = PARAMETERS[(t + k) % len(PARAMETERS)]
+                    objs.append(model(
+                        inspection_parameter_name=name, inspection_type=inspection_type,
+                        lsl=round(nominal - tolerance, 4), usl=round(nominal + tolerance, 4), target_value=nominal,
+                        sample_size=shape["samples"], inspection_frequency=rng.choice(FREQUENCIES),
+                        inspection_method=rng.choice(METHODS), recording_type="Variable",
+                        building_id=item.building_id, item_code=item, operation=operation,
+                        inspection_parameter_id=parameters[item.plant_id, name], plant_id_id=item.plant_id,
+                    ))
+                    # how the process behaves: an offset mean, a capability, and sometimes a drift over the history
+                    sigma = tolerance / (3 * rng.choice(CAPABILITIES))
+                    specs.append({
+                        "mean": nominal + rng.uniform(-0.3, 0.3) * tolerance,
+                        "sigma": sigma,
+                        "drift": rng.choice((0, 0, 0, 0, 1)) * rng.uniform(-1, 1) * tolerance,
+                        "plant": item.plant_id,
+                        "orders": order_numbers[item.pk],
+                    })
+            for obj, spec in zip(bulk(model, objs), specs):
+                spec["id"] = obj.pk
+            return specs
+
+        return {
+            "Inward": schedules_of(MasterInspectionschedule, "Inward", [(item, None) for item in items], orders),
+            "In-process": schedules_of(
+                MasterInspectionschedule, "In-process", [(op.item_code, op) for op in operations], orders
+            ),
+            "Final": schedules_of(
+                MasterFaiinspectionschedule, "Final", [(op.item_code, op) for op in fai_operations], fai_orders
+            ),
+        }
+
+    def create_readings(self, inspection_type, schedules, shape, batch_size, using):
+        """
+        Write reading headers and actual readings with ``insert_rows``, which
+        keeps the generated timestamps (``bulk_create`` would stamp them
+        all with now). Header ids are assigned here, so the values can
+        reference them without a round trip.
+        """
+        rng = self.rng
+        _, reading_model, actual_model = chain_models(inspection_type)
+        order_field = READING_CHAINS[inspection_type]["order_field"]
+        header_fields = (*HEADER_FIELDS, order_field)
+        connection = connections[using]
+        adapt = connection.ops.adapt_datetimefield_value
+        span = timedelta(days=shape["days"]).total_seconds()
+        start = self.now - timedelta(days=shape["days"])
+        readings, samples = shape["readings"], shape["samples"]
+        next_id = (reading_model.objects.using(using).aggregate(Max("id"))["id__max"] or 0) + 1
+
+        headers, values = [], []
+        written = 0
+        began = time.perf_counter()
+
+        def flush():
+            with transaction.atomic(using=using):
+                insert_rows(connection, reading_model, header_fields, headers)
+                insert_rows(connection, actual_model, ROW_FIELDS, values)
+            headers.clear()
+            values.clear()
+
+        for schedule in schedules:
+            operators = self.operators.get(schedule["plant"]) or [None]
+            order_numbers = schedule["orders"]
+            for k in range(readings):
+                position = (k + rng.random()) / readings
+                stamp = start + timedelta(seconds=span * position)
+                operator = rng.choice(operators)
+                if inspection_type == "Inward":
+                    order_no = f"IO-{schedule['id']:06d}-{k * 4 // readings + 1}"
+                else:
+                    order_no = order_numbers[min(int(position * len(order_numbers)), len(order_numbers) - 1)]
+                # the samples of a reading are recorded together, like an ingested header
+                stamp = adapt(stamp)
+                headers.append((
+                    next_id, stamp, stamp, True, rng.choice(REMARKS), rng.choice(MACHINES),
+                    rng.choice(("parameter", "sample")), operator, operator, schedule["id"], order_no,
+                ))
+                mean = schedule["mean"] + schedule["drift"] * position
+                sigma = schedule["sigma"]
+                for s in range(samples):
+                    value = rng.gauss(mean, sigma)
+                    if rng.random() < 0.002:  # the odd gross outlier
+                        value += rng.choice((-5, 5)) * sigma
+                    values.append((stamp, stamp, True, str(s + 1), round(value, 4), operator, operator, next_id))
+                next_id += 1
+                if len(values) >= batch_size:
+                    written += len(values)
+                    flush()
+        written += len(values)
+        if headers:
+            flush()
+        # ids were given explicitly, so PostgreSQL's sequence has to catch up
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [reading_model]):
+                cursor.execute(sql)
+        elapsed = time.perf_counter() - began
+        self.stdout.write(
+            f"{inspection_type}: {len(schedules) * readings} readings and {written} actual readings "
+            f"in {elapsed:.1f}s ({written / elapsed if elapsed else 0:.0f} actual readings/s)"
+        )
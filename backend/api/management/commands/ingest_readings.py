@@ -0,0 +1,59 @@
+import json
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ingestion import DEFAULT_BATCH_SIZE, IngestionError, ingest_readings, validate_payload
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load inspection readings from a JSON file in the same format as "
+        "POST /api/inspections/readings/bulk/ ('-' reads stdin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON payload file, or '-' for stdin.")
+        parser.add_argument(
+            "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+            help=f"Actual readings per transaction (default {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument("--user", help="Username recorded as created_by.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate the payload without writing it.")
+
+    def handle(self, *args, **options):
+        try:
+            if options["path"] == "-":
+                payload = json.load(sys.stdin)
+            else:
+                with open(options["path"]) as f:
+                    payload = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read payload: {e}")
+
+        user = None
+        if options["user"]:
+            User = get_user_model()
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']}")
+
+        try:
+            inspection_type, headers = validate_payload(payload)
+        except IngestionError as e:
+            raise CommandError("\n".join([str(e), *e.errors]))
+        total = sum(len(h["values"]) for h in headers)
+        if options["dry_run"]:
+            self.stdout.write(f"{inspection_type}: {len(headers)} readings, {total} actual readings valid")
+            return
+
+        start = time.perf_counter()
+        reading_ids, written = ingest_readings(inspection_type, headers, user, options["batch_size"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{inspection_type}: wrote {len(reading_ids)} readings and {written} actual readings "
+            f"in {elapsed:.2f}s ({written / elapsed if elapsed else 0:.0f} actual readings/s)"
+        )
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardPageNumberPagination(PageNumberPagination):
+    """
+    Default pagination for the router-registered viewsets.
+
+    Page size comes from ``REST_FRAMEWORK["PAGE_SIZE"]``; clients may ask for
+    a different one with ``page_size`` up to ``API_MAX_PAGE_SIZE``.
+    """
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
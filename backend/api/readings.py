@@ -0,0 +1,318 @@
+"""
+Query helpers for the schedule -> inspection reading -> actual reading chains.
+
+Each inspection type stores its readings in its own pair of tables. Instead of
+walking schedules and readings one row at a time, the helpers here start from
+the actual-reading table and pull the reading header, schedule and master data
+through joins, so a request costs one query per inspection type regardless of
+how many readings match.
+"""
+import base64
+import json
+
+from django.db.models import CharField, F, Max, Q, Value
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    MasterRmactualreading,
+    MasterInprocessactualreading,
+    MasterFaiactualreading,
+)
+
+# inspection_type -> how to reach its readings
+READING_CHAINS = {
+    "Inward": {
+        "actual_model": MasterRmactualreading,
+        "order_field": "io_no",
+        "schedule_filters": {"inspection_type": "Inward"},
+    },
+    "In-process": {
+        "actual_model": MasterInprocessactualreading,
+        "order_field": "po_no",
+        "schedule_filters": {"inspection_type": "In-process"},
+    },
+    "Final": {
+        "actual_model": MasterFaiactualreading,
+        "order_field": "po_no",
+        "schedule_filters": {},
+    },
+}
+
+READING = "reading_id__"
+SCHEDULE = "reading_id__insp_schedule_id__"
+
+# API filter name -> lookup relative to the schedule
+SCHEDULE_FILTERS = {
+    "plant_id": "plant_id__plant_id",
+    "building": "building__building_id",
+    "item_code": "item_code__item_code",
+    "operation": "operation__operation_id",
+    "parameter_name": "inspection_parameter_name",
+}
+
+
+def chain_models(inspection_type):
+    """(schedule model, reading model, actual-reading model) for an inspection type."""
+    actual_model = READING_CHAINS[inspection_type]["actual_model"]
+    reading_model = actual_model._meta.get_field("reading_id").related_model
+    schedule_model = reading_model._meta.get_field("insp_schedule_id").related_model
+    return schedule_model, reading_model, actual_model
+
+
+def readings_state(inspection_types):
+    """
+    The highest id and latest ``updated_at`` of the reading and actual-reading
+    tables of each type. Every insert, and every change saved through the ORM,
+    moves it, at the cost of one aggregate per table instead of the readings
+    query.
+    """
+    state = []
+    for inspection_type in inspection_types:
+        for model in chain_models(inspection_type)[1:]:
+            mark = model.objects.aggregate(id=Max("id"), updated_at=Max("updated_at"))
+            state.append((mark["id"], mark["updated_at"]))
+    return state
+
+
+def schedule_lookups(inspection_type, filters, prefix=""):
+    """Lookups selecting the active schedules of a type that match the schedule-level ``filters``."""
+    lookups = {f"{prefix}is_active": True}
+    for key, value in READING_CHAINS[inspection_type]["schedule_filters"].items():
+        lookups[f"{prefix}{key}"] = value
+    for param, lookup in SCHEDULE_FILTERS.items():
+        value = filters.get(param)
+        if value:
+            lookups[f"{prefix}{lookup}"] = value
+    return lookups
+
+
+def actual_readings_queryset(inspection_type, filters):
+    """
+    Active actual readings for one inspection type, restricted by the
+    schedule-level filters and the PO/IO number in ``filters``.
+    """
+    chain = READING_CHAINS[inspection_type]
+    lookups = {
+        "is_active": True,
+        f"{READING}is_active": True,
+        **schedule_lookups(inspection_type, filters, SCHEDULE),
+    }
+    po_no = filters.get("po_no")
+    if po_no:  # io_no for Inward
+        lookups[f"{READING}{chain['order_field']}"] = po_no
+    return chain["actual_model"].objects.filter(**lookups)
+
+
+def reading_values(qs, inspection_type):
+    """
+    Flat ``values()`` rows with every column the reading payload needs.
+
+    The PO/IO number and the inspection type are exposed under the same
+    aliases for every chain, so rows from different chains can be unioned.
+    """
+    order_field = READING_CHAINS[inspection_type]["order_field"]
+    return qs.annotate(
+        insp_type=Value(inspection_type, output_field=CharField()),
+        order_no=F(f"{READING}{order_field}"),
+    ).values(
+        "id",
+        "r_key",
+        "r_value",
+        "created_at",
+        "created_by__username",
+        "reading_id",
+        f"{READING}remarks",
+        f"{READING}insp_schedule_id",
+        f"{SCHEDULE}plant_id__plant_id",
+        f"{SCHEDULE}plant_id__plant_name",
+        f"{SCHEDULE}building__building_id",
+        f"{SCHEDULE}building__building_name",
+        f"{SCHEDULE}item_code__item_code",
+        f"{SCHEDULE}item_code__item_description",
+        f"{SCHEDULE}item_code__unit",
+        f"{SCHEDULE}operation__operation_id",
+        f"{SCHEDULE}operation__operation_name",
+        f"{SCHEDULE}inspection_parameter_name",
+        f"{SCHEDULE}lsl",
+        f"{SCHEDULE}usl",
+        f"{SCHEDULE}target_value",
+        "insp_type",
+        "order_no",
+    )
+
+
+def serialize_reading(row):
+    """Map a ``reading_values`` row onto the actual-readings response shape."""
+    inspection_type = row["insp_type"]
+    order_field = READING_CHAINS[inspection_type]["order_field"]
+    created_at = row["created_at"]
+    operator = row["created_by__username"]
+    return {
+        'schedule_id': row[f"{READING}insp_schedule_id"],
+        'reading_id': row["reading_id"],
+        'actual_reading_id': row["id"],
+        'inspection_type': inspection_type,
+        'plant_id': row[f"{SCHEDULE}plant_id__plant_id"],
+        'plant_name': row[f"{SCHEDULE}plant_id__plant_name"],
+        'building_id': row[f"{SCHEDULE}building__building_id"],
+        'building_name': row[f"{SCHEDULE}building__building_name"],
+        'item_code': row[f"{SCHEDULE}item_code__item_code"],
+        'item_description': row[f"{SCHEDULE}item_code__item_description"],
+        'operation_id': row[f"{SCHEDULE}operation__operation_id"],
+        'operation_name': row[f"{SCHEDULE}operation__operation_name"],
+        'parameter_name': row[f"{SCHEDULE}inspection_parameter_name"],
+        order_field: row["order_no"],
+        'lsl': row[f"{SCHEDULE}lsl"],
+        'usl': row[f"{SCHEDULE}usl"],
+        'target_value': row[f"{SCHEDULE}target_value"],
+        'r_key': row["r_key"],
+        'r_value': row["r_value"],
+        'unit': row[f"{SCHEDULE}item_code__unit"] or '',
+        'timestamp': created_at.isoformat() if created_at else None,
+        'operator': operator if operator else 'N/A',
+        'remarks': row[f"{READING}remarks"],
+    }
+
+
+def parse_inspection_types(value):
+    """
+    Resolve the ``inspection_type`` query parameter to a list of chain names.
+
+    Accepts a single type, a comma separated list, or ``all``. Unknown names
+    are dropped, matching the single-type behaviour of returning no rows.
+    """
+    if not value:
+        return []
+    if value.strip().lower() == "all":
+        return list(READING_CHAINS)
+    types = []
+    for name in value.split(","):
+        name = name.strip()
+        if name in READING_CHAINS and name not in types:
+            types.append(name)
+    return types
+
+
+def readings_rows(inspection_types, filters):
+    """
+    ``reading_values`` rows for all matching readings, as one lazy queryset.
+
+    A single type keeps the schedule/reading order of the per-type endpoint;
+    several types are combined with ``UNION ALL`` and ordered by time.
+    """
+    if len(inspection_types) == 1:
+        inspection_type = inspection_types[0]
+        qs = actual_readings_queryset(inspection_type, filters).order_by(
+            f"{READING}insp_schedule_id", "reading_id", "id"
+        )
+        return reading_values(qs, inspection_type)
+    first, *rest = [
+        reading_values(actual_readings_queryset(t, filters).order_by(), t)
+        for t in inspection_types
+    ]
+    return first.union(*rest, all=True).order_by("created_at", "id")
+
+
+def fetch_readings(inspection_types, filters, rows=readings_rows):
+    """
+    All matching readings for the given inspection types, in a single query.
+
+    ``rows`` supplies the ``reading_values`` rows; ``reporting.flat`` passes
+    its materialized table here instead of the live chains.
+    """
+    if not inspection_types:
+        return []
+    return [serialize_reading(row) for row in rows(inspection_types, filters)]
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past ``row``."""
+    key = [row["created_at"].isoformat(), row["insp_type"], row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ValueError on anything malformed."""
+    try:
+        created_at, inspection_type, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if created_at is None or inspection_type not in READING_CHAINS or not isinstance(pk, int):
+        raise ValueError("invalid cursor")
+    return created_at, inspection_type, pk
+
+
+def keyset_q(inspection_type, after):
+    """
+    Rows of one chain that sort after ``after`` on (created_at, inspection type, id).
+
+    The inspection type is constant within a chain, so the comparison reduces
+    to a range on (created_at, id) that the database can seek on directly.
+    """
+    created_at, after_type, pk = after
+    if inspection_type > after_type:
+        return Q(created_at__gte=created_at)
+    if inspection_type < after_type:
+        return Q(created_at__gt=created_at)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+
+
+def ordered_readings(inspection_types, filters, after=None):
+    """
+    ``reading_values`` rows for the given types in keyset order, optionally
+    starting after a decoded cursor. The queryset is lazy, so callers can
+    slice it for a page or ``iterator()`` over it for streaming.
+    """
+    parts = []
+    for inspection_type in inspection_types:
+        qs = actual_readings_queryset(inspection_type, filters).order_by()
+        if after:
+            qs = qs.filter(keyset_q(inspection_type, after))
+        parts.append(reading_values(qs, inspection_type))
+    first, *rest = parts
+    rows = first.union(*rest, all=True) if rest else first
+    return rows.order_by("created_at", "insp_type", "id")
+
+
+def fetch_reading_page(inspection_types, filters, page_size, cursor=None, ordered=ordered_readings):
+    """One keyset page of readings and the cursor for the next page, if any."""
+    if not inspection_types:
+        return [], None
+    after = decode_cursor(cursor) if cursor else None
+    rows = list(ordered(inspection_types, filters, after)[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return [serialize_reading(row) for row in rows[:page_size]], next_cursor
+
+
+def stream_readings(inspection_types, filters, chunk_size=2000, ordered=ordered_readings):
+    """Yield serialized readings one at a time from a server-side cursor."""
+    if not inspection_types:
+        return
+    for row in ordered(inspection_types, filters).iterator(chunk_size=chunk_size):
+        yield serialize_reading(row)
+
+
+# Async counterparts for the ASGI views. Each runs the same single query as
+# its sync version through Django's async ORM.
+
+async def afetch_readings(inspection_types, filters, rows=readings_rows):
+    if not inspection_types:
+        return []
+    return [serialize_reading(row) async for row in rows(inspection_types, filters)]
+
+
+async def afetch_reading_page(inspection_types, filters, page_size, cursor=None, ordered=ordered_readings):
+    if not inspection_types:
+        return [], None
+    after = decode_cursor(cursor) if cursor else None
+    rows = [row async for row in ordered(inspection_types, filters, after)[:page_size + 1]]
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return [serialize_reading(row) for row in rows[:page_size]], next_cursor
+
+
+async def astream_readings(inspection_types, filters, chunk_size=2000, ordered=ordered_readings):
+    if not inspection_types:
+        return
+    async for row in ordered(inspection_types, filters).aiterator(chunk_size=chunk_size):
+        yield serialize_reading(row)
@@ -0,0 +1,169 @@
+"""
+In-process snapshot of the small, hot master tables.
+
+Plants, buildings, items and operations are read on almost every request to
+turn a code into a primary key or a primary key into a display name. The
+registry keeps all four in memory, one snapshot per worker process, so those
+lookups are dictionary hits instead of queries and joins:
+- ``records[model][pk]`` is a compact ``__slots__`` record.
+- ``ids(model, code)`` returns the primary keys of the rows with a code. Only plant codes
+  are unique; the others repeat across plants and buildings.
+- ``buildings_of(plant_pk)`` lists the sections of a plant.
+
+The FAI item and operation masters are left out: no view that uses the
+registry resolves them, so saving them does not cost every worker a reload.
+
+A snapshot is tagged with a version stamp kept in the cache. Saving or
+deleting a row of ``REGISTRY_MODELS`` drops this worker's snapshot and moves
+the stamp once the transaction commits, and every other worker rebuilds on its
+next lookup. Snapshots are always read from the primary database, even in
+views routed to the read replica, so a lagging replica is never stored under
+a fresh stamp. As with the master-data response cache, the stamp is only
+shared between processes when ``REDIS_URL`` points at a shared Redis, and
+``update()`` / ``bulk_create()`` do not send signals.
+
+Writes made by the plant application outside Django never move the stamp, so
+a snapshot is also rebuilt once it is older than ``MASTER_REGISTRY_MAX_AGE``
+seconds; that bounds how long such a change goes unseen.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404
+
+from .models import MasterPlantmaster, MasterBuildingsectionlab, MasterItemmaster, MasterOperationmaster
+
+VERSION_KEY = "master-registry:version"
+
+
+class Plant:
+    __slots__ = ("id", "code", "name")
+
+    def __init__(self, id, code, name):
+        self.id, self.code, self.name = id, code, name
+
+
+class Building:
+    __slots__ = ("id", "code", "name", "plant")
+
+    def __init__(self, id, code, name, plant):
+        self.id, self.code, self.name, self.plant = id, code, name, plant
+
+
+class Item:
+    __slots__ = ("id", "code", "description", "unit", "building", "plant")
+
+    def __init__(self, id, code, description, unit, building, plant):
+        self.id, self.code, self.description, self.unit = id, code, description, unit
+        self.building, self.plant = building, plant
+
+
+class Operation:
+    __slots__ = ("id", "code", "name", "building", "item", "plant")
+
+    def __init__(self, id, code, name, building, item, plant):
+        self.id, self.code, self.name = id, code, name
+        self.building, self.item, self.plant = building, item, plant
+
+
+# model -> (record class, columns in record argument order; the second one is the code)
+REGISTRY_MODELS = {
+    MasterPlantmaster: (Plant, ("id", "plant_id", "plant_name")),
+    MasterBuildingsectionlab: (Building, ("id", "building_id", "building_name", "plant_id")),
+    MasterItemmaster: (Item, ("id", "item_code", "item_description", "unit", "building_id", "plant_id")),
+    MasterOperationmaster: (Operation, ("id", "operation_id", "operation_name", "building_id", "item_code_id", "plant_id")),
+}
+
+
+class MasterRegistry:
+    __slots__ = ("version", "built_at", "records", "codes", "plant_buildings")
+
+    def __init__(self, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.records = {}
+        self.codes = {}
+        for model, (record, columns) in REGISTRY_MODELS.items():
+            records = {}
+            codes = {}
+            for row in model.objects.using(DEFAULT_DB_ALIAS).order_by("id").values_list(*columns).iterator():
+                entry = records[row[0]] = record(*row)
+                codes.setdefault(entry.code, []).append(entry.id)
+            self.records[model] = records
+            self.codes[model] = {code: tuple(ids) for code, ids in codes.items()}
+        plant_buildings = {}
+        for building in self.records[MasterBuildingsectionlab].values():
+            plant_buildings.setdefault(building.plant, []).append(building)
+        self.plant_buildings = {plant: tuple(buildings) for plant, buildings in plant_buildings.items()}
+
+    def is_current(self, version):
+        """Built at this stamp and not older than ``MASTER_REGISTRY_MAX_AGE``."""
+        return self.version == version and time.monotonic() - self.built_at < settings.MASTER_REGISTRY_MAX_AGE
+
+    def get(self, model, pk):
+        return self.records[model].get(pk)
+
+    def ids(self, model, code):
+        """Primary keys of the rows with this code (empty if there are none)."""
+        return self.codes[model].get(code, ())
+
+    def get_by_code_or_404(self, model, code):
+        """The row with this unique code, like ``get_object_or_404(model, <code field>=code)``."""
+        ids = self.ids(model, code)
+        if not ids:
+            raise Http404(f"No {model._meta.object_name} matches the given query.")
+        return self.records[model][ids[0]]
+
+    def buildings_of(self, plant_pk):
+        return self.plant_buildings.get(plant_pk, ())
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_registry_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def master_registry():
+    """
+    This worker's snapshot, rebuilt first if another worker (or this one)
+    changed master data or the snapshot has outlived its maximum age.
+    """
+    global _registry
+    version = get_registry_version()
+    registry = _registry
+    if registry is None or not registry.is_current(version):
+        with _lock:
+            registry = _registry
+            if registry is None or not registry.is_current(version):
+                registry = _registry = MasterRegistry(version)
+    return registry
+
+
+async def amaster_registry():
+    registry = _registry
+    if registry is not None and registry.is_current(await cache.aget(VERSION_KEY)):
+        return registry
+    return await sync_to_async(master_registry)()
+
+
+def expire_master_registry():
+    """Make every worker reload its snapshot, e.g. after a bulk load that sent no signals."""
+    global _registry
+    _registry = None
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_master_registry(sender, using=None, **kwargs):
+    """Signal receiver: rebuild every worker's snapshot once the change is committed."""
+    transaction.on_commit(expire_master_registry, using=using)
@@ -1,3 +1,4 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
 from .models import (
     MasterPlantmaster,
@@ -12,17 +13,88 @@ from .models import (
 )
 
 
-class MasterPlantmasterSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Honour a ``fields=a,b,c`` query parameter on reads by dropping every
+    other field, so list clients only pay for the columns they render.
+    Unknown names are ignored.
+    """
+
+    # serializer field -> model fields it reads, for fields that are not model fields themselves
+    sparse_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse = False
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return
+        requested = request.query_params.get("fields")
+        if not requested:
+            return
+        keep = {name.strip() for name in requested.split(",") if name.strip()}
+        if not keep & set(self.fields):
+            return
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+        self.sparse = True
+
+    def sparse_only_fields(self):
+        """
+        Model fields (``QuerySet.only()`` paths) the kept fields read, or
+        ``None`` when ``fields=`` did not narrow this serializer.
+        """
+        if not self.sparse:
+            return None
+        opts = self.Meta.model._meta
+        names = {opts.pk.name}
+        for name, field in self.fields.items():
+            if name in self.sparse_sources:
+                names.update(self.sparse_sources[name])
+                continue
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.concrete and not model_field.many_to_many:
+                names.add(model_field.name)
+        return names
+
+
+class SparseQuerysetMixin:
+    """
+    Viewset side of ``SparseFieldsetMixin``: a ``fields=`` read selects only
+    the columns those fields need instead of whole rows.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != "GET":
+            return queryset
+        only = self.get_serializer().sparse_only_fields()
+        if only is None:
+            return queryset
+        # only() cannot defer a relation that select_related() follows, so join just the ones still read
+        related = {name.split("__", 1)[0] for name in only if "__" in name}
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*only)
+
+
+class MasterPlantmasterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MasterPlantmaster
         fields = "__all__"
 
 
-class MasterProductionplannerSerializer(serializers.ModelSerializer):
+class MasterProductionplannerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Frontend expects a top-level 'plant' and 'item_code' field
     plant = serializers.SerializerMethodField()
     item_code = serializers.SerializerMethodField()
 
+    sparse_sources = {"plant": ("section__plant",), "item_code": ("item_code__item_code",)}
+
     class Meta:
         model = MasterProductionplanner
         fields = (
@@ -44,8 +116,9 @@ class MasterProductionplannerSerializer(serializers.ModelSerializer):
         )
 
     def get_plant(self, obj):
+        # plant_id is on the section row itself; no need to load the plant
         try:
-            return obj.section.plant.id
+            return obj.section.plant_id
         except Exception:
             return None
 
@@ -56,16 +129,18 @@ class MasterProductionplannerSerializer(serializers.ModelSerializer):
             return None
 
 
-class MasterItemmasterSerializer(serializers.ModelSerializer):
+class MasterItemmasterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MasterItemmaster
         fields = "__all__"
 
 
-class MasterParameterlistSerializer(serializers.ModelSerializer):
+class MasterParameterlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Provide item_code for frontend compatibility (not in model; leave empty string)
     item_code = serializers.SerializerMethodField()
 
+    sparse_sources = {"item_code": ()}
+
     class Meta:
         model = MasterParameterlist
         fields = (
@@ -81,31 +156,31 @@ class MasterParameterlistSerializer(serializers.ModelSerializer):
         return ""
 
 
-class MasterOperationmasterSerializer(serializers.ModelSerializer):
+class MasterOperationmasterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MasterOperationmaster
         fields = "__all__"
 
 
-class MasterBuildingsectionlabSerializer(serializers.ModelSerializer):
+class MasterBuildingsectionlabSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MasterBuildingsectionlab
         fields = "__all__"
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = "__all__"
 
 
-class RbacRoleSerializer(serializers.ModelSerializer):
+class RbacRoleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = RbacRole
         fields = "__all__"
 
 
-class MasterInspectionscheduleSerializer(serializers.ModelSerializer):
+class MasterInspectionscheduleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MasterInspectionschedule
         fields = "__all__"
@@ -0,0 +1,393 @@
+"""
+Statistical process control charts for one inspection schedule.
+
+Each reading header is a subgroup and its actual readings are the samples,
+oldest first. Three charts are offered:
+
+- ``xbar-r``: subgroup means and ranges. Sigma is estimated from the ranges
+  (the mean of R / d2(n)), so subgroups of different sizes each get their
+  own limits; with a constant size these are the usual A2/D3/D4 limits.
+- ``imr``: individual readings in time order and their moving ranges.
+- ``p``: the fraction of each subgroup outside the schedule's LSL/USL.
+
+The main chart (means, individuals or fractions) is checked against the
+Western Electric rules plus the Nelson trend and alternation rules, in one
+pass over the series with running counters. Range charts are only checked
+against their limits.
+
+A chart is cached per schedule under a version that is bumped whenever a
+reading of that schedule is written here (signals for single saves, an
+explicit bump from bulk ingestion), and under the schedule's highest actual
+reading id, so readings written by the shop-floor application outside Django
+are picked up on the next request too. Asking again costs two cache reads
+and one indexed ``MAX`` query until the data changes.
+"""
+import math
+import time
+from collections import Counter
+from statistics import fmean
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .readings import READING, READING_CHAINS, actual_readings_queryset, chain_models
+
+SPC_CHARTS = ("xbar-r", "imr", "p")
+DEFAULT_SPC_SUBGROUPS = 500
+MAX_SPC_SUBGROUPS = 5000
+
+# subgroup size -> (d2, d3): mean and standard deviation of the relative range
+RANGE_CONSTANTS = {
+    2: (1.128, 0.853), 3: (1.693, 0.888), 4: (2.059, 0.880), 5: (2.326, 0.864),
+    6: (2.534, 0.848), 7: (2.704, 0.833), 8: (2.847, 0.820), 9: (2.970, 0.808),
+    10: (3.078, 0.797), 11: (3.173, 0.787), 12: (3.258, 0.778), 13: (3.336, 0.770),
+    14: (3.407, 0.763), 15: (3.472, 0.756), 16: (3.532, 0.750), 17: (3.588, 0.744),
+    18: (3.640, 0.739), 19: (3.689, 0.733), 20: (3.735, 0.729), 21: (3.778, 0.724),
+    22: (3.819, 0.720), 23: (3.858, 0.716), 24: (3.895, 0.712), 25: (3.931, 0.708),
+}
+
+# rule -> what it flags; a rule is reported on the point that completes it
+SPC_RULES = {
+    "beyond_3_sigma": "One point beyond 3 sigma (Western Electric 1)",
+    "two_of_three_beyond_2_sigma": "2 of 3 consecutive points beyond 2 sigma on the same side (Western Electric 2)",
+    "four_of_five_beyond_1_sigma": "4 of 5 consecutive points beyond 1 sigma on the same side (Western Electric 3)",
+    "eight_on_one_side": "8 consecutive points on the same side of the center line (Western Electric 4)",
+    "six_trending": "6 consecutive points steadily increasing or decreasing (Nelson 3)",
+    "fourteen_alternating": "14 consecutive points alternating up and down (Nelson 4)",
+    "beyond_limits": "Range beyond its control limits",
+}
+
+
+def sigma_scores(values, centers, sigmas):
+    """Each point's distance from its center line, in sigmas."""
+    scores = []
+    for value, center, sigma in zip(values, centers, sigmas):
+        if sigma:
+            scores.append((value - center) / sigma)
+        else:
+            # No spread at all: anything off the center line is out of control
+            scores.append(0.0 if value == center else math.copysign(math.inf, value - center))
+    return scores
+
+
+def check_rules(values, scores):
+    """Rules broken at each point of the main chart, as one list per point."""
+    flagged = [[] for _ in values]
+    above = below = rising = falling = alternating = 0
+    for i, z in enumerate(scores):
+        if abs(z) > 3:
+            flagged[i].append("beyond_3_sigma")
+        side = 1 if z > 0 else -1 if z < 0 else 0
+        if side:
+            window = scores[max(i - 2, 0):i + 1]
+            if abs(z) > 2 and sum(1 for s in window if s * side > 2) >= 2:
+                flagged[i].append("two_of_three_beyond_2_sigma")
+            window = scores[max(i - 4, 0):i + 1]
+            if abs(z) > 1 and sum(1 for s in window if s * side > 1) >= 4:
+                flagged[i].append("four_of_five_beyond_1_sigma")
+        above = above + 1 if side > 0 else 0
+        below = below + 1 if side < 0 else 0
+        if above >= 8 or below >= 8:
+            flagged[i].append("eight_on_one_side")
+        if i:
+            step = values[i] - values[i - 1]
+            rising = rising + 1 if step > 0 else 0
+            falling = falling + 1 if step < 0 else 0
+            previous = values[i - 1] - values[i - 2] if i > 1 else 0
+            alternating = alternating + 1 if step * previous < 0 else (1 if step else 0)
+            if rising >= 5 or falling >= 5:
+                flagged[i].append("six_trending")
+            if alternating >= 13:
+                flagged[i].append("fourteen_alternating")
+    return flagged
+
+
+def schedule_spec(inspection_type, schedule_id):
+    schedule_model, _, _ = chain_models(inspection_type)
+    return schedule_model.objects.filter(
+        pk=schedule_id, is_active=True, **READING_CHAINS[inspection_type]["schedule_filters"]
+    ).values(
+        "id", "inspection_parameter_name", "lsl", "usl", "target_value",
+        "sample_size", "control_limit", "item_code__unit",
+    ).first()
+
+
+def schedule_subgroups(inspection_type, schedule_id, limit):
+    """
+    ``(reading_id, timestamp, [values])`` for the latest ``limit`` reading
+    headers of the schedule, oldest first, in one query.
+    """
+    _, reading_model, _ = chain_models(inspection_type)
+    latest = (
+        reading_model.objects.filter(insp_schedule_id=schedule_id, is_active=True)
+        .order_by("-created_at", "-id")
+        .values("id")[:limit]
+    )
+    rows = (
+        actual_readings_queryset(inspection_type, {})
+        .filter(reading_id__in=latest, r_value__isnull=False)
+        .order_by(f"{READING}created_at", "reading_id", "id")
+        .values_list("reading_id", f"{READING}created_at", "r_value")
+    )
+    subgroups = []
+    for reading_id, created_at, value in rows.iterator(chunk_size=5000):
+        if not math.isfinite(value):
+            continue
+        if not subgroups or subgroups[-1][0] != reading_id:
+            subgroups.append((reading_id, created_at, []))
+        subgroups[-1][2].append(value)
+    return subgroups
+
+
+def violations_list(points, chart, flagged):
+    return [
+        {"rule": rule, "chart": chart, "index": i, "reading_id": points[i]["reading_id"], "timestamp": points[i]["timestamp"]}
+        for i, rules in enumerate(flagged)
+        for rule in rules
+    ]
+
+
+def xbar_r_chart(subgroups):
+    largest = max(len(values) for _, _, values in subgroups)
+    if largest > max(RANGE_CONSTANTS):
+        raise ValueError(f"xbar-r needs subgroups of at most {max(RANGE_CONSTANTS)} readings; use chart=imr")
+    ratios = [
+        (max(values) - min(values)) / RANGE_CONSTANTS[len(values)][0]
+        for _, _, values in subgroups
+        if len(values) > 1
+    ]
+    if not ratios:
+        raise ValueError("xbar-r needs subgroups of at least 2 readings; use chart=imr")
+    sigma = fmean(ratios)
+    grand_mean = sum(sum(values) for _, _, values in subgroups) / sum(len(values) for _, _, values in subgroups)
+
+    points, errors, range_flags = [], [], []
+    for reading_id, created_at, values in subgroups:
+        n = len(values)
+        error = sigma / math.sqrt(n)
+        point = {
+            "reading_id": reading_id,
+            "timestamp": created_at.isoformat(),
+            "n": n,
+            "mean": fmean(values),
+            "ucl": grand_mean + 3 * error,
+            "lcl": grand_mean - 3 * error,
+            "range": None,
+            "range_center": None,
+            "range_ucl": None,
+            "range_lcl": None,
+        }
+        out_of_range = False
+        if n > 1:
+            d2, d3 = RANGE_CONSTANTS[n]
+            point["range"] = max(values) - min(values)
+            point["range_center"] = d2 * sigma
+            point["range_ucl"] = (d2 + 3 * d3) * sigma
+            point["range_lcl"] = max(d2 - 3 * d3, 0.0) * sigma
+            out_of_range = not point["range_lcl"] <= point["range"] <= point["range_ucl"]
+        points.append(point)
+        errors.append(error)
+        range_flags.append(["beyond_limits"] if out_of_range else [])
+
+    means = [p["mean"] for p in points]
+    flagged = check_rules(means, sigma_scores(means, [grand_mean] * len(means), errors))
+    # Limits at the most common subgroup size, for drawing one pair of lines
+    n = Counter(p["n"] for p in points).most_common(1)[0][0]
+    limits = {
+        "x": {"center": grand_mean, "ucl": grand_mean + 3 * sigma / math.sqrt(n), "lcl": grand_mean - 3 * sigma / math.sqrt(n)},
+        "r": None,
+        "n": n,
+    }
+    if n > 1:
+        d2, d3 = RANGE_CONSTANTS[n]
+        limits["r"] = {"center": d2 * sigma, "ucl": (d2 + 3 * d3) * sigma, "lcl": max(d2 - 3 * d3, 0.0) * sigma}
+    return sigma, limits, points, flagged, violations_list(points, "x", flagged) + violations_list(points, "r", range_flags)
+
+
+def imr_chart(subgroups):
+    samples = [
+        (reading_id, created_at, value)
+        for reading_id, created_at, values in subgroups
+        for value in values
+    ]
+    if len(samples) < 2:
+        raise ValueError("imr needs at least 2 readings")
+    values = [value for _, _, value in samples]
+    mean = fmean(values)
+    moving_ranges = [abs(b - a) for a, b in zip(values, values[1:])]
+    average_mr = fmean(moving_ranges)
+    d2, d3 = RANGE_CONSTANTS[2]
+    sigma = average_mr / d2
+    limits = {
+        "i": {"center": mean, "ucl": mean + 3 * sigma, "lcl": mean - 3 * sigma},
+        "mr": {"center": average_mr, "ucl": (d2 + 3 * d3) * sigma, "lcl": 0.0},
+    }
+    points = [
+        {
+            "reading_id": reading_id,
+            "timestamp": created_at.isoformat(),
+            "value": value,
+            "moving_range": moving_ranges[i - 1] if i else None,
+        }
+        for i, (reading_id, created_at, value) in enumerate(samples)
+    ]
+    flagged = check_rules(values, sigma_scores(values, [mean] * len(values), [sigma] * len(values)))
+    mr_flags = [
+        ["beyond_limits"] if p["moving_range"] is not None and p["moving_range"] > limits["mr"]["ucl"] else []
+        for p in points
+    ]
+    return sigma, limits, points, flagged, violations_list(points, "i", flagged) + violations_list(points, "mr", mr_flags)
+
+
+def p_chart(subgroups, lsl, usl):
+    if lsl is None and usl is None:
+        raise ValueError("p needs the schedule's lsl and/or usl")
+    defectives = [
+        sum(1 for v in values if (lsl is not None and v < lsl) or (usl is not None and v > usl))
+        for _, _, values in subgroups
+    ]
+    p_bar = sum(defectives) / sum(len(values) for _, _, values in subgroups)
+    points, errors = [], []
+    for (reading_id, created_at, values), d in zip(subgroups, defectives):
+        n = len(values)
+        error = math.sqrt(p_bar * (1 - p_bar) / n)
+        points.append({
+            "reading_id": reading_id,
+            "timestamp": created_at.isoformat(),
+            "n": n,
+            "defectives": d,
+            "p": d / n,
+            "ucl": min(p_bar + 3 * error, 1.0),
+            "lcl": max(p_bar - 3 * error, 0.0),
+        })
+        errors.append(error)
+    fractions = [p["p"] for p in points]
+    flagged = check_rules(fractions, sigma_scores(fractions, [p_bar] * len(points), errors))
+    n = Counter(p["n"] for p in points).most_common(1)[0][0]
+    error = math.sqrt(p_bar * (1 - p_bar) / n)
+    limits = {"p": {"center": p_bar, "ucl": min(p_bar + 3 * error, 1.0), "lcl": max(p_bar - 3 * error, 0.0)}, "n": n}
+    return None, limits, points, flagged, violations_list(points, "p", flagged)
+
+
+def control_chart(inspection_type, schedule_id, chart, subgroups=DEFAULT_SPC_SUBGROUPS):
+    """
+    Limits, points and rule violations for one schedule, or ``None`` when the
+    schedule does not exist or has no readings. ``ValueError`` when the chart
+    does not apply to the readings.
+    """
+    spec = schedule_spec(inspection_type, schedule_id)
+    if spec is None:
+        return None
+    groups = schedule_subgroups(inspection_type, schedule_id, subgroups)
+    if not groups:
+        return None
+    if chart == "xbar-r":
+        sigma, limits, points, flagged, violations = xbar_r_chart(groups)
+    elif chart == "imr":
+        sigma, limits, points, flagged, violations = imr_chart(groups)
+    else:
+        sigma, limits, points, flagged, violations = p_chart(groups, spec["lsl"], spec["usl"])
+    for point, rules in zip(points, flagged):
+        point["violations"] = rules
+
+    counts = {}
+    for violation in violations:
+        counts[violation["rule"]] = counts.get(violation["rule"], 0) + 1
+    return {
+        "schedule": {
+            "id": spec["id"],
+            "inspection_type": inspection_type,
+            "parameter": spec["inspection_parameter_name"],
+            "lsl": spec["lsl"],
+            "usl": spec["usl"],
+            "target": spec["target_value"],
+            "unit": spec["item_code__unit"] or "",
+            "sample_size": spec["sample_size"],
+            "control_limit": spec["control_limit"],
+        },
+        "chart": chart,
+        "subgroups": len(groups),
+        "readings": sum(len(values) for _, _, values in groups),
+        "sigma": sigma,
+        "limits": limits,
+        "in_control": not violations,
+        "violation_counts": counts,
+        "rules": {rule: SPC_RULES[rule] for rule in counts},
+        "violations": violations,
+        "points": points,
+    }
+
+
+def spc_version_key(inspection_type, schedule_id):
+    return f"spc:version:{inspection_type}:{schedule_id}"
+
+
+def get_spc_version(inspection_type, schedule_id):
+    key = spc_version_key(inspection_type, schedule_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_spc_versions(inspection_type, schedule_ids, using=None):
+    """
+    Move the cached charts of these schedules to a new version once the
+    current transaction on ``using`` commits (at once outside a transaction),
+    so no chart read before the commit is cached under the new version.
+    """
+    keys = [spc_version_key(inspection_type, schedule_id) for schedule_id in set(schedule_ids)]
+    transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), None), using=using)
+
+
+def reading_high_water_mark(inspection_type, schedule_id):
+    """
+    The highest active actual-reading id of the schedule. It moves with every
+    reading inserted, whichever application wrote it, and is served by the
+    ``reading_id`` index without touching the readings themselves.
+    """
+    _, _, actual_model = chain_models(inspection_type)
+    return actual_model.objects.filter(
+        is_active=True, **{f"{READING}insp_schedule_id": schedule_id}
+    ).aggregate(mark=Max("id"))["mark"]
+
+
+def cached_control_chart(inspection_type, schedule_id, chart, subgroups=DEFAULT_SPC_SUBGROUPS):
+    """``control_chart`` through the cache, at the schedule's current version and high-water mark."""
+    version = get_spc_version(inspection_type, schedule_id)
+    mark = reading_high_water_mark(inspection_type, schedule_id)
+    key = f"spc:{inspection_type}:{schedule_id}:{version}:{mark}:{chart}:{subgroups}"
+    result = cache.get(key)
+    if result is None:
+        result = control_chart(inspection_type, schedule_id, chart, subgroups)
+        if result is not None:
+            cache.set(key, result, settings.SPC_CACHE_TIMEOUT)
+    return result
+
+
+def spc_models():
+    """Models whose saves and deletes change a schedule's charts."""
+    return list(dict.fromkeys(model for t in READING_CHAINS for model in chain_models(t)))
+
+
+def bump_spc_version(sender, instance, using=None, **kwargs):
+    """Signal receiver: invalidate the charts of the schedule a saved or deleted row belongs to."""
+    for inspection_type, chain in READING_CHAINS.items():
+        schedule_model, reading_model, actual_model = chain_models(inspection_type)
+        if sender is actual_model:
+            schedule_ids = reading_model.objects.using(using).filter(pk=instance.reading_id_id).values_list(
+                "insp_schedule_id", flat=True
+            )
+        elif sender is reading_model:
+            schedule_ids = [instance.insp_schedule_id_id]
+        elif sender is schedule_model and all(
+            getattr(instance, field) == value for field, value in chain["schedule_filters"].items()
+        ):
+            # spec limits feed the p chart
+            schedule_ids = [instance.pk]
+        else:
+            continue
+        bump_spc_versions(inspection_type, list(schedule_ids), using=using)
@@ -0,0 +1,88 @@
+"""
+Small master-data and reading trees for the API tests.
+
+``master_data()`` builds one plant with a section, an item, an operation and
+a parameter (plus the FAI item and operation the Final chain needs), and
+``schedule()`` / ``readings()`` hang inspection schedules and readings off it.
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.utils import timezone
+
+from api.models import (
+    MasterBuildingsectionlab,
+    MasterFaiitemmaster,
+    MasterFaioperationmaster,
+    MasterFaiinspectionschedule,
+    MasterInspectionschedule,
+    MasterItemmaster,
+    MasterOperationmaster,
+    MasterParameterlist,
+    MasterPlantmaster,
+)
+from api.readings import chain_models
+
+
+def master_data(code="P1"):
+    plant = MasterPlantmaster.objects.create(plant_id=code, plant_name=f"Plant {code}")
+    building = MasterBuildingsectionlab.objects.create(building_id="B1", building_name="Cup Section", plant=plant)
+    item = MasterItemmaster.objects.create(
+        item_code="CUP-01", item_description="Cup", unit="mm", item_type="BO", building=building, plant=plant,
+    )
+    operation = MasterOperationmaster.objects.create(
+        operation_id="OP10", operation_name="Cupping", building=building, item_code=item, plant=plant,
+    )
+    fai_item = MasterFaiitemmaster.objects.create(
+        item_code="CASE-01", item_description="Case", unit="mm", item_type="FG", building=building, plant=plant,
+    )
+    fai_operation = MasterFaioperationmaster.objects.create(
+        operation_id="OP90", operation_name="Final gauging", building=building, item_code=fai_item, plant=plant,
+    )
+    parameter = MasterParameterlist.objects.create(
+        inspection_parameter_id="PR1", inspection_parameter="Length", plant=plant,
+    )
+    return SimpleNamespace(
+        plant=plant, building=building, item=item, operation=operation,
+        fai_item=fai_item, fai_operation=fai_operation, parameter=parameter,
+    )
+
+
+def schedule(master, inspection_type, lsl=9.0, usl=11.0, **fields):
+    """An active schedule of ``master`` for one inspection type, measuring 'Length'."""
+    target_value = (lsl + usl) / 2 if lsl is not None and usl is not None else None
+    values = dict(
+        inspection_parameter_name="Length", lsl=lsl, target_value=target_value, usl=usl,
+        building=master.building, inspection_parameter_id=master.parameter, plant_id=master.plant,
+    )
+    if inspection_type == "Final":
+        values.update(item_code=master.fai_item, operation=master.fai_operation)
+        model = MasterFaiinspectionschedule
+    else:
+        values.update(item_code=master.item, operation=master.operation, inspection_type=inspection_type)
+        model = MasterInspectionschedule
+    values.update(fields)
+    return model.objects.create(**values)
+
+
+def readings(inspection_type, schedule, values, order_no="PO1", at=None):
+    """
+    One reading header of ``schedule`` per entry of ``values``, each with
+    that entry's r_values as its actual readings; headers are one minute
+    apart, oldest first. Returns the headers.
+    """
+    _, reading_model, actual_model = chain_models(inspection_type)
+    order_field = "io_no" if inspection_type == "Inward" else "po_no"
+    start = at or timezone.now() - timedelta(minutes=len(values))
+    headers = []
+    for offset, samples in enumerate(values):
+        header = reading_model.objects.create(insp_schedule_id=schedule, **{order_field: order_no})
+        created_at = start + timedelta(minutes=offset)
+        actuals = actual_model.objects.bulk_create(
+            actual_model(reading_id=header, r_key=f"r{n}", r_value=value) for n, value in enumerate(samples, 1)
+        )
+        # auto_now_add ignores a passed value; date the rows explicitly
+        reading_model.objects.filter(pk=header.pk).update(created_at=created_at)
+        actual_model.objects.filter(pk__in=[a.pk for a in actuals]).update(created_at=created_at)
+        headers.append(header)
+    return headers
@@ -0,0 +1,211 @@
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase, TestCase
+
+from api.analytics import (
+    SPEC_BUCKET_LABELS, analytics_querysets, capability, lttb, merge_moments, spec_bucket_counts,
+)
+
+from .fixtures import master_data, readings, schedule
+
+DISTRIBUTION_URL = "/api/parameters/distribution/"
+LSL_USL_DISTRIBUTION_URL = "/api/parameters/lsl-usl-distribution/"
+
+
+def part(values):
+    """An aggregate row like the per-type SQL in ``summary_stats`` (population variance)."""
+    if not values:
+        return {"count": 0, "mean": None, "variance": None, "min": None, "max": None}
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "variance": statistics.pvariance(values) if len(values) > 1 else 0.0,
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+class MergeMomentsTests(SimpleTestCase):
+    def test_matches_a_direct_computation(self):
+        rng = random.Random(7)
+        groups = [[rng.gauss(10, 0.02) for _ in range(n)] for n in (1, 5, 40, 0, 13)]
+        values = [v for group in groups for v in group]
+        merged = merge_moments([part(group) for group in groups])
+        self.assertEqual(merged["count"], len(values))
+        self.assertAlmostEqual(merged["mean"], statistics.fmean(values), places=12)
+        self.assertAlmostEqual(merged["stddev"], statistics.stdev(values), places=12)
+        self.assertEqual((merged["min"], merged["max"]), (min(values), max(values)))
+
+    def test_precise_for_a_tight_spread_around_a_large_mean(self):
+        values = [1e6 + d for d in (0.001, 0.002, 0.003, 0.004)]
+        merged = merge_moments([part(values[:1]), part(values[1:])])
+        self.assertAlmostEqual(merged["stddev"], statistics.stdev(values), places=9)
+
+    def test_single_reading_has_no_stddev(self):
+        merged = merge_moments([part([10.0])])
+        self.assertEqual(merged["count"], 1)
+        self.assertIsNone(merged["stddev"])
+
+    def test_no_readings(self):
+        self.assertIsNone(merge_moments([part([]), part([])]))
+
+
+class CapabilityTests(SimpleTestCase):
+    def test_centered_process(self):
+        cp, cpk = capability(10.0, 0.5, 8.5, 11.5)
+        self.assertAlmostEqual(cp, 1.0)
+        self.assertAlmostEqual(cpk, 1.0)
+
+    def test_off_center_process_uses_the_nearer_limit(self):
+        cp, cpk = capability(11.0, 0.5, 8.5, 11.5)
+        self.assertAlmostEqual(cp, 1.0)
+        self.assertAlmostEqual(cpk, 1 / 3)
+
+    def test_one_sided_and_undefined(self):
+        self.assertEqual(capability(10.0, 0.5, None, 11.5), (None, 1.0))
+        self.assertEqual(capability(10.0, None, 8.5, 11.5), (None, None))
+        self.assertEqual(capability(10.0, 0.0, 8.5, 11.5), (None, None))
+
+
+class LttbTests(SimpleTestCase):
+    def rows(self, n):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        rng = random.Random(n)
+        return [(start + timedelta(minutes=i), rng.random()) for i in range(n)]
+
+    def test_size_and_endpoints(self):
+        rows = self.rows(1000)
+        for threshold in (3, 10, 97, 500, 999):
+            sampled = lttb(rows, threshold)
+            self.assertEqual(len(sampled), threshold)
+            self.assertEqual(sampled[0], rows[0])
+            self.assertEqual(sampled[-1], rows[-1])
+
+    def test_keeps_original_points_in_order(self):
+        rows = self.rows(500)
+        sampled = lttb(rows, 50)
+        positions = [rows.index(row) for row in sampled]
+        self.assertEqual(positions, sorted(set(positions)))
+
+    def test_keeps_a_spike(self):
+        rows = [(ts, 0.0) for ts, _ in self.rows(300)]
+        rows[150] = (rows[150][0], 100.0)
+        self.assertIn(rows[150], lttb(rows, 20))
+
+    def test_short_series_are_returned_unchanged(self):
+        rows = self.rows(10)
+        self.assertIs(lttb(rows, 10), rows)
+        self.assertIs(lttb(rows, 50), rows)
+        self.assertIs(lttb(rows, 2), rows)
+
+
+class ParameterDistributionViewTests(TestCase):
+    def setUp(self):
+        self.schedule = schedule(master_data(), "In-process")
+
+    def histogram(self, values, bins=5):
+        readings("In-process", self.schedule, [values])
+        response = self.client.get(
+            DISTRIBUTION_URL, {"context": "In-process", "factoryId": "P1", "parameter": "Length", "bins": bins}
+        )
+        self.assertEqual(response.status_code, 200)
+        (histogram,) = response.json()["histograms"]
+        return histogram
+
+    def test_bin_edges_split_the_observed_range(self):
+        histogram = self.histogram([0.0, 10.0], bins=5)
+        self.assertEqual(histogram["bin_width"], 2.0)
+        self.assertEqual(
+            [(b["lower"], b["upper"]) for b in histogram["bins"]],
+            [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0), (6.0, 8.0), (8.0, 10.0)],
+        )
+
+    def test_lower_edges_are_inclusive_and_the_maximum_lands_in_the_last_bin(self):
+        histogram = self.histogram([0.0, 1.9, 2.0, 4.0, 9.9, 10.0], bins=5)
+        self.assertEqual([b["count"] for b in histogram["bins"]], [2, 1, 1, 0, 2])
+        self.assertEqual(histogram["count"], 6)
+
+    def test_out_of_spec_is_counted_per_bin(self):
+        # the fixture schedule's spec is 9..11
+        histogram = self.histogram([8.0, 9.0, 10.0, 11.0, 12.0], bins=4)
+        self.assertEqual([b["out_of_spec"] for b in histogram["bins"]], [1, 0, 0, 1])
+
+    def test_constant_readings_fill_one_unit_wide_bin(self):
+        histogram = self.histogram([5.0, 5.0, 5.0], bins=3)
+        self.assertEqual(histogram["bin_width"], 1.0)
+        self.assertEqual(histogram["bins"][0], {"lower": 5.0, "upper": 6.0, "count": 3, "out_of_spec": 3})
+        self.assertEqual([b["count"] for b in histogram["bins"][1:]], [0, 0])
+
+    def test_no_readings(self):
+        response = self.client.get(DISTRIBUTION_URL, {"context": "In-process", "factoryId": "P1"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_bins_must_be_positive(self):
+        response = self.client.get(DISTRIBUTION_URL, {"bins": "0"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ParameterLSLUSLDistributionViewTests(TestCase):
+    def setUp(self):
+        self.master = master_data()
+
+    def distribution(self, values, **limits):
+        insp_schedule = schedule(self.master, "In-process", **limits)
+        readings("In-process", insp_schedule, [values])
+        response = self.client.get(
+            LSL_USL_DISTRIBUTION_URL, {"inspection_type": "In-process", "factoryId": "P1", "parameter": "Length"}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counts(self, result):
+        self.assertEqual([b["label"] for b in result["buckets"]], list(SPEC_BUCKET_LABELS))
+        return [b["count"] for b in result["buckets"]]
+
+    def test_limits_and_slice_edges(self):
+        # spec 9..11: slices start at 9.0, 9.4, 9.8, 10.2 and 10.6; each edge belongs to the slice above it
+        result = self.distribution([8.9, 9.0, 9.4, 9.8, 10.2, 10.6, 10.59, 11.0, 11.01])
+        self.assertEqual(result["range"], {"lower": 9.0, "upper": 11.0, "derived": False})
+        self.assertEqual((result["spec"]["lsl"], result["spec"]["usl"]), (9.0, 11.0))
+        self.assertEqual(self.counts(result), [1, 1, 1, 1, 2, 2, 1])
+        self.assertEqual(result["count"], 9)
+
+    def test_missing_lsl_slices_the_observed_range(self):
+        result = self.distribution([2.0, 4.0, 12.0], lsl=None)
+        self.assertEqual(result["range"], {"lower": 2.0, "upper": 12.0, "derived": True})
+        self.assertEqual(self.counts(result), [0, 1, 1, 0, 0, 1, 0])
+
+    def test_missing_usl_slices_the_observed_range(self):
+        result = self.distribution([2.0, 12.0], usl=None)
+        self.assertEqual(result["range"], {"lower": 2.0, "upper": 12.0, "derived": True})
+        self.assertEqual(self.counts(result), [0, 1, 0, 0, 0, 1, 0])
+
+    def test_schedule_without_spec(self):
+        result = self.distribution([5.0, 6.0, 7.0], lsl=None, usl=None)
+        self.assertEqual((result["spec"]["lsl"], result["spec"]["usl"]), (None, None))
+        self.assertEqual(result["range"], {"lower": 5.0, "upper": 7.0, "derived": True})
+        self.assertEqual(self.counts(result), [0, 1, 0, 1, 0, 1, 0])
+
+    def test_equal_limits_and_a_constant_series_use_a_unit_range(self):
+        result = self.distribution([5.0, 5.0], lsl=10.0, usl=10.0)
+        self.assertEqual(result["range"], {"lower": 5.0, "upper": 6.0, "derived": True})
+        self.assertEqual(self.counts(result), [0, 2, 0, 0, 0, 0, 0])
+
+    def test_no_readings(self):
+        response = self.client.get(LSL_USL_DISTRIBUTION_URL, {"factoryId": "P1", "parameter": "Length"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "No readings found"})
+
+    def test_days_must_be_positive(self):
+        response = self.client.get(LSL_USL_DISTRIBUTION_URL, {"days": "0"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SpecBucketCountsTests(TestCase):
+    def test_inverted_range_counts_only_the_out_of_range_buckets(self):
+        insp_schedule = schedule(master_data(), "In-process")
+        readings("In-process", insp_schedule, [[1.0, 5.0, 9.0]])
+        querysets = analytics_querysets(["In-process"], {})
+        self.assertEqual(spec_bucket_counts(querysets, 6.0, 4.0), ([2, 0, 0, 0, 0, 0, 1], 3))
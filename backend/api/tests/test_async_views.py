@@ -0,0 +1,80 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
+
+from api import async_views
+from api.models import MasterProductionplanner
+from api.readings import READING_CHAINS
+
+from .fixtures import master_data, readings, schedule
+
+
+class AsyncReadViewTests(TestCase):
+    """Each async chatbot view answers exactly like the sync APIView it replaces under ASGI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        master = master_data()
+        MasterProductionplanner.objects.create(order_number="PO1", item_code=master.item, section=master.building)
+        for inspection_type in READING_CHAINS:
+            readings(inspection_type, schedule(master, inspection_type), [[9.9, 10.1], [10.0]])
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+
+    async def body(self, response):
+        if not response.streaming:
+            return response.content
+        if response.is_async:
+            return b"".join([chunk async for chunk in response.streaming_content])
+        # a sync stream queries the database as it is consumed
+        return await sync_to_async(b"".join)(response.streaming_content)
+
+    async def assert_same(self, view, path, *args, data=None):
+        """The async view's status and body against the sync view behind the same URL."""
+        cache.clear()
+        if data is None:
+            sync = await self.async_client.get(path)
+            response = await view(self.factory.get(path), *args)
+        else:
+            payload = json.dumps(data)
+            sync = await self.async_client.post(path, payload, content_type="application/json")
+            response = await view(self.factory.post(path, payload, content_type="application/json"), *args)
+        self.assertEqual(response.status_code, sync.status_code, path)
+        self.assertEqual(await self.body(response), await self.body(sync), path)
+
+    async def test_initial_data(self):
+        await self.assert_same(async_views.initial_data, "/api/initial-data/")
+        await self.assert_same(async_views.initial_data, "/api/initial-data/?format=columnar")
+
+    async def test_sections_by_factory(self):
+        await self.assert_same(async_views.sections_by_factory, "/api/factories/P1/sections/", "P1")
+        await self.assert_same(async_views.sections_by_factory, "/api/factories/NOPE/sections/", "NOPE")
+
+    async def test_purchase_order_status(self):
+        await self.assert_same(async_views.purchase_order_status, "/api/purchase-orders/PO1/status/", "PO1")
+        await self.assert_same(async_views.purchase_order_status, "/api/purchase-orders/NOPE/status/", "NOPE")
+
+    async def test_inspections_filter(self):
+        for data in ({"factoryId": "P1"}, {"factoryId": "P1", "parameter": "Length"}, {"factoryId": "NOPE"}, {}):
+            await self.assert_same(async_views.inspections_filter, "/api/inspections/filter/", data=data)
+
+    async def test_actual_readings(self):
+        url = "/api/inspections/actual-readings/"
+        for query in (
+            "inspection_type=all",
+            "inspection_type=Final",
+            "inspection_type=all&page_size=2",
+            "inspection_type=all&stream=true",
+            "inspection_type=all&cursor=bogus",
+            "inspection_type=all&page_size=0",
+            "",
+        ):
+            await self.assert_same(async_views.actual_inspection_readings, f"{url}?{query}")
+
+    async def test_reading_export(self):
+        url = "/api/inspections/readings/export/"
+        for query in ("inspection_type=all", "inspection_type=In-process&output=csv", "inspection_type=all&output=xml", ""):
+            await self.assert_same(async_views.reading_export, f"{url}?{query}")
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.caching import get_master_data_version
+from api.models import MasterPlantmaster
+
+from .fixtures import master_data
+
+URL = "/api/plants/"
+
+
+class MasterDataVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_moves_only_when_the_transaction_commits(self):
+        before = get_master_data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            MasterPlantmaster.objects.create(plant_id="P2", plant_name="Plant 2")
+            # a request running now still sees the old rows, so it must see the old version too
+            self.assertEqual(get_master_data_version(), before)
+        self.assertGreater(get_master_data_version(), before)
+
+    def test_committed_change_reaches_the_cached_list(self):
+        master_data()
+        self.assertEqual(self.client.get(URL).json()["count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            MasterPlantmaster.objects.create(plant_id="P2", plant_name="Plant 2")
+        self.assertEqual(self.client.get(URL).json()["count"], 2)
+
+
+class MasterDataETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        master_data()
+
+    def setUp(self):
+        cache.clear()
+
+    def etag(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_each_representation_has_its_own_etag(self):
+        etags = {
+            self.etag(URL),
+            self.etag(f"{URL}?fields=id"),
+            self.etag(f"{URL}?page_size=1"),
+            self.etag(f"{URL}?format=columnar"),
+        }
+        self.assertEqual(len(etags), 4)
+
+    def test_matching_etag_is_answered_with_304(self):
+        etag = self.etag(URL)
+        self.assertEqual(self.client.get(URL, headers={"if-none-match": etag}).status_code, 304)
+
+    def test_etag_of_another_url_does_not_match(self):
+        etag = self.etag(f"{URL}?fields=id")
+        response = self.client.get(URL, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("plant_name", response.json()["results"][0])
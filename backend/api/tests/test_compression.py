@@ -0,0 +1,82 @@
+import gzip
+import unittest
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from qchat import middleware
+from qchat.middleware import negotiate_encoding
+
+from .fixtures import master_data, readings, schedule
+
+URL = "/api/inspections/actual-readings/?inspection_type=Inward"
+
+
+def decompress(response):
+    body = b"".join(response.streaming_content) if response.streaming else response.content
+    if response["Content-Encoding"] == "br":
+        return middleware.brotli.decompress(body)
+    return gzip.decompress(body)
+
+
+@override_settings(COMPRESSION_MIN_BYTES=0)
+class CompressionETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        readings("Inward", schedule(master_data(), "Inward"), [[10.0], [10.5]])
+
+    def setUp(self):
+        cache.clear()
+
+    def encodings(self):
+        return ("gzip", "br") if middleware.brotli else ("gzip",)
+
+    def test_each_encoding_has_its_own_tag_on_the_same_body(self):
+        identity = self.client.get(URL)
+        self.assertNotIn("Content-Encoding", identity)
+        for encoding in self.encodings():
+            with self.subTest(encoding=encoding):
+                response = self.client.get(URL, HTTP_ACCEPT_ENCODING=encoding)
+                self.assertEqual(response["Content-Encoding"], encoding)
+                self.assertEqual(response["ETag"], f'{identity["ETag"][:-1]}-{encoding}"')
+                self.assertIn("Accept-Encoding", response["Vary"])
+                self.assertEqual(decompress(response), identity.content)
+
+    def test_encoded_tag_revalidates_to_a_304_with_that_tag(self):
+        for encoding in self.encodings():
+            with self.subTest(encoding=encoding):
+                etag = self.client.get(URL, HTTP_ACCEPT_ENCODING=encoding)["ETag"]
+                response = self.client.get(URL, HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                self.assertEqual(response.content, b"")
+
+    def test_body_hash_etag_round_trips_too(self):
+        # the histogram view has no validator of its own, so ConditionalGetMiddleware hashes the body
+        url = "/api/parameters/distribution/?context=Inward&factoryId=P1&parameter=Length&bins=50"
+        first = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(first["ETag"].endswith('-gzip"'))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+    def test_stale_encoded_tag_gets_the_full_response(self):
+        response = self.client.get(URL, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH='"stale-gzip"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_streamed_response_is_compressed(self):
+        response = self.client.get(URL + "&stream=true", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(decompress(response).splitlines()), 2)
+
+
+class NegotiateEncodingTests(unittest.TestCase):
+    def test_preference(self):
+        best = "br" if middleware.brotli else "gzip"
+        self.assertEqual(negotiate_encoding("gzip, deflate, br"), best)
+        self.assertEqual(negotiate_encoding("gzip;q=1, br;q=0.5"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), best)
+        self.assertIsNone(negotiate_encoding("identity"))
+        self.assertIsNone(negotiate_encoding("gzip;q=0"))
+        self.assertIsNone(negotiate_encoding(""))
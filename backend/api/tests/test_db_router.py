@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.test import TestCase, override_settings
+
+from api.models import MasterPlantmaster
+from api.readings import READING_CHAINS
+from qchat import db_router
+from qchat.db_router import REPLICA, replica_reads
+
+from .fixtures import master_data, readings, schedule
+
+READINGS_URL = "/api/inspections/actual-readings/"
+
+
+@unittest.skipIf(REPLICA in settings.DATABASES, "REPLICA_DATABASE_URL already configures a replica alias")
+@unittest.skipUnless(connections["default"].vendor == "sqlite", "the replica is an SQLite copy of the test database")
+@override_settings(DATABASE_ROUTERS=["qchat.db_router.PrimaryReplicaRouter"], REPLICA_LAG_CHECK_INTERVAL=0)
+class PrimaryReplicaRouterTests(TestCase):
+    """
+    A second SQLite alias stands in for the replica: a copy of the empty test
+    schema, so readings written to the primary in a test are missing there
+    and show which database a request read from.
+    """
+
+    # the alias only exists once setUpClass has registered it
+    databases = {"default"}
+
+    @classmethod
+    def setUpClass(cls):
+        fd, cls.replica_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        connections["default"].ensure_connection()
+        with sqlite3.connect(cls.replica_path) as replica:
+            connections["default"].connection.backup(replica)
+        default = connections["default"].settings_dict
+        connections.settings[REPLICA] = {
+            **default,
+            "NAME": cls.replica_path,
+            "TEST": {**default["TEST"], "NAME": cls.replica_path, "MIRROR": None},
+        }
+        cls.databases = {"default", REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        os.remove(cls.replica_path)
+
+    @classmethod
+    def setUpTestData(cls):
+        master = master_data()
+        for inspection_type in READING_CHAINS:
+            readings(inspection_type, schedule(master, inspection_type), [[10.0]])
+
+    def setUp(self):
+        db_router._health.update(checked_at=None, healthy=True)
+
+    def routed_count(self, **params):
+        response = self.client.get(READINGS_URL, {"inspection_type": "all", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["count"]
+
+    def test_reads_inside_replica_reads_use_the_replica(self):
+        MasterPlantmaster.objects.using(REPLICA).create(plant_id="RP", plant_name="Replica only")
+        with replica_reads():
+            self.assertTrue(MasterPlantmaster.objects.filter(plant_id="RP").exists())
+        self.assertFalse(MasterPlantmaster.objects.filter(plant_id="RP").exists())
+
+    def test_writes_inside_replica_reads_go_to_the_primary(self):
+        with replica_reads():
+            MasterPlantmaster.objects.create(plant_id="W1", plant_name="Written")
+        self.assertTrue(MasterPlantmaster.objects.using("default").filter(plant_id="W1").exists())
+        self.assertFalse(MasterPlantmaster.objects.using(REPLICA).filter(plant_id="W1").exists())
+
+    def test_routed_view_reads_the_replica(self):
+        self.assertEqual(self.routed_count(), 0)
+
+    def test_unrouted_view_reads_the_primary(self):
+        MasterPlantmaster.objects.using(REPLICA).create(plant_id="RP", plant_name="Replica only")
+        codes = [plant["plant_id"] for plant in self.client.get("/api/plants/").json()["results"]]
+        self.assertEqual(codes, ["P1"])
+
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(db_router, "replica_lag", return_value=settings.REPLICA_MAX_LAG_SECONDS + 1):
+            with self.assertLogs("qchat.db", "WARNING"):
+                self.assertEqual(self.routed_count(), 3)
+        with self.assertLogs("qchat.db", "INFO"):
+            self.assertEqual(self.routed_count(), 0)
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        # keep the test transaction on the replica open when the router drops the connection
+        with mock.patch.object(connections[REPLICA], "close") as close, \
+                mock.patch.object(db_router, "replica_lag", side_effect=OperationalError("down")):
+            with self.assertLogs("qchat.db", "WARNING"):
+                self.assertEqual(self.routed_count(), 3)
+        close.assert_called()
+
+    def test_streamed_response_reads_the_replica_and_resets_the_context(self):
+        response = self.client.get(READINGS_URL, {"inspection_type": "all", "stream": "true"})
+        self.assertFalse(db_router._replica_reads.get())
+        # the rows are queried while the body is consumed, after the view has returned
+        self.assertEqual(b"".join(response.streaming_content), b"")
+        self.assertFalse(db_router._replica_reads.get())
+        self.assertEqual(MasterPlantmaster.objects.count(), 1)
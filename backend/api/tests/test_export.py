@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.export import FIELDS_AFTER_ORDER_NO, FIELDS_BEFORE_ORDER_NO, pyarrow
+
+from .fixtures import master_data, readings, schedule
+
+URL = "/api/inspections/readings/export/"
+READINGS_URL = "/api/inspections/actual-readings/"
+
+
+class ReadingExportTests(TestCase):
+    """Exports carry the same rows, in the same order, as the actual-readings NDJSON stream."""
+
+    @classmethod
+    def setUpTestData(cls):
+        master = master_data()
+        readings("Inward", schedule(master, "Inward"), [[9.9, 10.1], [10.0]], order_no="IO1")
+        readings("Final", schedule(master, "Final"), [[10.2], [10.3, 10.4]])
+
+    def expected(self, inspection_type="all"):
+        response = self.client.get(READINGS_URL, {"inspection_type": inspection_type, "stream": "true"})
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def export(self, output, inspection_type="all"):
+        response = self.client.get(URL, {"inspection_type": inspection_type, "output": output})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv(self):
+        # a chunk every two rows, so the export is written in several pieces
+        with mock.patch("api.export.CSV_CHUNK_ROWS", 2):
+            response, body = self.export("csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        filename = f"readings-all-{timezone.localdate():%Y%m%d}.csv"
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="{filename}"')
+        self.assertTrue(body.startswith("\ufeff".encode()))
+        header, *rows = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+        self.assertEqual(header, [*FIELDS_BEFORE_ORDER_NO, "io_no", "po_no", *FIELDS_AFTER_ORDER_NO])
+        expected = self.expected()
+        self.assertEqual(len(rows), len(expected))
+        for row, reading in zip(rows, expected):
+            exported = dict(zip(header, row))
+            self.assertEqual(int(exported["actual_reading_id"]), reading["actual_reading_id"])
+            self.assertEqual(float(exported["r_value"]), reading["r_value"])
+            self.assertEqual(exported["timestamp"], reading["timestamp"])
+            self.assertEqual(exported["io_no"], reading.get("io_no") or "")
+
+    def test_csv_of_one_type_has_only_its_order_column(self):
+        _, body = self.export("csv", "Final")
+        header, *rows = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+        self.assertIn("po_no", header)
+        self.assertNotIn("io_no", header)
+        self.assertEqual(len(rows), 3)
+
+    def test_empty_export_is_just_the_header(self):
+        response = self.client.get(URL, {"inspection_type": "Inward", "output": "csv", "item_code": "NOPE"})
+        header, *rows = csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig")))
+        self.assertEqual(rows, [])
+
+    def test_invalid_requests(self):
+        for params, error in (
+            ({}, "inspection_type is required"),
+            ({"inspection_type": "all", "output": "xlsx"}, "output must be 'csv', 'parquet' or 'arrow'"),
+            ({"inspection_type": "all", "source": "nope"}, "source must be 'readings' or 'flat'"),
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(URL, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": error})
+
+    def test_binary_outputs_need_pyarrow(self):
+        with mock.patch("api.views.pyarrow", None):
+            response = self.client.get(URL, {"inspection_type": "all", "output": "parquet"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "output=parquet needs pyarrow, which is not installed"})
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        with mock.patch("api.export.ROW_GROUP_ROWS", 2):
+            response, body = self.export("parquet")
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+        # already compressed, so the middleware leaves it alone
+        self.assertNotIn("Content-Encoding", response)
+        parquet = pyarrow.parquet.ParquetFile(io.BytesIO(body))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assert_table(parquet.read())
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow(self):
+        with mock.patch("api.export.ROW_GROUP_ROWS", 2):
+            response, body = self.export("arrow")
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.arrow.stream")
+        self.assertTrue(response["Content-Disposition"].endswith('.arrows"'))
+        batches = list(pyarrow.ipc.open_stream(body))
+        self.assertEqual([batch.num_rows for batch in batches], [2, 2, 2])
+        self.assert_table(pyarrow.Table.from_batches(batches))
+
+    def assert_table(self, table):
+        self.assertEqual(table.schema.field("actual_reading_id").type, pyarrow.int64())
+        self.assertEqual(table.schema.field("r_value").type, pyarrow.float64())
+        self.assertEqual(table.schema.field("timestamp").type, pyarrow.timestamp("us", tz="UTC"))
+        rows = table.to_pylist()
+        expected = self.expected()
+        self.assertEqual([row["actual_reading_id"] for row in rows], [r["actual_reading_id"] for r in expected])
+        self.assertEqual([row["r_value"] for row in rows], [r["r_value"] for r in expected])
+        self.assertEqual(
+            [row["timestamp"] for row in rows],
+            [datetime.fromisoformat(r["timestamp"].replace("Z", "+00:00")) for r in expected],
+        )
@@ -0,0 +1,161 @@
+import json
+
+from django.test import SimpleTestCase, TestCase
+
+from api.ingestion import IngestionError, batches, ingest_readings, parse_value, validate_payload
+from api.models import MasterInprocessactualreading, MasterInprocessinspectionreading
+from api.spc import get_spc_version
+
+from .fixtures import master_data, schedule
+
+
+class ParseValueTests(SimpleTestCase):
+    def test_numbers_and_null(self):
+        self.assertEqual(parse_value(10), 10.0)
+        self.assertEqual(parse_value("10.25"), 10.25)
+        self.assertIsNone(parse_value(None))
+
+    def test_rejects_booleans_and_non_finite_numbers(self):
+        for value in (True, "nan", "inf", float("-inf"), "ten"):
+            with self.assertRaises(ValueError, msg=value):
+                parse_value(value)
+
+
+class BatchesTests(SimpleTestCase):
+    def test_batches_close_once_they_hold_enough_values(self):
+        headers = [{"values": [None] * n} for n in (2, 1, 3, 1, 1)]
+        sizes = [[len(h["values"]) for h in batch] for batch in batches(headers, 3)]
+        self.assertEqual(sizes, [[2, 1], [3], [1, 1]])
+
+    def test_a_header_is_never_split(self):
+        self.assertEqual(len(list(batches([{"values": [None] * 10}], 3))), 1)
+
+
+class ValidatePayloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        master = master_data()
+        cls.in_process = schedule(master, "In-process")
+        cls.inward = schedule(master, "Inward")
+        cls.inactive = schedule(master, "In-process", is_active=False)
+
+    def payload(self, *readings, inspection_type="In-process"):
+        return {"inspection_type": inspection_type, "readings": list(readings)}
+
+    def errors(self, payload):
+        with self.assertRaises(IngestionError) as raised:
+            validate_payload(payload)
+        return raised.exception.errors
+
+    def test_valid_payload(self):
+        inspection_type, headers = validate_payload(self.payload({
+            "schedule_id": str(self.in_process.id), "po_no": 42, "machine_id": "CMM-2",
+            "values": [{"r_key": 1, "r_value": "10.02"}, {"r_key": "2", "r_value": None}],
+        }))
+        self.assertEqual(inspection_type, "In-process")
+        (header,) = headers
+        self.assertEqual(header["schedule_id"], self.in_process.id)
+        self.assertEqual(header["po_no"], "42")
+        self.assertEqual(header["machine_id"], "CMM-2")
+        self.assertIsNone(header["remarks"])
+        self.assertEqual(header["values"], [("1", 10.02), ("2", None)])
+
+    def test_inward_takes_po_no_as_io_no(self):
+        _, (header,) = validate_payload(self.payload(
+            {"schedule_id": self.inward.id, "po_no": "IO-7", "values": [{"r_key": "1", "r_value": 1}]},
+            inspection_type="Inward",
+        ))
+        self.assertEqual(header["io_no"], "IO-7")
+
+    def test_payload_shape(self):
+        self.assertEqual(self.errors([]), ["payload must be a JSON object"])
+        self.assertIn("inspection_type", self.errors(self.payload({}, inspection_type="Daily"))[0])
+        self.assertEqual(self.errors(self.payload()), ["readings must be a non-empty list"])
+
+    def test_every_problem_is_reported(self):
+        errors = self.errors(self.payload(
+            "not an object",
+            {"schedule_id": "x", "values": []},
+            {"schedule_id": self.in_process.id, "machine_id": "M" * 101, "values": [
+                {"r_value": 1}, {"r_key": "k" * 101, "r_value": 1}, {"r_key": "3", "r_value": "nan"},
+            ]},
+        ))
+        self.assertEqual(errors, [
+            "readings[0] must be an object",
+            "readings[1].schedule_id must be an integer",
+            "readings[1].values must be a non-empty list",
+            "readings[2].machine_id is longer than 100 characters",
+            "readings[2].values[0] needs an r_key",
+            "readings[2].values[1].r_key is longer than 100 characters",
+            "readings[2].values[2].r_value must be a finite number or null",
+        ])
+
+    def test_schedule_must_be_an_active_schedule_of_the_type(self):
+        values = [{"r_key": "1", "r_value": 1}]
+        errors = self.errors(self.payload(
+            {"schedule_id": self.inactive.id, "values": values},
+            {"schedule_id": self.inward.id, "values": values},
+            {"schedule_id": 999999, "values": values},
+        ))
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all("is not an active In-process schedule" in e for e in errors))
+
+
+class BulkIngestViewTests(TestCase):
+    URL = "/api/inspections/readings/bulk/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.schedule = schedule(master_data(), "In-process")
+
+    def post(self, payload):
+        return self.client.post(self.URL, json.dumps(payload), content_type="application/json")
+
+    def test_writes_headers_and_values(self):
+        response = self.post({"inspection_type": "In-process", "readings": [
+            {"schedule_id": self.schedule.id, "po_no": "PO1", "values": [{"r_key": "1", "r_value": 9.9}, {"r_key": "2", "r_value": 10.1}]},
+            {"schedule_id": self.schedule.id, "po_no": "PO1", "values": [{"r_key": "1", "r_value": 10.0}]},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["actual_readings"], 3)
+        self.assertEqual(MasterInprocessinspectionreading.objects.filter(id__in=response.json()["reading_ids"]).count(), 2)
+        self.assertEqual(
+            sorted(MasterInprocessactualreading.objects.values_list("r_value", flat=True)), [9.9, 10.0, 10.1],
+        )
+
+    def test_rejected_payload_writes_nothing(self):
+        response = self.post({"inspection_type": "In-process", "readings": [
+            {"schedule_id": self.schedule.id, "values": [{"r_key": "1", "r_value": 10.0}]},
+            {"schedule_id": self.schedule.id, "values": [{"r_key": "1", "r_value": "abc"}]},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()["details"]), 1)
+        self.assertFalse(MasterInprocessinspectionreading.objects.exists())
+
+
+class IngestReadingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.schedule = schedule(master_data(), "In-process")
+
+    def headers(self, count):
+        _, headers = validate_payload({"inspection_type": "In-process", "readings": [
+            {"schedule_id": self.schedule.id, "po_no": f"PO{n}", "values": [{"r_key": "1", "r_value": 9.9}, {"r_key": "2", "r_value": 10.0}]}
+            for n in range(count)
+        ]})
+        return headers
+
+    def test_every_batch_is_written_with_timestamps(self):
+        reading_ids, written = ingest_readings("In-process", self.headers(5), batch_size=3)
+        self.assertEqual((len(reading_ids), written), (5, 10))
+        actuals = MasterInprocessactualreading.objects.filter(reading_id__in=reading_ids)
+        self.assertEqual(actuals.count(), 10)
+        self.assertFalse(actuals.filter(created_at__isnull=True).exists())
+        self.assertEqual(set(actuals.values_list("is_active", flat=True)), {True})
+
+    def test_control_charts_of_the_schedules_move_on_commit(self):
+        before = get_spc_version("In-process", self.schedule.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_readings("In-process", self.headers(1))
+            self.assertEqual(get_spc_version("In-process", self.schedule.id), before)
+        self.assertNotEqual(get_spc_version("In-process", self.schedule.id), before)
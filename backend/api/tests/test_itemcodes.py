@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .fixtures import master_data
+
+URL = "/api/itemcodes/by-building/"
+
+
+class ItemCodesByBuildingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+
+    def setUp(self):
+        # cached responses outlive the rolled-back data of earlier tests
+        cache.clear()
+
+    def lookup(self, **params):
+        response = self.client.get(URL, {"building": self.master.building.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_items_come_from_the_item_master(self):
+        self.assertEqual(
+            self.lookup(inspection_type="In-process"),
+            {"items": [{"id": self.master.item.id, "item_code": "CUP-01"}], "has_more": False},
+        )
+
+    def test_final_items_come_from_the_fai_item_master(self):
+        self.assertEqual(
+            self.lookup(inspection_type="Final"),
+            {"items": [{"id": self.master.fai_item.id, "item_code": "CASE-01"}], "has_more": False},
+        )
+
+    def test_building_is_required(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "building is required"})
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .fixtures import master_data
+
+METRICS_URL = "/metrics"
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        master_data()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_reports_the_queries(self):
+        response = self.client.get("/api/plants/")
+        self.assertRegex(response["Server-Timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries"$')
+
+    def test_requests_show_up_in_the_histograms(self):
+        self.client.get("/api/plants/")
+        body = self.client.get(METRICS_URL).content.decode()
+        self.assertRegex(body, r'qchat_request_duration_seconds_count\{view="masterplantmaster-list"\} [1-9]')
+        self.assertIn('qchat_db_queries_per_request_bucket{view="masterplantmaster-list",le="2"}', body)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=1e-9)
+    def test_slow_requests_log_their_sql(self):
+        with self.assertLogs("qchat.requests", "WARNING") as logs:
+            self.client.get("/api/plants/")
+        self.assertIn("Slow request GET /api/plants/ (masterplantmaster-list)", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+
+class MetricsAccessTests(TestCase):
+    def test_local_clients_may_scrape(self):
+        response = self.client.get(METRICS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    def test_public_clients_are_refused(self):
+        self.assertEqual(self.client.get(METRICS_URL, REMOTE_ADDR="93.184.216.34").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required_once_set(self):
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.assertEqual(self.client.get(METRICS_URL, headers={"authorization": "Bearer wrong"}).status_code, 403)
+        response = self.client.get(METRICS_URL, headers={"authorization": "Bearer s3cret"}, REMOTE_ADDR="93.184.216.34")
+        self.assertEqual(response.status_code, 200)
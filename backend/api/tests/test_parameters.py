@@ -0,0 +1,37 @@
+from django.test import TestCase
+
+from .fixtures import master_data, readings, schedule
+
+SERIES_URL = "/api/parameters/series-and-stats/"
+
+
+class ParameterSeriesAndStatsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+        readings("In-process", schedule(cls.master, "In-process"), [[9.5, 10.0], [10.5, 11.5]])
+        readings("Final", schedule(cls.master, "Final"), [[8.5]])
+
+    def get(self, **params):
+        return self.client.get(SERIES_URL, {"factoryId": "P1", "parameter": "Length", **params})
+
+    def test_stats_across_types(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()["stats"]
+        self.assertEqual(stats["count"], 5)
+        self.assertAlmostEqual(stats["mean"], 10.0)
+        self.assertEqual((stats["min"], stats["max"]), (8.5, 11.5))
+        self.assertEqual(stats["out_of_spec"], 2)
+        self.assertEqual(len(response.json()["series"]), 5)
+
+    def test_single_type(self):
+        self.assertEqual(self.get(inspection_type="Final").json()["stats"]["count"], 1)
+
+    def test_unknown_inspection_type_is_rejected(self):
+        response = self.get(inspection_type="bogus")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("inspection_type", response.json()["error"])
+
+    def test_no_matching_readings(self):
+        self.assertEqual(self.get(inspection_type="Inward").status_code, 404)
@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import MasterBuildingsectionlab, MasterItemmaster, MasterProductionplanner
+
+from .fixtures import master_data
+
+URL = "/api/productionplanners/"
+
+
+class ProductionPlannerQueryCountTests(TestCase):
+    """Section and item are joined, so list and detail cost the same whatever the row count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+
+    def setUp(self):
+        # cached responses outlive the rolled-back data of earlier tests
+        cache.clear()
+
+    def add_orders(self, count):
+        # a section and an item per order, so any per-row lookup would show up as extra queries
+        start = MasterProductionplanner.objects.count()
+        for n in range(start, start + count):
+            building = MasterBuildingsectionlab.objects.create(building_id=f"S{n}", plant=self.master.plant)
+            item = MasterItemmaster.objects.create(
+                item_code=f"ITEM-{n}", building=building, plant=self.master.plant,
+            )
+            MasterProductionplanner.objects.create(order_number=f"PO{n:04d}", item_code=item, section=building)
+
+    def assert_list_queries(self, expected_rows):
+        cache.clear()
+        # the paginator's COUNT and the joined page
+        with self.assertNumQueries(2):
+            response = self.client.get(URL)
+        self.assertEqual(response.json()["count"], expected_rows)
+        for row in response.json()["results"]:
+            self.assertEqual(row["plant"], self.master.plant.id)
+            self.assertTrue(row["item_code"].startswith("ITEM-"))
+
+    def assert_detail_queries(self, order_number):
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(f"{URL}{order_number}/")
+        self.assertEqual(response.json()["plant"], self.master.plant.id)
+
+    def test_list_query_count_is_flat(self):
+        self.add_orders(1)
+        self.assert_list_queries(1)
+        self.add_orders(30)
+        self.assert_list_queries(31)
+
+    def test_detail_query_count_is_flat(self):
+        self.add_orders(1)
+        self.assert_detail_queries("PO0000")
+        self.add_orders(30)
+        self.assert_detail_queries("PO0030")
+
+
+class OrderLookupPagingTests(TestCase):
+    """``by-factory-item`` pages with ``after`` until ``has_more`` clears."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+        MasterProductionplanner.objects.bulk_create(
+            MasterProductionplanner(order_number=f"PO{n:02d}", item_code=cls.master.item, section=cls.master.building)
+            for n in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def lookup(self, **params):
+        response = self.client.get(f"{URL}by-factory-item/", {"plant": self.master.plant.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_follow_the_last_order_number(self):
+        orders, after = [], ""
+        while True:
+            page = self.lookup(limit=2, after=after)
+            orders += page["orders"]
+            if not page["has_more"]:
+                break
+            after = page["orders"][-1]
+        self.assertEqual(orders, [f"PO{n:02d}" for n in range(5)])
+
+    def test_last_page_has_no_more(self):
+        self.assertEqual(self.lookup(limit=2, after="PO02"), {"orders": ["PO03", "PO04"], "has_more": False})
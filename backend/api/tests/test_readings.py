@@ -0,0 +1,208 @@
+import base64
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
+from django.utils import timezone
+
+from api import async_views
+from api.caching import bump_master_data_version
+from api.models import MasterRmactualreading
+from api.readings import READING_CHAINS, parse_inspection_types
+from api.views import READING_SOURCES
+
+from .fixtures import master_data, readings, schedule
+
+URL = "/api/inspections/actual-readings/"
+
+
+class ActualReadingsQueryCountTests(TestCase):
+    """The actual-readings endpoint costs one readings query however many readings match."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+        cls.schedules = {t: schedule(cls.master, t) for t in READING_CHAINS}
+        for inspection_type, insp_schedule in cls.schedules.items():
+            readings(inspection_type, insp_schedule, [[10.0]])
+
+    def add_readings(self, count):
+        for inspection_type, insp_schedule in self.schedules.items():
+            readings(inspection_type, insp_schedule, [[9.9, 10.1]] * count)
+
+    def assert_one_query(self, inspection_type, expected):
+        # plus the ETag validator: one aggregate per reading table of each type
+        types = parse_inspection_types(inspection_type)
+        with self.assertNumQueries(1 + 2 * len(types)):
+            response = self.client.get(URL, {"inspection_type": inspection_type})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], expected)
+
+    def test_single_type_query_count_is_flat(self):
+        for inspection_type in READING_CHAINS:
+            self.assert_one_query(inspection_type, 1)
+        self.add_readings(20)
+        for inspection_type in READING_CHAINS:
+            self.assert_one_query(inspection_type, 41)
+
+    def test_all_types_query_count_is_flat(self):
+        self.assert_one_query("all", 3)
+        self.add_readings(20)
+        self.assert_one_query("all", 123)
+
+    def test_readings_carry_schedule_and_master_data(self):
+        response = self.client.get(URL, {"inspection_type": "Inward", "po_no": "PO1"})
+        (reading,) = response.json()["readings"]
+        self.assertEqual(reading["io_no"], "PO1")
+        self.assertEqual(reading["plant_id"], "P1")
+        self.assertEqual(reading["item_code"], "CUP-01")
+        self.assertEqual(reading["operation_id"], "OP10")
+        self.assertEqual((reading["lsl"], reading["usl"]), (9.0, 11.0))
+        self.assertEqual(reading["r_value"], 10.0)
+
+
+class ActualReadingsUnitTests(TestCase):
+    def test_missing_unit_is_an_empty_string(self):
+        master = master_data()
+        master.item.unit = None
+        master.item.save()
+        readings("In-process", schedule(master, "In-process"), [[10.0]])
+        response = self.client.get(URL, {"inspection_type": "In-process"})
+        self.assertEqual([row["unit"] for row in response.json()["readings"]], [""])
+
+
+class ActualReadingsKeysetTests(TestCase):
+    """Cursor pages and the NDJSON stream walk all three reading tables in one (time, type, id) order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        master = master_data()
+        # the same timestamps in every table, and two readings per header, so the order is decided by ties
+        at = timezone.now().replace(microsecond=0)
+        for inspection_type in READING_CHAINS:
+            readings(inspection_type, schedule(master, inspection_type), [[9.9, 10.1], [10.0, 10.2]], at=at)
+
+    def page(self, **params):
+        response = self.client.get(URL, {"inspection_type": "all", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, page_size):
+        rows, cursor = [], None
+        while True:
+            page = self.page(page_size=page_size, **({"cursor": cursor} if cursor else {}))
+            rows += page["readings"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return rows
+
+    def key(self, row):
+        return row["timestamp"], row["inspection_type"], row["actual_reading_id"]
+
+    def test_pages_cover_every_reading_once_in_keyset_order(self):
+        rows = self.walk(page_size=3)
+        keys = [self.key(row) for row in rows]
+        self.assertEqual(len(keys), 12)
+        self.assertEqual(len(set(keys)), 12)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual({row["inspection_type"] for row in rows}, set(READING_CHAINS))
+
+    def test_page_size_does_not_change_the_rows(self):
+        self.assertEqual(self.walk(page_size=1), self.walk(page_size=5))
+
+    def test_last_page_has_no_cursor(self):
+        self.assertIsNone(self.page(page_size=12)["next_cursor"])
+
+    def test_malformed_cursor_is_rejected(self):
+        response = self.client.get(URL, {"inspection_type": "all", "cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "invalid cursor"})
+
+    def test_cursor_with_an_unknown_type_is_rejected(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(["2024-01-01T00:00:00+00:00", "Bogus", 1]).encode()).decode()
+        response = self.client.get(URL, {"inspection_type": "all", "cursor": cursor})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_returns_the_paged_rows_as_ndjson(self):
+        response = self.client.get(URL, {"inspection_type": "all", "stream": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.walk(page_size=5))
+
+
+class ActualReadingsConditionalTests(TestCase):
+    """The ETag comes from the state of the reading tables, so a 304 skips the readings query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.schedule = schedule(master_data(), "Inward")
+        (cls.header,) = readings("Inward", cls.schedule, [[10.0]])
+
+    def setUp(self):
+        cache.clear()
+
+    def etag(self, **params):
+        response = self.client.get(URL, {"inspection_type": "Inward", **params})
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def revalidate(self, etag, **params):
+        return self.client.get(URL, {"inspection_type": "Inward", **params}, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_readings_answer_304_without_the_readings_query(self):
+        etag = self.etag()
+        self.assertTrue(etag.startswith('"readings-'))
+        # the two aggregates of the validator, and not the readings query
+        with self.assertNumQueries(2):
+            response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_new_reading_changes_the_etag(self):
+        etag = self.etag()
+        readings("Inward", self.schedule, [[10.2]])
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_saved_edit_changes_the_etag(self):
+        etag = self.etag()
+        actual = MasterRmactualreading.objects.get(reading_id=self.header)
+        actual.is_active = False
+        actual.save()
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_master_data_change_changes_the_etag(self):
+        etag = self.etag()
+        bump_master_data_version()
+        self.assertEqual(self.revalidate(etag).status_code, 200)
+
+    def test_each_representation_has_its_own_etag(self):
+        etags = {self.etag(), self.etag(page_size=1), self.etag(format="columnar"), self.etag(po_no="PO1")}
+        self.assertEqual(len(etags), 4)
+
+    def test_stream_revalidates_too(self):
+        response = self.client.get(URL, {"inspection_type": "Inward", "stream": "true"})
+        self.assertEqual(self.revalidate(response["ETag"], stream="true").status_code, 304)
+
+    def test_flat_source_keeps_the_body_hash_etag(self):
+        with mock.patch("api.views.check_flat_readings"), \
+                mock.patch.dict("api.views.READING_SOURCES", flat=READING_SOURCES["readings"]):
+            etag = self.etag(source="flat")
+        self.assertFalse(etag.startswith('"readings-'))
+
+    async def test_async_view_uses_the_same_etag(self):
+        etag = await sync_to_async(self.etag)()
+        request = AsyncRequestFactory().get(URL, {"inspection_type": "Inward"}, headers={"If-None-Match": etag})
+        response = await async_views.actual_inspection_readings(request)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        response = await async_views.actual_inspection_readings(AsyncRequestFactory().get(URL, {"inspection_type": "Inward"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
@@ -0,0 +1,88 @@
+from django.test import TestCase, override_settings
+
+from api.models import (
+    MasterBuildingsectionlab,
+    MasterFaiitemmaster,
+    MasterFaioperationmaster,
+    MasterItemmaster,
+    MasterOperationmaster,
+    MasterPlantmaster,
+)
+from api.registry import REGISTRY_MODELS, expire_master_registry, master_registry
+
+from .fixtures import master_data
+
+
+class RegistryMaxAgeTests(TestCase):
+    """Rows written without signals, as the plant application does, show up once the snapshot is too old."""
+
+    def setUp(self):
+        expire_master_registry()
+
+    def write_plant_out_of_band(self):
+        # bulk_create sends no post_save, so the version stamp stays put
+        (plant,) = MasterPlantmaster.objects.bulk_create([MasterPlantmaster(plant_id="P9", plant_name="Plant 9")])
+        return plant
+
+    @override_settings(MASTER_REGISTRY_MAX_AGE=3600)
+    def test_fresh_snapshot_is_reused(self):
+        registry = master_registry()
+        self.write_plant_out_of_band()
+        self.assertIs(master_registry(), registry)
+        self.assertEqual(master_registry().ids(MasterPlantmaster, "P9"), ())
+
+    @override_settings(MASTER_REGISTRY_MAX_AGE=0)
+    def test_expired_snapshot_is_reloaded(self):
+        registry = master_registry()
+        plant = self.write_plant_out_of_band()
+        self.assertIsNot(master_registry(), registry)
+        self.assertEqual(master_registry().ids(MasterPlantmaster, "P9"), (plant.id,))
+
+
+class RegistryInvalidationTests(TestCase):
+    """Committed saves and deletes of the registry's models reach the snapshot; other masters leave it alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+
+    def setUp(self):
+        expire_master_registry()
+
+    @override_settings(MASTER_REGISTRY_MAX_AGE=3600)
+    def test_saves_and_deletes_reload_the_snapshot(self):
+        for model, code_field, row in (
+            (MasterPlantmaster, "plant_id", self.master.plant),
+            (MasterBuildingsectionlab, "building_id", self.master.building),
+            (MasterItemmaster, "item_code", self.master.item),
+            (MasterOperationmaster, "operation_id", self.master.operation),
+        ):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(master_registry().ids(model, getattr(row, code_field)), (row.id,))
+                setattr(row, code_field, "RENAMED")
+                with self.captureOnCommitCallbacks(execute=True):
+                    row.save()
+                self.assertEqual(master_registry().ids(model, "RENAMED"), (row.id,))
+        operation_id = self.master.operation.id
+        self.assertIsNotNone(master_registry().get(MasterOperationmaster, operation_id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.master.operation.delete()
+        self.assertIsNone(master_registry().get(MasterOperationmaster, operation_id))
+
+    @override_settings(MASTER_REGISTRY_MAX_AGE=3600)
+    def test_reload_waits_for_the_commit(self):
+        registry = master_registry()
+        with self.captureOnCommitCallbacks(execute=True):
+            MasterPlantmaster.objects.create(plant_id="P2", plant_name="Plant 2")
+            self.assertIs(master_registry(), registry)
+        self.assertIsNot(master_registry(), registry)
+
+    @override_settings(MASTER_REGISTRY_MAX_AGE=3600)
+    def test_fai_masters_are_not_in_the_registry(self):
+        self.assertNotIn(MasterFaiitemmaster, REGISTRY_MODELS)
+        self.assertNotIn(MasterFaioperationmaster, REGISTRY_MODELS)
+        registry = master_registry()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.master.fai_item.item_description = "Renamed case"
+            self.master.fai_item.save()
+        self.assertIs(master_registry(), registry)
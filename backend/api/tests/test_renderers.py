@@ -0,0 +1,87 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.renderers import ColumnarJSONRenderer, FastJSONRenderer, columnar, dumps, to_columnar
+
+from .fixtures import master_data, readings, schedule
+
+PAYLOAD = {
+    "count": 2,
+    "at": datetime(2024, 3, 1, 8, 30, tzinfo=timezone.utc),
+    "value": Decimal("10.25"),
+    "text": "Ø 10 mm  ",
+    "readings": [{"id": 1, "x": 1.5}, {"id": 2, "x": None}],
+}
+
+
+class DumpsTestsMixin:
+    def test_matches_the_stock_renderer(self):
+        self.assertEqual(json.loads(FastJSONRenderer().render(PAYLOAD)), json.loads(JSONRenderer().render(PAYLOAD)))
+
+    def test_datetimes_use_z_for_utc(self):
+        self.assertEqual(json.loads(dumps(PAYLOAD))["at"], "2024-03-01T08:30:00Z")
+
+    def test_decimals_become_numbers(self):
+        self.assertEqual(json.loads(dumps(PAYLOAD))["value"], 10.25)
+
+    def test_nan_and_infinity_become_null(self):
+        data = {"r": float("nan"), "rows": [{"y": float("inf")}, (float("-inf"), 1.0)]}
+        self.assertEqual(json.loads(dumps(data)), {"r": None, "rows": [{"y": None}, [None, 1.0]]})
+
+    def test_line_separators_are_escaped(self):
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(PAYLOAD))
+
+    def test_none_renders_an_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+@override_settings(API_JSON_RENDERER="stdlib")
+class StdlibDumpsTests(DumpsTestsMixin, SimpleTestCase):
+    pass
+
+
+@unittest.skipIf(renderers.orjson is None, "orjson is not installed")
+@override_settings(API_JSON_RENDERER="orjson")
+class OrjsonDumpsTests(DumpsTestsMixin, SimpleTestCase):
+    pass
+
+
+class ColumnarTests(SimpleTestCase):
+    def test_rows_become_one_array_per_field(self):
+        rows = [{"id": 1, "x": 1.5}, {"id": 2, "y": "b"}]
+        self.assertEqual(columnar(rows), {"id": [1, 2], "x": [1.5, None], "y": [None, "b"]})
+
+    def test_row_lists_inside_a_dict_are_converted(self):
+        self.assertEqual(to_columnar(PAYLOAD)["readings"], {"id": [1, 2], "x": [1.5, None]})
+        self.assertEqual(to_columnar(PAYLOAD)["count"], 2)
+
+    def test_other_values_are_left_alone(self):
+        self.assertEqual(to_columnar([]), [])
+        self.assertEqual(to_columnar([1, 2]), [1, 2])
+        self.assertEqual(to_columnar({"ids": [1, 2]}), {"ids": [1, 2]})
+
+    def test_renderer(self):
+        self.assertEqual(json.loads(ColumnarJSONRenderer().render([{"id": 1}, {"id": 2}])), {"id": [1, 2]})
+
+
+class ColumnarFormatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        readings("Inward", schedule(master_data(), "Inward"), [[10.0], [10.5]])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_format_columnar_returns_the_same_rows_as_columns(self):
+        params = {"inspection_type": "Inward"}
+        rows = self.client.get("/api/inspections/actual-readings/", params).json()["readings"]
+        response = self.client.get("/api/inspections/actual-readings/", {**params, "format": "columnar"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["readings"], columnar(rows))
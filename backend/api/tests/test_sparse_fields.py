@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import MasterProductionplanner
+
+from .fixtures import master_data
+
+
+class SparseFieldsetTests(TestCase):
+    """``fields=`` narrows the SELECT, not just the serialized output."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+        MasterProductionplanner.objects.create(
+            order_number="PO1", status="Open", customer_name="Depot", item_code=cls.master.item, section=cls.master.building,
+        )
+
+    def setUp(self):
+        # cached responses outlive the rolled-back data of earlier tests
+        cache.clear()
+
+    def get(self, url, fields):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {"fields": fields})
+        self.assertEqual(response.status_code, 200)
+        # no deferred column is loaded later; a list adds the paginator's COUNT before the rows
+        self.assertEqual(len(captured), 2 if "results" in response.json() else 1)
+        return response.json(), captured.captured_queries[-1]["sql"]
+
+    def test_list_selects_requested_columns(self):
+        data, sql = self.get("/api/itemmasters/", "id,item_code")
+        self.assertEqual(data["results"], [{"id": self.master.item.id, "item_code": "CUP-01"}])
+        self.assertIn('"item_code"', sql)
+        self.assertNotIn("item_description", sql)
+
+    def test_method_fields_load_their_sources(self):
+        data, sql = self.get("/api/productionplanners/", "order_number,plant,item_code")
+        self.assertEqual(data["results"], [{"order_number": "PO1", "plant": self.master.plant.id, "item_code": "CUP-01"}])
+        self.assertNotIn("customer_name", sql)
+        self.assertNotIn("item_description", sql)
+
+    def test_detail_without_relations(self):
+        data, sql = self.get("/api/productionplanners/PO1/", "order_number,status")
+        self.assertEqual(data, {"order_number": "PO1", "status": "Open"})
+        self.assertNotIn("master_itemmaster", sql)
+
+    def test_without_fields_every_column_is_returned(self):
+        response = self.client.get("/api/productionplanners/PO1/")
+        self.assertEqual(response.json()["customer_name"], "Depot")
@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from api.readings import chain_models
+from api.spc import check_rules, sigma_scores
+
+from .fixtures import master_data, readings, schedule
+
+
+def rules_at(values):
+    """check_rules on a chart centred on 0 with sigma 1, so each value is its own score."""
+    return check_rules(values, values)
+
+
+class CheckRulesTests(SimpleTestCase):
+    def test_in_control_series_breaks_no_rule(self):
+        values = [0.5, -0.5, 0.2, 0.4, -0.3, -0.1, 0.6, 0.1, -0.4, 0.0]
+        self.assertEqual(rules_at(values), [[] for _ in values])
+
+    def test_beyond_3_sigma_on_either_side(self):
+        self.assertEqual(rules_at([0.0, 3.5, -3.5]), [[], ["beyond_3_sigma"], ["beyond_3_sigma"]])
+
+    def test_zone_limits_themselves_break_no_rule(self):
+        self.assertEqual(rules_at([3.0, -3.0]), [[], []])
+        self.assertEqual(rules_at([2.0, 2.0, 2.0]), [[], [], []])
+        self.assertNotIn("four_of_five_beyond_1_sigma", rules_at([1.0] * 5)[4])
+
+    def test_scores_come_from_the_chart_centre_and_sigma(self):
+        values = [10.0, 10.02, 10.35]
+        self.assertEqual(check_rules(values, sigma_scores(values, [10.0] * 3, [0.1] * 3))[2], ["beyond_3_sigma"])
+
+    def test_two_of_three_beyond_2_sigma(self):
+        flagged = rules_at([2.5, 0.0, 2.5])
+        self.assertNotIn("two_of_three_beyond_2_sigma", flagged[0])
+        self.assertIn("two_of_three_beyond_2_sigma", flagged[2])
+
+    def test_two_of_three_needs_the_same_side(self):
+        self.assertNotIn("two_of_three_beyond_2_sigma", rules_at([2.5, 0.0, -2.5])[2])
+
+    def test_four_of_five_beyond_1_sigma(self):
+        flagged = rules_at([-1.5, -1.5, 0.0, -1.5, -1.5])
+        self.assertEqual([i for i, rules in enumerate(flagged) if "four_of_five_beyond_1_sigma" in rules], [4])
+
+    def test_eight_on_one_side(self):
+        flagged = rules_at([0.5] * 8)
+        self.assertEqual([i for i, rules in enumerate(flagged) if "eight_on_one_side" in rules], [7])
+
+    def test_six_trending(self):
+        flagged = rules_at([-1.0, -0.6, -0.2, 0.2, 0.6, 1.0])
+        self.assertEqual([i for i, rules in enumerate(flagged) if "six_trending" in rules], [5])
+        self.assertIn("six_trending", rules_at([1.0, 0.6, 0.2, -0.2, -0.6, -1.0])[5])
+
+    def test_fourteen_alternating(self):
+        flagged = rules_at([0.1, -0.1] * 7)
+        self.assertEqual([i for i, rules in enumerate(flagged) if "fourteen_alternating" in rules], [13])
+
+
+class ControlChartCacheTests(TestCase):
+    def setUp(self):
+        # cached responses outlive the rolled-back data of earlier tests
+        cache.clear()
+        self.schedule = schedule(master_data(), "In-process")
+        readings("In-process", self.schedule, [[10.0], [10.1], [9.9]])
+        self.url = f"/api/inspections/schedules/{self.schedule.pk}/spc/"
+
+    def get_chart(self):
+        response = self.client.get(self.url, {"inspection_type": "In-process", "chart": "imr"})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_repeated_request_costs_the_high_water_mark_query(self):
+        self.assertEqual(self.get_chart()["readings"], 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_chart()["readings"], 3)
+
+    def test_readings_written_outside_django_are_picked_up(self):
+        self.assertEqual(self.get_chart()["readings"], 3)
+        # bulk_create fires no signals, like a write from the shop-floor application
+        _, reading_model, actual_model = chain_models("In-process")
+        (header,) = reading_model.objects.bulk_create([reading_model(insp_schedule_id=self.schedule, po_no="PO1")])
+        actual_model.objects.bulk_create([actual_model(reading_id=header, r_key="r1", r_value=10.2)])
+        self.assertEqual(self.get_chart()["readings"], 4)
+
+
+class ControlChartRulesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.schedule = schedule(master_data(), "In-process")
+        self.url = f"/api/inspections/schedules/{self.schedule.pk}/spc/"
+
+    def imr(self, values):
+        headers = readings("In-process", self.schedule, [[value] for value in values])
+        response = self.client.get(self.url, {"inspection_type": "In-process", "chart": "imr"})
+        self.assertEqual(response.status_code, 200)
+        return headers, response.json()
+
+    def test_in_control_series(self):
+        _, chart = self.imr([10.0, 10.1, 9.95, 10.05, 10.02, 9.98, 10.03, 9.97])
+        self.assertTrue(chart["in_control"])
+        self.assertEqual(chart["violations"], [])
+
+    def test_spike_is_reported_on_its_reading(self):
+        headers, chart = self.imr([10.0, 10.1, 9.95, 10.05, 10.02, 9.98, 10.03, 9.97, 12.0])
+        self.assertFalse(chart["in_control"])
+        self.assertIn("beyond_3_sigma", chart["points"][-1]["violations"])
+        (violation,) = [v for v in chart["violations"] if v["rule"] == "beyond_3_sigma"]
+        self.assertEqual((violation["chart"], violation["index"]), ("i", 8))
+        self.assertEqual(violation["reading_id"], headers[-1].pk)
+        self.assertIn("beyond_3_sigma", chart["rules"])
@@ -1,4 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
+
+from qchat.db_router import read_from_replica
 from rest_framework.routers import DefaultRouter
 from .views import (
     MasterPlantmasterViewSet,
@@ -12,12 +15,18 @@ from .views import (
     MasterInspectionscheduleViewSet,
     InitialDataView,
     SectionsByFactoryView,
+    ItemCodesByBuildingView,
     PurchaseOrderStatusView,
     InspectionsFilterView,
     ParameterSeriesAndStatsView,
     ParameterDistributionView,
+    ParameterLSLUSLDistributionView,
+    ScheduleControlChartView,
     ActualInspectionReadingsView,
+    ReadingExportView,
+    BulkReadingIngestView,
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'plants', MasterPlantmasterViewSet)
@@ -30,13 +39,46 @@ router.register(r'users', UserViewSet)
 router.register(r'roles', RbacRoleViewSet)
 router.register(r'inspectionschedules', MasterInspectionscheduleViewSet)
 
+if settings.ASYNC_READ_VIEWS:
+    chatbot_read_views = {
+        'initial-data': async_views.initial_data,
+        'factory-sections': async_views.sections_by_factory,
+        'po-status': async_views.purchase_order_status,
+        'inspections-filter': async_views.inspections_filter,
+        'actual-inspection-readings': async_views.actual_inspection_readings,
+        'readings-export': async_views.reading_export,
+    }
+else:
+    chatbot_read_views = {
+        'initial-data': InitialDataView.as_view(),
+        'factory-sections': SectionsByFactoryView.as_view(),
+        'po-status': PurchaseOrderStatusView.as_view(),
+        'inspections-filter': InspectionsFilterView.as_view(),
+        'actual-inspection-readings': ActualInspectionReadingsView.as_view(),
+        'readings-export': ReadingExportView.as_view(),
+    }
+
+# Read-only endpoints whose queries may be served by the read replica. initial-data stays on the
+# primary: it is cached under the master-data version, which a write bumps before the replica catches up.
+chatbot_read_views = {
+    name: view if name == 'initial-data' else read_from_replica(view)
+    for name, view in chatbot_read_views.items()
+}
+
 urlpatterns = [
     path('', include(router.urls)),
-    path('initial-data/', InitialDataView.as_view(), name='initial-data'),
-    path('factories/<str:factory_id>/sections/', SectionsByFactoryView.as_view(), name='factory-sections'),
-    path('purchase-orders/<str:po_id>/status/', PurchaseOrderStatusView.as_view(), name='po-status'),
-    path('inspections/filter/', InspectionsFilterView.as_view(), name='inspections-filter'),
-    path('inspections/actual-readings/', ActualInspectionReadingsView.as_view(), name='actual-inspection-readings'),
-    path('parameters/series-and-stats/', ParameterSeriesAndStatsView.as_view(), name='parameters-series-and-stats'),
-    path('parameters/distribution/', ParameterDistributionView.as_view(), name='parameters-distribution'),
-]
\ No newline at end of file
+    path('initial-data/', chatbot_read_views['initial-data'], name='initial-data'),
+    path('factories/<str:factory_id>/sections/', chatbot_read_views['factory-sections'], name='factory-sections'),
+    # on the primary: cached under the master-data version, like initial-data
+    path('itemcodes/by-building/', ItemCodesByBuildingView.as_view(), name='itemcodes-by-building'),
+    path('purchase-orders/<str:po_id>/status/', chatbot_read_views['po-status'], name='po-status'),
+    path('inspections/filter/', chatbot_read_views['inspections-filter'], name='inspections-filter'),
+    path('inspections/actual-readings/', chatbot_read_views['actual-inspection-readings'], name='actual-inspection-readings'),
+    path('inspections/readings/export/', chatbot_read_views['readings-export'], name='inspection-readings-export'),
+    path('inspections/readings/bulk/', BulkReadingIngestView.as_view(), name='inspection-readings-bulk'),
+    path('parameters/series-and-stats/', read_from_replica(ParameterSeriesAndStatsView.as_view()), name='parameters-series-and-stats'),
+    path('parameters/distribution/', read_from_replica(ParameterDistributionView.as_view()), name='parameters-distribution'),
+    path('parameters/lsl-usl-distribution/', read_from_replica(ParameterLSLUSLDistributionView.as_view()), name='parameters-lsl-usl-distribution'),
+    # on the primary: charts are cached under a version bumped on write, like initial-data
+    path('inspections/schedules/<int:schedule_id>/spc/', ScheduleControlChartView.as_view(), name='inspection-schedule-spc'),
+]
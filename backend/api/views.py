@@ -1,33 +1,60 @@
+
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from .models import (
     MasterPlantmaster, MasterProductionplanner, MasterItemmaster, 
     MasterParameterlist, MasterOperationmaster, MasterBuildingsectionlab, 
-    User, RbacRole, MasterInspectionschedule,
-    MasterRminspectionreading, MasterRmactualreading,
-    MasterInprocessinspectionreading, MasterInprocessactualreading,
-    MasterFaiinspectionschedule, MasterFaiinspectionreading, MasterFaiactualreading
+    User, RbacRole, MasterInspectionschedule, MasterFaiitemmaster,
 )
 from .serializers import (
+    SparseQuerysetMixin,
     MasterPlantmasterSerializer, MasterProductionplannerSerializer, MasterItemmasterSerializer, 
     MasterParameterlistSerializer, MasterOperationmasterSerializer, MasterBuildingsectionlabSerializer, 
     UserSerializer, RbacRoleSerializer, MasterInspectionscheduleSerializer
 )
+from .caching import MasterDataCacheMixin, cached_master_data, master_data_conditional, readings_conditional
+from .registry import master_registry
+from .ingestion import IngestionError, ingest_readings, validate_payload
+from .readings import (
+    READING_CHAINS, fetch_readings, fetch_reading_page, ordered_readings, parse_inspection_types, readings_rows, stream_readings,
+)
+from .renderers import dumps
+from .spc import DEFAULT_SPC_SUBGROUPS, MAX_SPC_SUBGROUPS, SPC_CHARTS, cached_control_chart
+from .export import EXPORT_FORMATS, export_chunks, export_filename, pyarrow
+from reporting.flat import FlatReadingsUnavailable, check_flat_readings, flat_ordered_readings, flat_readings_rows
+from reporting.rollups import rollup_series_and_stats
+from .analytics import (
+    DEFAULT_SERIES_POINTS, MAX_SERIES_POINTS, DEFAULT_HISTOGRAM_BINS, MAX_HISTOGRAM_BINS,
+    parameter_series_and_stats, parameter_distribution, lsl_usl_distribution,
+)
 
-class MasterPlantmasterViewSet(viewsets.ModelViewSet):
-    queryset = MasterPlantmaster.objects.all()
+DEFAULT_READINGS_PAGE_SIZE = 500
+MAX_READINGS_PAGE_SIZE = 5000
+DEFAULT_PO_LOOKUP_LIMIT = 1000
+MAX_PO_LOOKUP_LIMIT = 10000
+DEFAULT_ITEM_LOOKUP_LIMIT = 1000
+MAX_ITEM_LOOKUP_LIMIT = 10000
+
+
+class MasterPlantmasterViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterPlantmaster.objects.order_by("id")
     serializer_class = MasterPlantmasterSerializer
 
-class MasterProductionplannerViewSet(viewsets.ModelViewSet):
-    queryset = MasterProductionplanner.objects.all()
+class MasterProductionplannerViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterProductionplanner.objects.order_by("id")
     serializer_class = MasterProductionplannerSerializer
     lookup_field = "order_number"
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        # The serializer reads section.plant_id and item_code.item_code for every row
+        qs = super().get_queryset().select_related("section", "item_code")
         plant_pk = self.request.query_params.get("plant")
         plant_code = self.request.query_params.get("plant_code")
         if plant_pk:
@@ -36,8 +63,50 @@ class MasterProductionplannerViewSet(viewsets.ModelViewSet):
             qs = qs.filter(section__plant__plant_id=plant_code)
         return qs
 
-class MasterItemmasterViewSet(viewsets.ModelViewSet):
-    queryset = MasterItemmaster.objects.all()
+    @action(detail=False, methods=["get"], url_path="by-factory-item")
+    @master_data_conditional
+    def by_factory_item(self, request):
+        """
+        Order numbers only, for dropdowns and typeahead: ``section`` (and
+        optionally ``item_id``) or ``plant`` (primary keys), ``prefix`` to
+        match the start of the order number and ``limit`` (default 1000).
+        Returns ``{"orders": [...], "has_more": bool}``, sorted; while
+        ``has_more`` is set, pass the last order number as ``after`` for the
+        next page.
+        """
+        params = request.query_params
+        try:
+            section = parse_positive_int(params.get("section"), "section")
+            item_id = parse_positive_int(params.get("item_id"), "item_id")
+            plant = parse_positive_int(params.get("plant"), "plant")
+            limit = parse_positive_int(params.get("limit"), "limit", DEFAULT_PO_LOOKUP_LIMIT, MAX_PO_LOOKUP_LIMIT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not section and not plant:
+            return Response({"error": "section or plant is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build():
+            # Served by the (section, item_code, order_number) partial index
+            qs = MasterProductionplanner.objects.filter(is_active=True, order_number__isnull=False)
+            if section:
+                qs = qs.filter(section_id=section)
+            if plant:
+                qs = qs.filter(section__plant_id=plant)
+            if item_id:
+                qs = qs.filter(item_code_id=item_id)
+            prefix = params.get("prefix")
+            if prefix:
+                qs = qs.filter(order_number__startswith=prefix)
+            after = params.get("after")
+            if after:
+                qs = qs.filter(order_number__gt=after)
+            orders = list(qs.order_by("order_number").values_list("order_number", flat=True)[:limit + 1])
+            return {"orders": orders[:limit], "has_more": len(orders) > limit}
+
+        return Response(cached_master_data(request, build))
+
+class MasterItemmasterViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterItemmaster.objects.order_by("id")
     serializer_class = MasterItemmasterSerializer
 
     def get_queryset(self):
@@ -53,16 +122,16 @@ class MasterItemmasterViewSet(viewsets.ModelViewSet):
             qs = qs.filter(item_type=item_type)
         return qs
 
-class MasterParameterlistViewSet(viewsets.ModelViewSet):
-    queryset = MasterParameterlist.objects.all()
+class MasterParameterlistViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterParameterlist.objects.order_by("id")
     serializer_class = MasterParameterlistSerializer
 
-class MasterOperationmasterViewSet(viewsets.ModelViewSet):
-    queryset = MasterOperationmaster.objects.all()
+class MasterOperationmasterViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterOperationmaster.objects.order_by("id")
     serializer_class = MasterOperationmasterSerializer
 
-class MasterBuildingsectionlabViewSet(viewsets.ModelViewSet):
-    queryset = MasterBuildingsectionlab.objects.all()
+class MasterBuildingsectionlabViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterBuildingsectionlab.objects.order_by("id")
     serializer_class = MasterBuildingsectionlabSerializer
 
     def get_queryset(self):
@@ -72,16 +141,16 @@ class MasterBuildingsectionlabViewSet(viewsets.ModelViewSet):
             qs = qs.filter(plant__id=plant)
         return qs
 
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+class UserViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
+    queryset = User.objects.order_by("id")
     serializer_class = UserSerializer
 
-class RbacRoleViewSet(viewsets.ModelViewSet):
-    queryset = RbacRole.objects.all()
+class RbacRoleViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
+    queryset = RbacRole.objects.order_by("id")
     serializer_class = RbacRoleSerializer
 
-class MasterInspectionscheduleViewSet(viewsets.ModelViewSet):
-    queryset = MasterInspectionschedule.objects.all()
+class MasterInspectionscheduleViewSet(SparseQuerysetMixin, MasterDataCacheMixin, viewsets.ModelViewSet):
+    queryset = MasterInspectionschedule.objects.order_by("id")
     serializer_class = MasterInspectionscheduleSerializer
 
     def get_queryset(self):
@@ -112,303 +181,461 @@ class MasterInspectionscheduleViewSet(viewsets.ModelViewSet):
 
 
 class InitialDataView(APIView):
+    @master_data_conditional
     def get(self, request):
+        return Response(cached_master_data(request, self.build))
+
+    def build(self):
         plants = MasterPlantmaster.objects.all().values("id", "plant_id", "plant_name")
         items = MasterItemmaster.objects.all().values("id", "item_code", "item_description")
         parameters = MasterParameterlist.objects.all().values("id", "inspection_parameter_id", "inspection_parameter")
         operations = MasterOperationmaster.objects.all().values("id", "operation_id", "operation_name")
-        return Response({
+        return {
             "plants": list(plants),
             "items": list(items),
             "parameters": list(parameters),
             "operations": list(operations),
-        })
+        }
+
+
+class ItemCodesByBuildingView(APIView):
+    """
+    Item codes of one building for the chatbot's pickers: only id and
+    item_code, sorted. Query params: building (required), item_type, plant,
+    prefix (start of the item code), limit (default 1000) and
+    inspection_type ('Final' reads the FAI item master).
+    """
+    @master_data_conditional
+    def get(self, request):
+        params = request.query_params
+        try:
+            building = parse_positive_int(params.get("building"), "building")
+            plant = parse_positive_int(params.get("plant"), "plant")
+            limit = parse_positive_int(params.get("limit"), "limit", DEFAULT_ITEM_LOOKUP_LIMIT, MAX_ITEM_LOOKUP_LIMIT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not building:
+            return Response({"error": "building is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build():
+            model = MasterFaiitemmaster if params.get("inspection_type") == "Final" else MasterItemmaster
+            # Served by the (building, item_type, item_code) partial index
+            qs = model.objects.filter(is_active=True, building_id=building)
+            if plant:
+                qs = qs.filter(plant_id=plant)
+            item_type = params.get("item_type")
+            if item_type:
+                qs = qs.filter(item_type=item_type)
+            prefix = params.get("prefix")
+            if prefix:
+                qs = qs.filter(item_code__startswith=prefix)
+            items = list(qs.order_by("item_code", "id").values("id", "item_code")[:limit + 1])
+            return {"items": items[:limit], "has_more": len(items) > limit}
+
+        return Response(cached_master_data(request, build))
 
 
 class SectionsByFactoryView(APIView):
     def get(self, request, factory_id: str):
-        plant = get_object_or_404(MasterPlantmaster, plant_id=factory_id)
-        sections = MasterBuildingsectionlab.objects.filter(plant=plant).values(
-            "id", "building_id", "building_name"
-        )
-        return Response({"sections": list(sections)})
+        return Response({"sections": factory_sections(master_registry(), factory_id)})
+
+
+def factory_sections(registry, factory_id):
+    """Sections of the plant with this code, from the master registry; 404 for an unknown plant."""
+    plant = registry.get_by_code_or_404(MasterPlantmaster, factory_id)
+    return [
+        {"id": building.id, "building_id": building.code, "building_name": building.name}
+        for building in registry.buildings_of(plant.id)
+    ]
 
 
 class PurchaseOrderStatusView(APIView):
     def get(self, request, po_id: str):
         po = get_object_or_404(MasterProductionplanner, order_number=po_id)
-        item = None
-        if po.item_code_id:
-            item_obj = MasterItemmaster.objects.filter(id=po.item_code_id).values("item_code", "item_description").first()
-            item = item_obj if item_obj else None
-        return Response({
-            "po_no": po.order_number,
-            "status": po.status,
-            "item": item,
-            "lot_number": po.lot_number,
-            "lot_qty": po.lot_qty,
-            "target_date": po.target_date,
-        })
+        return Response(purchase_order_payload(master_registry(), po))
+
+
+def purchase_order_payload(registry, po):
+    item = registry.get(MasterItemmaster, po.item_code_id)
+    return {
+        "po_no": po.order_number,
+        "status": po.status,
+        "item": {"item_code": item.code, "item_description": item.description} if item else None,
+        "lot_number": po.lot_number,
+        "lot_qty": po.lot_qty,
+        "target_date": po.target_date,
+    }
+
+
+# Schedule columns of an inspections filter row; the master codes come from the registry instead of joins
+INSPECTION_FILTER_FIELDS = (
+    "id",
+    "inspection_parameter_name",
+    "lsl",
+    "target_value",
+    "usl",
+    "sample_size",
+    "inspection_frequency",
+    "inspection_method",
+    "recording_type",
+    "likely_defects_classification",
+    "remarks",
+    "item_code_id",
+    "operation_id",
+    "building_id",
+    "plant_id_id",
+)
 
 
-class InspectionsFilterView(APIView):
-    def post(self, request):
-        factory_id = request.data.get("factoryId")
-        item_code = request.data.get("itemCode")
-        operation = request.data.get("operation")
-        parameter = request.data.get("parameter")
+def filtered_inspections(registry, data):
+    """``values()`` of the In-process/Inward schedules matching the chatbot's inspection filters."""
+    factory_id = data.get("factoryId")
+    item_code = data.get("itemCode")
+    operation = data.get("operation")
+    parameter = data.get("parameter")
 
-        qs = MasterInspectionschedule.objects.all()
+    qs = MasterInspectionschedule.objects.all()
 
-        if factory_id:
-            try:
-                plant = MasterPlantmaster.objects.get(plant_id=factory_id)
-                qs = qs.filter(plant_id=plant)
-            except MasterPlantmaster.DoesNotExist:
-                qs = qs.none()
+    if factory_id:
+        qs = qs.filter(plant_id__in=registry.ids(MasterPlantmaster, factory_id))
 
-        if item_code:
-            qs = qs.filter(item_code__item_code=item_code)
+    if item_code:
+        qs = qs.filter(item_code__in=registry.ids(MasterItemmaster, item_code))
 
-        if operation:
-            qs = qs.filter(operation__operation_id=operation)
+    if operation:
+        qs = qs.filter(operation__in=registry.ids(MasterOperationmaster, operation))
+
+    if parameter:
+        filters = Q(inspection_parameter_id__inspection_parameter_id=parameter) | Q(inspection_parameter_id__inspection_parameter=parameter)
+        qs = qs.filter(filters)
 
-        if parameter:
-            filters = Q(inspection_parameter_id__inspection_parameter_id=parameter) | Q(inspection_parameter_id__inspection_parameter=parameter)
-            qs = qs.filter(filters)
-
-        data = list(qs.values(
-            "id",
-            "inspection_parameter_name",
-            "lsl",
-            "target_value",
-            "usl",
-            "sample_size",
-            "inspection_frequency",
-            "inspection_method",
-            "recording_type",
-            "likely_defects_classification",
-            "remarks",
-            "item_code__item_code",
-            "operation__operation_id",
-            "building__building_id",
-            "plant_id__plant_id",
-        ))
-
-        return Response({"inspections": data})
+    return qs.values(*INSPECTION_FILTER_FIELDS)
+
+
+def inspection_filter_row(registry, row):
+    """A ``filtered_inspections`` row with the item, operation, building and plant codes filled in."""
+    item = registry.get(MasterItemmaster, row.pop("item_code_id"))
+    operation = registry.get(MasterOperationmaster, row.pop("operation_id"))
+    building = registry.get(MasterBuildingsectionlab, row.pop("building_id"))
+    plant = registry.get(MasterPlantmaster, row.pop("plant_id_id"))
+    row["item_code__item_code"] = item.code if item else None
+    row["operation__operation_id"] = operation.code if operation else None
+    row["building__building_id"] = building.code if building else None
+    row["plant_id__plant_id"] = plant.code if plant else None
+    return row
+
+
+class InspectionsFilterView(APIView):
+    def post(self, request):
+        registry = master_registry()
+        rows = filtered_inspections(registry, request.data)
+        return Response({"inspections": [inspection_filter_row(registry, row) for row in rows]})
+
+
+def parse_positive_int(value, name, default=None, maximum=None):
+    """Parse an optional positive integer query parameter, raising ValueError with a usable message."""
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a positive integer")
+    if number <= 0:
+        raise ValueError(f"{name} must be a positive integer")
+    if maximum is not None:
+        number = min(number, maximum)
+    return number
+
+
+def parse_analytics_types(value):
+    """Inspection types of an analytics request; ValueError unless at least one is known."""
+    inspection_types = parse_inspection_types(value)
+    if not inspection_types:
+        raise ValueError("inspection_type must be 'Inward', 'In-process', 'Final' or 'all'")
+    return inspection_types
+
+
+def analytics_filters(params):
+    """Reading filters from the chatbot's analytics query parameters."""
+    return {
+        'plant_id': params.get('factoryId'),
+        'building': params.get('section'),
+        'item_code': params.get('itemCode'),
+        'operation': params.get('operation'),
+        'parameter_name': params.get('parameter'),
+        'po_no': params.get('poNo'),
+    }
 
 
 class ParameterSeriesAndStatsView(APIView):
+    """
+    Run chart and summary statistics for one parameter, computed in the database.
+
+    Query params: factoryId, section, itemCode, operation, parameter, days,
+    inspection_type (default 'all'), points (max chart points),
+    downsample ('time' buckets or 'lttb') and source ('readings', or
+    'rollup' to read the pre-aggregated hourly/daily rollups).
+    """
     def get(self, request):
-        return Response({"detail": "Not implemented: readings source not available"}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        params = request.query_params
+        try:
+            days = parse_positive_int(params.get('days'), 'days')
+            points = parse_positive_int(params.get('points'), 'points', DEFAULT_SERIES_POINTS, MAX_SERIES_POINTS)
+            inspection_types = parse_analytics_types(params.get('inspection_type', 'all'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        method = params.get('downsample', 'time')
+        if method not in ('time', 'lttb'):
+            return Response({"error": "downsample must be 'time' or 'lttb'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        source = params.get('source', 'readings')
+        if source not in ('readings', 'rollup'):
+            return Response({"error": "source must be 'readings' or 'rollup'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if source == 'rollup':
+            if params.get('poNo'):
+                return Response(
+                    {"error": "source=rollup cannot filter by poNo; rollups are not kept per order. Use source=readings"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            result = rollup_series_and_stats(inspection_types, analytics_filters(params), days=days)
+        else:
+            result = parameter_series_and_stats(
+                inspection_types, analytics_filters(params), days=days, points=points, method=method
+            )
+
+        if result is None:
+            return Response({"detail": "No readings found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
 
 
 class ParameterDistributionView(APIView):
+    """
+    Distinct operations/parameters and per-parameter histograms for an item.
+
+    Query params: context (inspection type, default 'all'), factoryId,
+    section, itemCode, operation, parameter, days and bins.
+    """
     def get(self, request):
-        return Response({"detail": "Not implemented: readings source not available"}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        params = request.query_params
+        try:
+            days = parse_positive_int(params.get('days'), 'days')
+            bins = parse_positive_int(params.get('bins'), 'bins', DEFAULT_HISTOGRAM_BINS, MAX_HISTOGRAM_BINS)
+            inspection_types = parse_analytics_types(params.get('context') or params.get('inspection_type') or 'all')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = parameter_distribution(inspection_types, analytics_filters(params), days=days, bins=bins)
+
+        if result is None:
+            return Response({"detail": "No readings found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+class ParameterLSLUSLDistributionView(APIView):
+    """
+    Readings of one parameter counted per spec-relative bucket: below LSL,
+    five equal slices of LSL..USL and above USL. Without usable limits the
+    observed range is sliced instead (range.derived is then true).
+
+    Query params: factoryId, section, itemCode, operation, parameter, days
+    and inspection_type (default 'all').
+    """
+    def get(self, request):
+        params = request.query_params
+        try:
+            days = parse_positive_int(params.get('days'), 'days')
+            inspection_types = parse_analytics_types(params.get('inspection_type', 'all'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = lsl_usl_distribution(inspection_types, analytics_filters(params), days=days)
+
+        if result is None:
+            return Response({"detail": "No readings found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+class ScheduleControlChartView(APIView):
+    """
+    SPC control chart for one inspection schedule: control limits, one point
+    per reading header (or per reading for imr) and Western Electric/Nelson
+    rule violations. Cached until a reading of the schedule is written.
+
+    Query params: inspection_type ('Inward', 'In-process' or 'Final'),
+    chart ('xbar-r' (default), 'imr' or 'p') and subgroups (the latest
+    reading headers to chart, default 500).
+    """
+    def get(self, request, schedule_id: int):
+        params = request.query_params
+        inspection_type = params.get('inspection_type')
+        if inspection_type not in READING_CHAINS:
+            return Response(
+                {"error": "inspection_type must be 'Inward', 'In-process' or 'Final'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        chart = params.get('chart', 'xbar-r')
+        if chart not in SPC_CHARTS:
+            return Response({"error": "chart must be 'xbar-r', 'imr' or 'p'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            subgroups = parse_positive_int(params.get('subgroups'), 'subgroups', DEFAULT_SPC_SUBGROUPS, MAX_SPC_SUBGROUPS)
+            result = cached_control_chart(inspection_type, schedule_id, chart, subgroups)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if result is None:
+            return Response({"detail": "No readings found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+def reading_filters(params):
+    """Reading filters from the actual-readings query parameters."""
+    return {
+        'plant_id': params.get('plant_id'),
+        'building': params.get('building'),
+        'item_code': params.get('item_code'),
+        'po_no': params.get('po_no'),  # or io_no for Inward
+        'operation': params.get('operation'),
+        'parameter_name': params.get('parameter_name'),
+    }
+
+
+# source query param -> (all rows, keyset-ordered rows) for the actual-readings endpoint
+READING_SOURCES = {
+    'readings': (readings_rows, ordered_readings),
+    'flat': (flat_readings_rows, flat_ordered_readings),
+}
+
+
+def export_options(params):
+    """(output, keyset-ordered rows) for a readings export; ValueError if either is invalid."""
+    output = params.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        raise ValueError("output must be 'csv', 'parquet' or 'arrow'")
+    if output != 'csv' and pyarrow is None:
+        raise ValueError(f"output={output} needs pyarrow, which is not installed")
+    source = params.get('source', 'readings')
+    if source not in READING_SOURCES:
+        raise ValueError("source must be 'readings' or 'flat'")
+    return output, READING_SOURCES[source][1]
+
+
+def export_response(chunks, inspection_types, output):
+    content_type, _ = EXPORT_FORMATS[output]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    filename = export_filename(inspection_types, output, timezone.localdate())
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 class ActualInspectionReadingsView(APIView):
     """
     Fetch actual inspection readings (not just schedule/target values)
     Based on inspection type, queries the appropriate reading tables
+
+    Passing page_size and/or cursor switches to keyset pagination ordered by
+    reading time; stream=true returns every row as NDJSON instead.
+    source=flat reads the materialized flat readings table instead of the
+    reading tables (as of its last refresh).
     """
+    @method_decorator(readings_conditional)
     def get(self, request):
-        inspection_type = request.query_params.get('inspection_type')  # 'Inward', 'In-process', 'Final'
-        plant_id = request.query_params.get('plant_id')
-        building = request.query_params.get('building')
-        item_code = request.query_params.get('item_code')
-        po_no = request.query_params.get('po_no')  # or io_no for Inward
-        operation = request.query_params.get('operation')
-        parameter_name = request.query_params.get('parameter_name')
+        # 'Inward', 'In-process', 'Final', a comma separated list of these, or 'all'
+        inspection_type = request.query_params.get('inspection_type')
 
         if not inspection_type:
             return Response({"error": "inspection_type is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = []
+        source = request.query_params.get('source', 'readings')
+        if source not in READING_SOURCES:
+            return Response({"error": "source must be 'readings' or 'flat'"}, status=status.HTTP_400_BAD_REQUEST)
+        rows, ordered = READING_SOURCES[source]
+        if source == 'flat':
+            try:
+                check_flat_readings()
+            except FlatReadingsUnavailable as e:
+                return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        filters = reading_filters(request.query_params)
+        inspection_types = parse_inspection_types(inspection_type)
+
+        if request.query_params.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+            lines = (dumps(row) + b"\n" for row in stream_readings(inspection_types, filters, ordered=ordered))
+            return StreamingHttpResponse(lines, content_type="application/x-ndjson")
 
+        cursor = request.query_params.get('cursor')
         try:
-            if inspection_type == 'Inward':
-                # Query: master_inspectionschedule -> master_rminspectionreading -> master_rmactualreading
-                schedules = MasterInspectionschedule.objects.filter(
-                    inspection_type='Inward',
-                    is_active=True
-                )
-                
-                if plant_id:
-                    schedules = schedules.filter(plant_id__plant_id=plant_id)
-                if building:
-                    schedules = schedules.filter(building__building_id=building)
-                if item_code:
-                    schedules = schedules.filter(item_code__item_code=item_code)
-                if operation:
-                    schedules = schedules.filter(operation__operation_id=operation)
-                if parameter_name:
-                    schedules = schedules.filter(inspection_parameter_name=parameter_name)
-                
-                # Get readings for these schedules
-                for schedule in schedules:
-                    readings = MasterRminspectionreading.objects.filter(
-                        insp_schedule_id=schedule,
-                        is_active=True
-                    )
-                    
-                    if po_no:  # io_no for Inward
-                        readings = readings.filter(io_no=po_no)
-                    
-                    for reading in readings:
-                        actual_readings = MasterRmactualreading.objects.filter(
-                            reading_id=reading,
-                            is_active=True
-                        )
-                        
-                        for actual in actual_readings:
-                            results.append({
-                                'schedule_id': schedule.id,
-                                'reading_id': reading.id,
-                                'actual_reading_id': actual.id,
-                                'inspection_type': 'Inward',
-                                'plant_id': schedule.plant_id.plant_id if schedule.plant_id else None,
-                                'plant_name': schedule.plant_id.plant_name if schedule.plant_id else None,
-                                'building_id': schedule.building.building_id if schedule.building else None,
-                                'building_name': schedule.building.building_name if schedule.building else None,
-                                'item_code': schedule.item_code.item_code if schedule.item_code else None,
-                                'item_description': schedule.item_code.item_description if schedule.item_code else None,
-                                'operation_id': schedule.operation.operation_id if schedule.operation else None,
-                                'operation_name': schedule.operation.operation_name if schedule.operation else None,
-                                'parameter_name': schedule.inspection_parameter_name,
-                                'io_no': reading.io_no,
-                                'lsl': schedule.lsl,
-                                'usl': schedule.usl,
-                                'target_value': schedule.target_value,
-                                'r_key': actual.r_key,
-                                'r_value': actual.r_value,
-                                'unit': schedule.item_code.unit if schedule.item_code else '',
-                                'timestamp': actual.created_at.isoformat(),
-                                'operator': actual.created_by.username if actual.created_by else 'N/A',
-                                'remarks': reading.remarks,
-                            })
-
-            elif inspection_type == 'In-process':
-                # Query: master_inspectionschedule -> master_inprocessinspectionreading -> master_inprocessactualreading
-                schedules = MasterInspectionschedule.objects.filter(
-                    inspection_type='In-process',
-                    is_active=True
-                )
-                
-                if plant_id:
-                    schedules = schedules.filter(plant_id__plant_id=plant_id)
-                if building:
-                    schedules = schedules.filter(building__building_id=building)
-                if item_code:
-                    schedules = schedules.filter(item_code__item_code=item_code)
-                if operation:
-                    schedules = schedules.filter(operation__operation_id=operation)
-                if parameter_name:
-                    schedules = schedules.filter(inspection_parameter_name=parameter_name)
-                
-                for schedule in schedules:
-                    readings = MasterInprocessinspectionreading.objects.filter(
-                        insp_schedule_id=schedule,
-                        is_active=True
-                    )
-                    
-                    if po_no:
-                        readings = readings.filter(po_no=po_no)
-                    
-                    for reading in readings:
-                        actual_readings = MasterInprocessactualreading.objects.filter(
-                            reading_id=reading,
-                            is_active=True
-                        )
-                        
-                        for actual in actual_readings:
-                            results.append({
-                                'schedule_id': schedule.id,
-                                'reading_id': reading.id,
-                                'actual_reading_id': actual.id,
-                                'inspection_type': 'In-process',
-                                'plant_id': schedule.plant_id.plant_id if schedule.plant_id else None,
-                                'plant_name': schedule.plant_id.plant_name if schedule.plant_id else None,
-                                'building_id': schedule.building.building_id if schedule.building else None,
-                                'building_name': schedule.building.building_name if schedule.building else None,
-                                'item_code': schedule.item_code.item_code if schedule.item_code else None,
-                                'item_description': schedule.item_code.item_description if schedule.item_code else None,
-                                'operation_id': schedule.operation.operation_id if schedule.operation else None,
-                                'operation_name': schedule.operation.operation_name if schedule.operation else None,
-                                'parameter_name': schedule.inspection_parameter_name,
-                                'po_no': reading.po_no,
-                                'lsl': schedule.lsl,
-                                'usl': schedule.usl,
-                                'target_value': schedule.target_value,
-                                'r_key': actual.r_key,
-                                'r_value': actual.r_value,
-                                'unit': schedule.item_code.unit if schedule.item_code else '',
-                                'timestamp': actual.created_at.isoformat(),
-                                'operator': actual.created_by.username if actual.created_by else 'N/A',
-                                'remarks': reading.remarks,
-                            })
-
-            elif inspection_type == 'Final':
-                # Query: master_faiinspectionschedule -> master_faiinspectionreading -> master_faiactualreading
-                schedules = MasterFaiinspectionschedule.objects.filter(
-                    is_active=True
-                )
-                
-                if plant_id:
-                    schedules = schedules.filter(plant_id__plant_id=plant_id)
-                if building:
-                    schedules = schedules.filter(building__building_id=building)
-                if item_code:
-                    schedules = schedules.filter(item_code__item_code=item_code)
-                if operation:
-                    schedules = schedules.filter(operation__operation_id=operation)
-                if parameter_name:
-                    schedules = schedules.filter(inspection_parameter_name=parameter_name)
-                
-                for schedule in schedules:
-                    readings = MasterFaiinspectionreading.objects.filter(
-                        insp_schedule_id=schedule,
-                        is_active=True
-                    )
-                    
-                    if po_no:
-                        readings = readings.filter(po_no=po_no)
-                    
-                    for reading in readings:
-                        actual_readings = MasterFaiactualreading.objects.filter(
-                            reading_id=reading,
-                            is_active=True
-                        )
-                        
-                        for actual in actual_readings:
-                            results.append({
-                                'schedule_id': schedule.id,
-                                'reading_id': reading.id,
-                                'actual_reading_id': actual.id,
-                                'inspection_type': 'Final',
-                                'plant_id': schedule.plant_id.plant_id if schedule.plant_id else None,
-                                'plant_name': schedule.plant_id.plant_name if schedule.plant_id else None,
-                                'building_id': schedule.building.building_id if schedule.building else None,
-                                'building_name': schedule.building.building_name if schedule.building else None,
-                                'item_code': schedule.item_code.item_code if schedule.item_code else None,
-                                'item_description': schedule.item_code.item_description if schedule.item_code else None,
-                                'operation_id': schedule.operation.operation_id if schedule.operation else None,
-                                'operation_name': schedule.operation.operation_name if schedule.operation else None,
-                                'parameter_name': schedule.inspection_parameter_name,
-                                'po_no': reading.po_no,
-                                'lsl': schedule.lsl,
-                                'usl': schedule.usl,
-                                'target_value': schedule.target_value,
-                                'r_key': actual.r_key,
-                                'r_value': actual.r_value,
-                                'unit': schedule.item_code.unit if schedule.item_code else '',
-                                'timestamp': actual.created_at.isoformat(),
-                                'operator': actual.created_by.username if actual.created_by else 'N/A',
-                                'remarks': reading.remarks,
-                            })
-
-            return Response({'readings': results, 'count': len(results)})
-
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            page_size = parse_positive_int(
+                request.query_params.get('page_size'), 'page_size',
+                DEFAULT_READINGS_PAGE_SIZE if cursor else None, MAX_READINGS_PAGE_SIZE,
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if page_size:
+            try:
+                results, next_cursor = fetch_reading_page(inspection_types, filters, page_size, cursor, ordered=ordered)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'readings': results, 'count': len(results), 'next_cursor': next_cursor})
+
+        results = fetch_readings(inspection_types, filters, rows=rows)
+
+        return Response({'readings': results, 'count': len(results)})
+
+
+class ReadingExportView(APIView):
+    """
+    Download actual readings as a file, with the same filters (and source)
+    as the actual-readings endpoint. output=csv (default), parquet or arrow;
+    the file is streamed from a server-side cursor, so any date range can be
+    exported without buffering it.
+    """
+    def get(self, request):
+        inspection_type = request.query_params.get('inspection_type')
+        if not inspection_type:
+            return Response({"error": "inspection_type is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            output, ordered = export_options(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if ordered is flat_ordered_readings:
+            # checked up front: once the download has started, an error can no longer become a status code
+            try:
+                check_flat_readings()
+            except FlatReadingsUnavailable as e:
+                return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        inspection_types = parse_inspection_types(inspection_type)
+        chunks = export_chunks(inspection_types, reading_filters(request.query_params), output, ordered=ordered)
+        return export_response(chunks, inspection_types, output)
+
+
+class BulkReadingIngestView(APIView):
+    """
+    Record many actual readings in one request: one inspection type, a list
+    of reading headers (schedule_id, po_no/io_no, remarks, machine_id ...)
+    each carrying its r_key/r_value pairs. The payload is validated as a
+    whole before anything is written.
+    """
+    def post(self, request):
+        try:
+            inspection_type, headers = validate_payload(request.data)
+        except IngestionError as e:
+            return Response({"error": str(e), "details": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        reading_ids, written = ingest_readings(inspection_type, headers, request.user)
+
+        return Response(
+            {
+                "inspection_type": inspection_type,
+                "reading_ids": reading_ids,
+                "readings": len(reading_ids),
+                "actual_readings": written,
+            },
+            status=status.HTTP_201_CREATED,
+        )
@@ -3,6 +3,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qchat.settings")
+# Under an ASGI server the chatbot read endpoints use the async views
+os.environ.setdefault("ASYNC_READ_VIEWS", "true")
 
 application = get_asgi_application()
 
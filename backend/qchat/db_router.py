@@ -0,0 +1,150 @@
+"""
+Optional read replica for the read-only chatbot and analytics endpoints.
+
+When ``REPLICA_DATABASE_URL`` is set, settings add a ``replica`` alias and
+install ``PrimaryReplicaRouter``. Reads go to the replica only inside
+``replica_reads()``, which ``read_from_replica`` wraps around the views
+listed in ``api/urls.py``. Everything else, including every write, stays on
+``default``.
+
+Before the replica is used, its lag is checked, at most once every
+``REPLICA_LAG_CHECK_INTERVAL`` seconds per process. While it is more than
+``REPLICA_MAX_LAG_SECONDS`` behind, or cannot be reached, those reads fall
+back to the primary.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger("qchat.db")
+
+REPLICA = "replica"
+
+# Seconds of replay lag; 0 when not in recovery or when everything received has been replayed
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_health = {"checked_at": None, "healthy": False}
+_health_lock = threading.Lock()
+
+
+def replica_lag(connection):
+    """How many seconds the database behind ``connection`` is behind its primary."""
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_available():
+    """Whether reads may use the replica right now (configured, reachable, not lagging)."""
+    if REPLICA not in settings.DATABASES:
+        return False
+    now = time.monotonic()
+    checked_at = _health["checked_at"]
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _health["healthy"]
+    with _health_lock:
+        if _health["checked_at"] is not checked_at:
+            return _health["healthy"]  # another thread just checked
+        connection = connections[REPLICA]
+        try:
+            lag = replica_lag(connection)
+        except DatabaseError as e:
+            connection.close()
+            healthy, reason = False, f"unreachable ({e})"
+        else:
+            healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+            reason = f"{lag:.1f}s behind"
+        if healthy != _health["healthy"]:
+            if healthy:
+                logger.info("Read replica back in use (%s)", reason)
+            else:
+                logger.warning("Read replica %s; reading from the primary", reason)
+        _health.update(checked_at=time.monotonic(), healthy=healthy)
+        return healthy
+
+
+@contextmanager
+def replica_reads():
+    """Route ORM reads in this block (and in async ORM calls made from it) to the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _replica_stream(content):
+    with replica_reads():
+        yield from content
+
+
+async def _areplica_stream(content):
+    with replica_reads():
+        async for chunk in content:
+            yield chunk
+
+
+def read_from_replica(view):
+    """
+    Wrap a (sync or async) view so its reads may use the replica, including
+    the queries a streaming response runs while it is being consumed.
+    """
+    def keep_streaming(response):
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _areplica_stream(response.streaming_content)
+            else:
+                response.streaming_content = _replica_stream(response.streaming_content)
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            with replica_reads():
+                return keep_streaming(await view(request, *args, **kwargs))
+    else:
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            with replica_reads():
+                return keep_streaming(view(request, *args, **kwargs))
+    return inner
+
+
+class PrimaryReplicaRouter:
+    """Reads inside ``replica_reads()`` go to the replica while it is healthy; all else to default."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_available():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either may be related
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema changes reach the replica through replication
+        if db == REPLICA:
+            return False
+        return None
@@ -0,0 +1,131 @@
+"""
+Minimal in-process metrics registry exposed in the Prometheus text format.
+
+Each worker process keeps its own counters; scrape every worker (or run a
+single one) to get the full picture. With ``METRICS_TOKEN`` set the endpoint
+wants ``Authorization: Bearer <token>``; without it only loopback and
+private-network clients may scrape.
+"""
+import hmac
+import ipaddress
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 5000)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a single label value."""
+
+    def __init__(self, name, documentation, buckets, label="view"):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(label_value, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._series[label_value] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{_format_number(bound)}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {_format_number(total)}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return "\n".join(lines)
+
+
+REQUEST_LATENCY = Histogram(
+    "qchat_request_duration_seconds", "Request latency by URL name.", LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram(
+    "qchat_db_queries_per_request", "Database queries issued per request by URL name.", QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    "qchat_db_duration_seconds", "Time spent in database queries per request by URL name.", LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "qchat_response_size_bytes", "Response body size by URL name (streaming responses excluded).", SIZE_BUCKETS
+)
+
+DB_POOL_WAIT = Histogram(
+    "qchat_db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection by database alias.",
+    LATENCY_BUCKETS,
+    label="database",
+)
+
+
+class PoolGauges:
+    """Point-in-time size/availability of every open psycopg_pool pool."""
+
+    STATS = {
+        "pool_size": "Connections currently managed by the pool.",
+        "pool_available": "Idle connections ready to be handed out.",
+        "requests_waiting": "Requests currently waiting for a connection.",
+    }
+
+    def render(self):
+        from django.db import connections
+
+        pools = {}
+        for alias in connections:
+            pool = getattr(type(connections[alias]), "_connection_pools", {}).get(alias)
+            if pool is not None and not pool.closed:
+                pools[alias] = pool.get_stats()
+        lines = []
+        for stat, documentation in self.STATS.items():
+            name = f"qchat_db_{stat}" if stat.startswith("pool_") else f"qchat_db_pool_{stat}"
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+            for alias, stats in sorted(pools.items()):
+                lines.append(f'{name}{{database="{_escape(alias)}"}} {stats.get(stat, 0)}')
+        return "\n".join(lines)
+
+
+REGISTRY = [REQUEST_LATENCY, DB_QUERIES, DB_TIME, RESPONSE_SIZE, DB_POOL_WAIT, PoolGauges()]
+
+
+def metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        scheme, _, supplied = request.headers.get("Authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(supplied.encode(), token.encode())
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden("metrics are restricted\n", content_type="text/plain")
+    body = "\n\n".join(metric.render() for metric in REGISTRY) + "\n"
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
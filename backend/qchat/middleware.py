@@ -0,0 +1,274 @@
+import heapq
+import logging
+import re
+import time
+import zlib
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import DB_QUERIES, DB_TIME, REQUEST_LATENCY, RESPONSE_SIZE
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip is offered then
+    brotli = None
+
+logger = logging.getLogger("qchat.requests")
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times queries, keeping only the slowest few."""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []  # min-heap of (duration, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if self.keep:
+                entry = (elapsed, sql)
+                if len(self.slowest) < self.keep:
+                    heapq.heappush(self.slowest, entry)
+                elif elapsed > self.slowest[0][0]:
+                    heapq.heapreplace(self.slowest, entry)
+
+
+def install_recorder(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, DB query count, DB time and response size per URL name,
+    add a ``Server-Timing`` header, and log the slowest SQL of any request
+    slower than ``METRICS_SLOW_REQUEST_MS``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = settings.METRICS_SLOW_REQUEST_MS
+        self.slow_queries = settings.METRICS_SLOW_QUERY_LOG_COUNT
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(self.slow_queries)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            install_recorder(stack, recorder)
+            response = self.get_response(request)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(self.slow_queries)
+        start = time.perf_counter()
+        # Async ORM calls run on the request's thread-sensitive executor thread,
+        # whose connections are not the ones visible here
+        stack = ExitStack()
+        await sync_to_async(install_recorder)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, recorder, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or "unresolved"
+        REQUEST_LATENCY.observe(view, elapsed)
+        DB_QUERIES.observe(view, recorder.count)
+        DB_TIME.observe(view, recorder.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(view, len(response.content))
+
+        response["Server-Timing"] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+        )
+
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            statements = "".join(
+                f"\n  {duration * 1000:.1f} ms: {sql}"
+                for duration, sql in sorted(recorder.slowest, reverse=True)
+            )
+            logger.warning(
+                "Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in DB%s",
+                request.method, request.get_full_path(), view,
+                elapsed * 1000, recorder.count, recorder.duration * 1000, statements,
+            )
+
+
+# A streamed response is flushed to the client after about this much uncompressed input
+STREAM_FLUSH_BYTES = 64 * 1024
+
+# Suffix that marks the ETag of a compressed representation, e.g. "abc" -> "abc-br"
+ETAG_ENCODING_RE = re.compile(r'-(?:br|gzip)"')
+
+# Formats that are compressed already, which would only cost CPU to compress again
+PRECOMPRESSED_CONTENT_TYPES = ("application/vnd.apache.parquet",)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    The coding to send for an ``Accept-Encoding`` header: ``"br"`` (when
+    brotli is installed) or ``"gzip"``, preferring brotli at equal q-values;
+    None for identity.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding] = q
+    best, best_q = None, 0.0
+    for coding in (("br", "gzip") if brotli else ("gzip",)):
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class Compressor:
+    """Incremental gzip or brotli compressor with one interface for both."""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self.compress = self._compressor.process
+            self.flush = self._compressor.flush
+            self.finish = self._compressor.finish
+        else:
+            # wbits 31: gzip container, with a zero mtime so equal content compresses to equal bytes
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = self._compressor.compress
+            self.flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self._compressor.flush
+
+
+def compress_bytes(content, encoding):
+    compressor = Compressor(encoding)
+    return compressor.compress(content) + compressor.finish()
+
+
+def compress_stream(chunks, encoding):
+    compressor, pending = Compressor(encoding), 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            out += compressor.flush()
+            pending = 0
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compressor, pending = Compressor(encoding), 0
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            out += compressor.flush()
+            pending = 0
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses of at least ``COMPRESSION_MIN_BYTES`` (and every
+    streamed response, except Parquet files) with brotli or gzip, as
+    negotiated from ``Accept-Encoding``.
+
+    Unlike Django's ``GZipMiddleware``, strong ETags stay strong: each encoded
+    representation gets its own tag (``"abc"`` becomes ``"abc-br"``). The
+    suffix is stripped from ``If-None-Match`` on the way in, so the ETag and
+    ``condition`` checks further in compare the tags they set themselves.
+    Compressed output is deterministic for the same reason, so there is no
+    random padding against BREACH. The API reflects no secrets next to
+    request input.
+    """
+
+    def process_request(self, request):
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            request.encoded_if_none_match = if_none_match
+            request.META["HTTP_IF_NONE_MATCH"] = ETAG_ENCODING_RE.sub('"', if_none_match)
+
+    def process_response(self, request, response):
+        if response.status_code == 304:
+            self.restore_encoded_etag(request, response)
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith(PRECOMPRESSED_CONTENT_TYPES):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def restore_encoded_etag(self, request, response):
+        """Answer a 304 with the tag of the representation the client holds."""
+        patch_vary_headers(response, ("Accept-Encoding",))
+        etag = response.get("ETag")
+        sent = getattr(request, "encoded_if_none_match", "")
+        if etag and etag.startswith('"'):
+            for encoding in ("br", "gzip"):
+                encoded = f'{etag[:-1]}-{encoding}"'
+                if encoded in sent:
+                    response.headers["ETag"] = encoded
+                    break
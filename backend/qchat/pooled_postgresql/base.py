@@ -0,0 +1,112 @@
+"""
+PostgreSQL backend that hands out connections from a psycopg_pool pool.
+
+Django only gained ``OPTIONS["pool"]`` in 5.1. This wrapper implements the
+same option on top of the stock 5.0 backend, so switching ``ENGINE`` back to
+``django.db.backends.postgresql`` is all an upgrade needs. ``OPTIONS["pool"]``
+takes ``True`` or the keyword arguments of ``psycopg_pool.ConnectionPool``
+(``min_size``, ``max_size``, ``timeout``, ``max_idle``, ``max_lifetime`` ...).
+
+Closing a Django connection returns it to the pool instead of closing the
+socket, and with ``CONN_HEALTH_CHECKS`` the pool verifies each connection
+before handing it out. Time spent waiting for a free connection is recorded
+in ``qchat.metrics.DB_POOL_WAIT``.
+"""
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from qchat.metrics import DB_POOL_WAIT
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # alias -> ConnectionPool, shared by the per-thread wrappers of one alias
+    _connection_pools = {}
+
+    @property
+    def pool(self):
+        pool_options = self.settings_dict["OPTIONS"].get("pool")
+        if self.alias == NO_DB_ALIAS or not pool_options:
+            return None
+
+        if self.alias not in self._connection_pools:
+            if self.settings_dict.get("CONN_MAX_AGE", 0) != 0:
+                raise ImproperlyConfigured("Pooling doesn't support persistent connections.")
+            if pool_options is True:
+                pool_options = {}
+            try:
+                from psycopg_pool import ConnectionPool
+            except ImportError as err:
+                raise ImproperlyConfigured(
+                    "Error loading psycopg_pool module.\nDid you install psycopg[pool]?"
+                ) from err
+
+            connect_kwargs = self.get_connection_params()
+            # Django switches autocommit as needed once it has the connection
+            connect_kwargs["autocommit"] = True
+            enable_checks = self.settings_dict["CONN_HEALTH_CHECKS"]
+            pool = ConnectionPool(
+                kwargs=connect_kwargs,
+                open=False,  # opened on first use, not at import time
+                check=ConnectionPool.check_connection if enable_checks else None,
+                name=self.alias,
+                **pool_options,
+            )
+            # Threads racing here each build a pool; the first one stored wins
+            self._connection_pools.setdefault(self.alias, pool)
+
+        return self._connection_pools[self.alias]
+
+    def close_pool(self):
+        if self.pool:
+            self.pool.close()
+            del self._connection_pools[self.alias]
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        options = self.settings_dict["OPTIONS"]
+        isolation_level = options.get("isolation_level")
+        try:
+            self.isolation_level = base.IsolationLevel(
+                base.IsolationLevel.READ_COMMITTED if isolation_level is None else isolation_level
+            )
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {isolation_level} "
+                f"specified. Use one of the psycopg.IsolationLevel values."
+            )
+        pool.open()
+        start = time.perf_counter()
+        try:
+            connection = pool.getconn()
+        finally:
+            # Timed-out requests are recorded too; they are the interesting ones
+            DB_POOL_WAIT.observe(self.alias, time.perf_counter() - start)
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None and self.pool:
+            with self.wrap_database_errors:
+                # Return to the pool the connection came from, even if the
+                # alias has been given a new pool in the meantime
+                self.connection._pool.putconn(self.connection)
+                self.connection = None
+            return
+        return super()._close()
+
+    def close_if_health_check_failed(self):
+        if self.pool:
+            # The pool only hands out connections that passed its check
+            return
+        return super().close_if_health_check_failed()
@@ -26,9 +26,14 @@ INSTALLED_APPS = [
     "corsheaders",
     # Local
     "api",
+    "reporting",
 ]
 
 MIDDLEWARE = [
+    "qchat.middleware.RequestMetricsMiddleware",
+    # Compression must wrap ConditionalGetMiddleware, so ETags are computed on the uncompressed body
+    "qchat.middleware.CompressionMiddleware",
+    "django.middleware.http.ConditionalGetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -60,6 +65,9 @@ TEMPLATES = [
 WSGI_APPLICATION = "qchat.wsgi.application"
 ASGI_APPLICATION = "qchat.asgi.application"
 
+# Serve the chatbot read endpoints from the async views in api/async_views.py (qchat.asgi turns this on)
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "false").lower() == "true"
+
 AUTH_USER_MODEL = 'api.User'
 
 # Database configuration (robust: DATABASE_URL -> discrete env vars -> sqlite)
@@ -74,7 +82,6 @@ if database_url:
     DATABASES = {
         "default": dj_database_url.parse(
             database_url,
-            conn_max_age=600,
             ssl_require=os.getenv("DB_SSL_REQUIRE", "false").lower() == "true",
         )
     }
@@ -107,6 +114,88 @@ else:
             }
         }
 
+# Optional read replica for the read-only chatbot and analytics endpoints (see qchat/db_router.py)
+replica_url = os.getenv("REPLICA_DATABASE_URL", "").strip()
+if replica_url:
+    DATABASES["replica"] = dj_database_url.parse(
+        replica_url,
+        ssl_require=os.getenv("DB_SSL_REQUIRE", "false").lower() == "true",
+    )
+    # Under test the replica alias points at the test primary
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    DATABASE_ROUTERS = ["qchat.db_router.PrimaryReplicaRouter"]
+# Replica reads fall back to the primary while it is unreachable or more than this many seconds behind
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+
+# Connection reuse for PostgreSQL, whichever way it is configured above (primary and replica alike).
+# By default each worker thread keeps its connection for DB_CONN_MAX_AGE seconds.
+# DB_POOL=true instead shares a psycopg_pool pool per process (needs psycopg[pool]).
+# DB_CONN_HEALTH_CHECKS verifies a reused connection before the first query of a request.
+for database in DATABASES.values():
+    if "postgresql" not in database["ENGINE"]:
+        continue
+    database["CONN_HEALTH_CHECKS"] = os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+    if os.getenv("DB_POOL", "false").lower() == "true":
+        database["ENGINE"] = "qchat.pooled_postgresql"
+        database["CONN_MAX_AGE"] = 0
+        database.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            # seconds a request waits for a free connection before failing
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+        }
+    else:
+        database["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
+# Request metrics: requests slower than this (ms, 0 disables) log their slowest SQL statements
+METRICS_SLOW_REQUEST_MS = int(os.getenv("METRICS_SLOW_REQUEST_MS", "1000"))
+METRICS_SLOW_QUERY_LOG_COUNT = int(os.getenv("METRICS_SLOW_QUERY_LOG_COUNT", "5"))
+# Bearer token /metrics requires; when unset only loopback and private-network clients may scrape it.
+# Set it whenever a reverse proxy forwards public traffic, since REMOTE_ADDR is then the proxy's.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Response compression (brotli needs the `brotli` package; gzip otherwise). Smaller bodies are sent as they are.
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Cache: shared Redis when REDIS_URL is set (needs the `redis` package), per-process memory otherwise.
+# The master-data, registry and SPC versions live in this cache, so any deployment with more than
+# one worker process must set REDIS_URL; with per-process memory each worker invalidates only itself.
+redis_url = os.getenv("REDIS_URL", "").strip()
+if redis_url:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": redis_url,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "qchat",
+        }
+    }
+
+# Seconds a cached master-data response lives; saves/deletes invalidate it sooner
+MASTER_DATA_CACHE_TIMEOUT = int(os.getenv("MASTER_DATA_CACHE_TIMEOUT", "3600"))
+
+# Seconds a worker's master-data registry snapshot is used before it is reloaded,
+# so plant, building, item and operation rows written outside Django show up
+MASTER_REGISTRY_MAX_AGE = int(os.getenv("MASTER_REGISTRY_MAX_AGE", "60"))
+
+# Days of reading rollups recomputed on every refresh. Readings committed late (concurrent
+# ingestion) or deactivated/edited within this window are picked up; older changes need --rebuild.
+ROLLUP_RESCAN_DAYS = int(os.getenv("ROLLUP_RESCAN_DAYS", "2"))
+
+# Seconds a cached SPC chart lives; new readings of its schedule invalidate it sooner,
+# so this only bounds how long an edit made outside Django goes unnoticed
+SPC_CACHE_TIMEOUT = int(os.getenv("SPC_CACHE_TIMEOUT", "900"))
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
@@ -126,10 +215,21 @@ if not CORS_ALLOW_ALL_ORIGINS:
         os.getenv("FRONTEND_ORIGIN", "http://localhost:3000"),
     ]
 
+# Pagination for list endpoints: default page size and the largest page a client may request
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "100"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+
+# JSON encoder behind every API response (api/renderers.py): "orjson" when that package is installed, or "stdlib"
+API_JSON_RENDERER = os.getenv("API_JSON_RENDERER", "orjson").strip().lower()
+
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "api.renderers.FastJSONRenderer",
+        # ?format=columnar
+        "api.renderers.ColumnarJSONRenderer",
     ],
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.StandardPageNumberPagination",
+    "PAGE_SIZE": API_PAGE_SIZE,
 }
 
 
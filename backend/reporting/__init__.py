@@ -0,0 +1 @@
+# Reporting app: derived tables built from the inspection readings
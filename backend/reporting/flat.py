@@ -0,0 +1,214 @@
+"""
+Build, refresh and query ``FlatReading``, the denormalized readings table.
+
+The table holds exactly the rows the live actual-readings queries return,
+for every inspection type, with one column per field of the API payload. Its
+contents are defined by the same ``reading_values`` querysets the live path
+runs, unioned across the three chains. Serving from it is then one scan of
+one indexed table, at the price of showing readings as of the last refresh.
+
+On PostgreSQL it is a materialized view with a unique index, so
+``REFRESH MATERIALIZED VIEW CONCURRENTLY`` can replace the contents without
+blocking readers. Elsewhere it is a plain table refilled in one transaction.
+"""
+from django.db import OperationalError, ProgrammingError, transaction
+from django.db.models import F, Q
+
+from api.readings import READING, SCHEDULE, READING_CHAINS, actual_readings_queryset, reading_values
+
+from .models import FlatReading
+
+# FlatReading column -> reading_values key it is filled from (and read back as)
+FLAT_COLUMNS = {
+    "actual_reading_id": "id",
+    "inspection_type": "insp_type",
+    "schedule_id": f"{READING}insp_schedule_id",
+    "reading_id": "reading_id",
+    "plant_id": f"{SCHEDULE}plant_id__plant_id",
+    "plant_name": f"{SCHEDULE}plant_id__plant_name",
+    "building_id": f"{SCHEDULE}building__building_id",
+    "building_name": f"{SCHEDULE}building__building_name",
+    "item_code": f"{SCHEDULE}item_code__item_code",
+    "item_description": f"{SCHEDULE}item_code__item_description",
+    "unit": f"{SCHEDULE}item_code__unit",
+    "operation_id": f"{SCHEDULE}operation__operation_id",
+    "operation_name": f"{SCHEDULE}operation__operation_name",
+    "parameter_name": f"{SCHEDULE}inspection_parameter_name",
+    "order_no": "order_no",
+    "lsl": f"{SCHEDULE}lsl",
+    "usl": f"{SCHEDULE}usl",
+    "target_value": f"{SCHEDULE}target_value",
+    "r_key": "r_key",
+    "r_value": "r_value",
+    "created_at": "created_at",
+    "operator": "created_by__username",
+    "remarks": f"{READING}remarks",
+}
+
+# API filter name -> FlatReading column
+FLAT_FILTERS = {
+    "plant_id": "plant_id",
+    "building": "building_id",
+    "item_code": "item_code",
+    "operation": "operation_id",
+    "parameter_name": "parameter_name",
+    "po_no": "order_no",
+}
+
+# (index name, columns, unique). The unique index is what lets PostgreSQL refresh concurrently.
+FLAT_INDEXES = [
+    ("flatreading_type_actual_uniq", ["inspection_type", "actual_reading_id"], True),
+    # keyset pagination, streaming and multi-type requests, in time order
+    ("flatreading_time_type_id_idx", ["created_at", "inspection_type", "actual_reading_id"], False),
+    # single-type requests, in schedule/reading order
+    ("flatreading_type_sched_idx", ["inspection_type", "schedule_id", "reading_id", "actual_reading_id"], False),
+    ("flatreading_plant_item_param_idx", ["plant_id", "item_code", "parameter_name", "created_at"], False),
+    ("flatreading_building_time_idx", ["building_id", "created_at"], False),
+    ("flatreading_order_time_idx", ["order_no", "created_at"], False),
+    ("flatreading_operation_time_idx", ["operation_id", "created_at"], False),
+]
+
+
+def source_query(connection):
+    """
+    ``(sql, params, columns)`` selecting every active reading of every chain
+    in the flat layout; ``columns`` names the FlatReading column of each
+    selected value, in order.
+    """
+    first, *rest = [
+        reading_values(actual_readings_queryset(t, {}).order_by(), t) for t in READING_CHAINS
+    ]
+    qs = first.union(*rest, all=True)
+    # values() selects its plain fields first, then its annotations
+    keys = [*first.query.values_select, *first.query.annotation_select]
+    column_for = {key: column for column, key in FLAT_COLUMNS.items()}
+    columns = [column_for[key] for key in keys]
+    sql, params = qs.query.get_compiler(connection=connection).as_sql()
+    return sql, params, columns
+
+
+class FlatReadingsUnavailable(Exception):
+    """The flat table does not exist yet or, on PostgreSQL, has never been refreshed."""
+
+    def __init__(self):
+        super().__init__(
+            "The flat readings table has not been built yet; "
+            "run `python manage.py refresh_flat_readings` (or use source=readings)."
+        )
+
+
+def check_flat_readings():
+    """Raise ``FlatReadingsUnavailable`` unless the flat table can be read."""
+    try:
+        FlatReading.objects.exists()
+    except (ProgrammingError, OperationalError) as e:
+        raise FlatReadingsUnavailable() from e
+
+
+async def acheck_flat_readings():
+    try:
+        await FlatReading.objects.aexists()
+    except (ProgrammingError, OperationalError) as e:
+        raise FlatReadingsUnavailable() from e
+
+
+def _is_postgres(connection):
+    return connection.vendor == "postgresql"
+
+
+def create_index_sql(connection, name, columns, unique):
+    quote = connection.ops.quote_name
+    return (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {quote(name)} "
+        f"ON {quote(FlatReading._meta.db_table)} ({', '.join(quote(c) for c in columns)})"
+    )
+
+
+def drop_flat_readings(connection):
+    kind = "MATERIALIZED VIEW" if _is_postgres(connection) else "TABLE"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP {kind} IF EXISTS {connection.ops.quote_name(FlatReading._meta.db_table)}")
+
+
+def create_flat_readings(connection):
+    """
+    Create the flat table and its indexes, empty, if they do not exist;
+    ``refresh_flat_readings`` fills them.
+    """
+    quote = connection.ops.quote_name
+    table = quote(FlatReading._meta.db_table)
+    with connection.cursor() as cursor:
+        if _is_postgres(connection):
+            sql, params, columns = source_query(connection)
+            cursor.execute(
+                f"CREATE MATERIALIZED VIEW IF NOT EXISTS {table} "
+                f"({', '.join(quote(c) for c in columns)}) AS {sql} WITH NO DATA",
+                params,
+            )
+        else:
+            definitions = ", ".join(
+                f"{quote(field.column)} {field.db_type(connection)}" for field in FlatReading._meta.local_fields
+            )
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definitions})")
+        for name, columns, unique in FLAT_INDEXES:
+            cursor.execute(create_index_sql(connection, name, columns, unique))
+
+
+def refresh_flat_readings(connection):
+    """
+    Replace the contents with the current readings without blocking readers;
+    returns the number of rows.
+    """
+    quote = connection.ops.quote_name
+    table = quote(FlatReading._meta.db_table)
+    with connection.cursor() as cursor:
+        if _is_postgres(connection):
+            # CONCURRENTLY needs a populated view, so the first refresh after creation runs without it
+            cursor.execute("SELECT relispopulated FROM pg_class WHERE oid = %s::regclass", [FlatReading._meta.db_table])
+            concurrently = " CONCURRENTLY" if cursor.fetchone()[0] else ""
+            cursor.execute(f"REFRESH MATERIALIZED VIEW{concurrently} {table}")
+        else:
+            sql, params, columns = source_query(connection)
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(f"INSERT INTO {table} ({', '.join(quote(c) for c in columns)}) {sql}", params)
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+def flat_queryset(inspection_types, filters):
+    qs = FlatReading.objects.filter(inspection_type__in=inspection_types)
+    for param, column in FLAT_FILTERS.items():
+        value = filters.get(param)
+        if value:
+            qs = qs.filter(**{column: value})
+    return qs
+
+
+def flat_values(qs):
+    """Rows keyed like ``reading_values``, so ``serialize_reading`` and the cursors apply unchanged."""
+    same = [column for column, key in FLAT_COLUMNS.items() if column == key]
+    renamed = {key: F(column) for column, key in FLAT_COLUMNS.items() if column != key}
+    return qs.values(*same, **renamed)
+
+
+def flat_readings_rows(inspection_types, filters):
+    """Flat counterpart of ``readings_rows``, in the same order."""
+    if len(inspection_types) == 1:
+        order = ("schedule_id", "reading_id", "actual_reading_id")
+    else:
+        order = ("created_at", "actual_reading_id")
+    return flat_values(flat_queryset(inspection_types, filters).order_by(*order))
+
+
+def flat_ordered_readings(inspection_types, filters, after=None):
+    """Flat counterpart of ``ordered_readings``: keyset order, optionally after a decoded cursor."""
+    qs = flat_queryset(inspection_types, filters)
+    if after:
+        created_at, inspection_type, pk = after
+        qs = qs.filter(
+            Q(created_at__gt=created_at)
+            | Q(created_at=created_at, inspection_type__gt=inspection_type)
+            | Q(created_at=created_at, inspection_type=inspection_type, actual_reading_id__gt=pk)
+        )
+    return flat_values(qs.order_by("created_at", "inspection_type", "actual_reading_id"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from reporting.flat import create_flat_readings, drop_flat_readings, refresh_flat_readings
+
+
+class Command(BaseCommand):
+    help = "Create (if needed) and refresh the flat readings table behind actual-readings?source=flat."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to run against.")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop and recreate it first, e.g. after the reading or master-data columns changed.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if options["rebuild"]:
+            drop_flat_readings(connection)
+            self.stdout.write("Dropped reporting_flatreading")
+        create_flat_readings(connection)
+        rows = refresh_flat_readings(connection)
+        self.stdout.write(f"reporting_flatreading: {rows} readings")
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.readings import READING_CHAINS
+from reporting.rollups import DEFAULT_BATCH_SIZE, GRANULARITIES, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new actual readings into the per-parameter hourly/daily rollups and recompute the recent ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--inspection-type",
+            action="append",
+            choices=list(READING_CHAINS),
+            help="Only refresh this inspection type (repeatable). Defaults to all.",
+        )
+        parser.add_argument(
+            "--granularity",
+            action="append",
+            choices=GRANULARITIES,
+            help="Only maintain this bucket size (repeatable). Defaults to hour and day.",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Reading ids per grouped query.")
+        parser.add_argument(
+            "--rescan-days",
+            type=int,
+            help="Days of buckets to recompute on every run. Defaults to ROLLUP_RESCAN_DAYS.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the rollups and watermarks first and recompute from scratch.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive")
+        if options["rescan_days"] is not None and options["rescan_days"] < 0:
+            raise CommandError("--rescan-days must not be negative")
+        processed = refresh_rollups(
+            inspection_types=options["inspection_type"],
+            granularities=options["granularity"] or GRANULARITIES,
+            batch_size=options["batch_size"],
+            rebuild=options["rebuild"],
+            rescan_days=options["rescan_days"],
+        )
+        for inspection_type, count in processed.items():
+            self.stdout.write(f"{inspection_type}: {count} readings folded in")
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inspection_type', models.CharField(max_length=20, unique=True)),
+                ('last_reading_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'reporting_rollupwatermark',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('inspection_type', models.CharField(max_length=20)),
+                ('granularity', models.CharField(max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('plant_code', models.CharField(max_length=255)),
+                ('building_code', models.CharField(max_length=255)),
+                ('item_code', models.CharField(max_length=255)),
+                ('operation_code', models.CharField(blank=True, default='', max_length=255)),
+                ('parameter_name', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.FloatField(default=0.0)),
+                ('sum_sq_dev', models.FloatField(default=0.0)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('out_of_spec', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'reporting_readingrollup',
+                'indexes': [models.Index(fields=['plant_code', 'item_code', 'parameter_name', 'granularity', 'bucket_start'], name='rollup_param_bucket_idx')],
+                'unique_together': {('inspection_type', 'granularity', 'bucket_start', 'plant_code', 'building_code', 'item_code', 'operation_code', 'parameter_name')},
+            },
+        ),
+    ]
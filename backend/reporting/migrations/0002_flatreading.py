@@ -0,0 +1,45 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlatReading',
+            fields=[
+                ('actual_reading_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('inspection_type', models.CharField(max_length=20)),
+                ('schedule_id', models.BigIntegerField()),
+                ('reading_id', models.BigIntegerField()),
+                ('plant_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('plant_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('building_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('building_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('item_code', models.CharField(blank=True, max_length=255, null=True)),
+                ('item_description', models.CharField(blank=True, max_length=255, null=True)),
+                ('unit', models.CharField(blank=True, max_length=255, null=True)),
+                ('operation_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('operation_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('parameter_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('order_no', models.CharField(blank=True, max_length=100, null=True)),
+                ('lsl', models.FloatField(blank=True, null=True)),
+                ('usl', models.FloatField(blank=True, null=True)),
+                ('target_value', models.FloatField(blank=True, null=True)),
+                ('r_key', models.CharField(blank=True, max_length=100, null=True)),
+                ('r_value', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('operator', models.CharField(blank=True, max_length=150, null=True)),
+                ('remarks', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+            options={
+                'db_table': 'reporting_flatreading',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import models
+
+
+class ReadingRollup(models.Model):
+    """
+    Pre-aggregated actual readings per parameter and time bucket.
+
+    Master data is stored by code rather than foreign key so the table can be
+    managed independently of the externally owned ``master_*`` tables. The
+    spread is kept as the sum of squared deviations from the bucket mean,
+    which merges exactly and stays precise for tight tolerances.
+    """
+    id = models.BigAutoField(primary_key=True)
+    inspection_type = models.CharField(max_length=20)
+    granularity = models.CharField(max_length=10)
+    bucket_start = models.DateTimeField()
+    plant_code = models.CharField(max_length=255)
+    building_code = models.CharField(max_length=255)
+    item_code = models.CharField(max_length=255)
+    operation_code = models.CharField(max_length=255, blank=True, default="")
+    parameter_name = models.CharField(max_length=255, blank=True, default="")
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+    sum_sq_dev = models.FloatField(default=0.0)
+    min_value = models.FloatField(blank=True, null=True)
+    max_value = models.FloatField(blank=True, null=True)
+    out_of_spec = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reporting_readingrollup'
+        unique_together = ((
+            'inspection_type', 'granularity', 'bucket_start', 'plant_code',
+            'building_code', 'item_code', 'operation_code', 'parameter_name',
+        ),)
+        indexes = [
+            models.Index(
+                fields=['plant_code', 'item_code', 'parameter_name', 'granularity', 'bucket_start'],
+                name='rollup_param_bucket_idx',
+            ),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """Highest actual-reading id already folded into the rollups, per inspection type."""
+    inspection_type = models.CharField(max_length=20, unique=True)
+    last_reading_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reporting_rollupwatermark'
+
+
+class FlatReading(models.Model):
+    """
+    Every active actual reading joined to its header, schedule and master
+    data, unioned across the three inspection chains.
+
+    On PostgreSQL this is the ``reporting_flatreading`` materialized view; on
+    other databases it is a plain table. Either way it is built and refreshed
+    by ``refresh_flat_readings`` (see ``reporting/flat.py``), never by
+    migrations. ``actual_reading_id`` is only unique together with
+    ``inspection_type``; rows are read through ``values()``.
+    """
+    actual_reading_id = models.BigIntegerField(primary_key=True)
+    inspection_type = models.CharField(max_length=20)
+    schedule_id = models.BigIntegerField()
+    reading_id = models.BigIntegerField()
+    plant_id = models.CharField(max_length=255, blank=True, null=True)
+    plant_name = models.CharField(max_length=255, blank=True, null=True)
+    building_id = models.CharField(max_length=255, blank=True, null=True)
+    building_name = models.CharField(max_length=255, blank=True, null=True)
+    item_code = models.CharField(max_length=255, blank=True, null=True)
+    item_description = models.CharField(max_length=255, blank=True, null=True)
+    unit = models.CharField(max_length=255, blank=True, null=True)
+    operation_id = models.CharField(max_length=255, blank=True, null=True)
+    operation_name = models.CharField(max_length=255, blank=True, null=True)
+    parameter_name = models.CharField(max_length=255, blank=True, null=True)
+    order_no = models.CharField(max_length=100, blank=True, null=True)
+    lsl = models.FloatField(blank=True, null=True)
+    usl = models.FloatField(blank=True, null=True)
+    target_value = models.FloatField(blank=True, null=True)
+    r_key = models.CharField(max_length=100, blank=True, null=True)
+    r_value = models.FloatField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    operator = models.CharField(max_length=150, blank=True, null=True)
+    remarks = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'reporting_flatreading'
@@ -0,0 +1,269 @@
+"""
+Incremental maintenance and querying of ``ReadingRollup``.
+
+A refresh does two things per inspection type:
+
+- Buckets older than a trailing window (``ROLLUP_RESCAN_DAYS``) only take in
+  actual readings with an id above the per-type watermark.
+- Buckets inside the window are dropped and recomputed from the readings.
+
+Ids are handed out when a row is inserted but become visible when its
+transaction commits, so under concurrent ingestion a lower id can appear after
+a higher one was folded. The watermark alone would skip it forever; the
+re-scanned window picks it up, along with readings deactivated or edited in
+that time. Changes to readings older than the window need ``--rebuild``.
+
+Each batch is grouped in the database by (master-data key, time bucket) and
+merged into the rollup rows, so the cost of a refresh is proportional to the
+new readings plus the window, not to the size of the reading tables.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Variance
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from api.analytics import capability, merge_moments, out_of_spec_q, schedule_spec_for
+from api.readings import READING_CHAINS, SCHEDULE, actual_readings_queryset
+
+from .models import ReadingRollup, RollupWatermark
+
+GRANULARITIES = ("hour", "day")
+DEFAULT_BATCH_SIZE = 50000
+
+# ReadingRollup field -> lookup on the actual-reading queryset
+KEY_FIELDS = {
+    "plant_code": f"{SCHEDULE}plant_id__plant_id",
+    "building_code": f"{SCHEDULE}building__building_id",
+    "item_code": f"{SCHEDULE}item_code__item_code",
+    "operation_code": f"{SCHEDULE}operation__operation_id",
+    "parameter_name": f"{SCHEDULE}inspection_parameter_name",
+}
+
+# API filter name -> ReadingRollup field
+ROLLUP_FILTERS = {
+    "plant_id": "plant_code",
+    "building": "building_code",
+    "item_code": "item_code",
+    "operation": "operation_code",
+    "parameter_name": "parameter_name",
+}
+
+
+def merge_into(row, count, mean, m2, min_value, max_value, out_of_spec):
+    """Fold one batch group into a rollup row (parallel-variance merge)."""
+    if row.count:
+        old_mean = row.total / row.count
+        total_count = row.count + count
+        delta = mean - old_mean
+        row.sum_sq_dev += m2 + delta * delta * row.count * count / total_count
+        row.min_value = min(row.min_value, min_value)
+        row.max_value = max(row.max_value, max_value)
+    else:
+        total_count = count
+        row.sum_sq_dev = m2
+        row.min_value = min_value
+        row.max_value = max_value
+    row.count = total_count
+    row.total += mean * count
+    row.out_of_spec += out_of_spec
+
+
+def batch_groups(qs, granularity):
+    """Per (key, bucket) count/mean/population variance/min/max/out-of-spec for a batch."""
+    return (
+        qs.annotate(bucket=Trunc("created_at", granularity))
+        .values("bucket", *KEY_FIELDS.values())
+        .annotate(
+            count=Count("r_value"),
+            mean=Avg("r_value"),
+            variance=Variance("r_value"),
+            min=Min("r_value"),
+            max=Max("r_value"),
+            out_of_spec=Count("id", filter=out_of_spec_q()),
+        )
+        .order_by()
+    )
+
+
+def apply_batch(inspection_type, qs, granularities):
+    """Merge one batch of readings into the rollups for every granularity; returns the reading count."""
+    readings = 0
+    for granularity in granularities:
+        groups = [g for g in batch_groups(qs, granularity) if g["count"]]
+        readings = sum(g["count"] for g in groups)
+        if not groups:
+            continue
+        existing = {
+            (
+                r.bucket_start, r.plant_code, r.building_code,
+                r.item_code, r.operation_code, r.parameter_name,
+            ): r
+            for r in ReadingRollup.objects.filter(
+                inspection_type=inspection_type,
+                granularity=granularity,
+                bucket_start__in={g["bucket"] for g in groups},
+            )
+        }
+        to_create, to_update = {}, {}
+        for g in groups:
+            codes = {field: g[lookup] or "" for field, lookup in KEY_FIELDS.items()}
+            key = (g["bucket"], *codes.values())
+            row = existing.get(key) or to_create.get(key)
+            if row is None:
+                row = ReadingRollup(
+                    inspection_type=inspection_type,
+                    granularity=granularity,
+                    bucket_start=g["bucket"],
+                    **codes,
+                )
+                to_create[key] = row
+            elif row.pk:
+                to_update[key] = row
+            merge_into(
+                row, g["count"], g["mean"], (g["variance"] or 0.0) * g["count"],
+                g["min"], g["max"], g["out_of_spec"],
+            )
+        ReadingRollup.objects.bulk_create(to_create.values())
+        ReadingRollup.objects.bulk_update(
+            to_update.values(),
+            ["count", "total", "sum_sq_dev", "min_value", "max_value", "out_of_spec", "updated_at"],
+        )
+    return readings
+
+
+def rescan_start(days):
+    """Start of the re-scanned window: ``days`` back, on a day boundary so no bucket is split."""
+    start = timezone.localtime(timezone.now() - timedelta(days=days))
+    return start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def fold(inspection_type, qs, granularities, batch_size):
+    """Merge the readings of ``qs`` into the rollups, ``batch_size`` ids per grouped query."""
+    bounds = qs.aggregate(lower=Min("id"), upper=Max("id"))
+    if bounds["lower"] is None:
+        return 0
+    readings = 0
+    start = bounds["lower"] - 1
+    while start < bounds["upper"]:
+        end = min(start + batch_size, bounds["upper"])
+        readings += apply_batch(inspection_type, qs.filter(id__gt=start, id__lte=end), granularities)
+        start = end
+    return readings
+
+
+def refresh_rollups(
+    inspection_types=None, granularities=GRANULARITIES, batch_size=DEFAULT_BATCH_SIZE, rebuild=False, rescan_days=None,
+):
+    """
+    Fold readings above each type's watermark into the settled buckets and
+    recompute the last ``rescan_days`` (default ``ROLLUP_RESCAN_DAYS``).
+
+    Returns ``{inspection_type: readings folded in}``, the re-scanned ones
+    included. Each type is refreshed in one transaction, so readers see the
+    old or the new rollups, never a half-recomputed window. ``rebuild`` drops
+    the rollups and watermarks for the given types first, which also picks
+    up readings deactivated or edited before the window.
+    """
+    since = rescan_start(settings.ROLLUP_RESCAN_DAYS if rescan_days is None else rescan_days)
+    processed = {}
+    for inspection_type in inspection_types or READING_CHAINS:
+        actual_model = READING_CHAINS[inspection_type]["actual_model"]
+        rollups = ReadingRollup.objects.filter(inspection_type=inspection_type, granularity__in=granularities)
+        with transaction.atomic():
+            if rebuild:
+                ReadingRollup.objects.filter(inspection_type=inspection_type).delete()
+                RollupWatermark.objects.filter(inspection_type=inspection_type).delete()
+            upper = actual_model.objects.aggregate(upper=Max("id"))["upper"] or 0
+            watermark, _ = RollupWatermark.objects.get_or_create(inspection_type=inspection_type)
+            readings = actual_readings_queryset(inspection_type, {}).filter(id__lte=upper, r_value__isnull=False)
+            settled = readings.filter(id__gt=watermark.last_reading_id, created_at__lt=since)
+            processed[inspection_type] = fold(inspection_type, settled, granularities, batch_size)
+            rollups.filter(bucket_start__gte=since).delete()
+            processed[inspection_type] += fold(
+                inspection_type, readings.filter(created_at__gte=since), granularities, batch_size,
+            )
+            watermark.last_reading_id = upper
+            watermark.save(update_fields=["last_reading_id", "updated_at"])
+    return processed
+
+
+def rollup_queryset(inspection_types, filters, granularity, days=None):
+    """
+    Rollup rows matching ``filters``. A filter the rollups are not keyed by
+    (the PO/IO number) raises ValueError rather than being ignored.
+    """
+    unsupported = sorted(param for param, value in filters.items() if value and param not in ROLLUP_FILTERS)
+    if unsupported:
+        raise ValueError(f"rollups cannot be filtered by {', '.join(unsupported)}")
+    qs = ReadingRollup.objects.filter(inspection_type__in=inspection_types, granularity=granularity)
+    for param, field in ROLLUP_FILTERS.items():
+        value = filters.get(param)
+        if value:
+            qs = qs.filter(**{field: value})
+    if days:
+        qs = qs.filter(bucket_start__gte=timezone.now() - timedelta(days=days))
+    return qs
+
+
+def rollup_parts(rows):
+    """Rollup rows as the (count, mean, variance, min, max) parts ``merge_moments`` expects."""
+    return [
+        {
+            "count": r.count,
+            "mean": r.total / r.count,
+            "variance": r.sum_sq_dev / r.count,
+            "min": r.min_value,
+            "max": r.max_value,
+        }
+        for r in rows
+        if r.count
+    ]
+
+
+def rollup_series_and_stats(inspection_types, filters, days=None, granularity=None):
+    """
+    Same payload as ``parameter_series_and_stats``, read from the rollups.
+
+    Readings newer than the last refresh are not included. The series has
+    one point per rollup bucket: daily by default, hourly for windows of up
+    to two weeks.
+    """
+    if granularity is None:
+        granularity = "hour" if days and days <= 14 else "day"
+    rows = list(rollup_queryset(inspection_types, filters, granularity, days).order_by("bucket_start"))
+    moments = merge_moments(rollup_parts(rows))
+    if moments is None:
+        return None
+    # from the schedules: scanning the readings for it would undo the point of the rollups
+    spec = schedule_spec_for(inspection_types, filters)
+    cp, cpk = capability(moments["mean"], moments["stddev"], spec["lsl"], spec["usl"])
+
+    buckets = {}
+    for r in rows:
+        buckets.setdefault(r.bucket_start, []).append(r)
+    series = []
+    for bucket, bucket_rows in buckets.items():
+        merged = merge_moments(rollup_parts(bucket_rows))
+        if merged:
+            series.append({
+                "timestamp": bucket.isoformat(),
+                "value": merged["mean"],
+                "min": merged["min"],
+                "max": merged["max"],
+                "count": merged["count"],
+            })
+    return {
+        "spec": spec,
+        "stats": {
+            **moments,
+            "out_of_spec": sum(r.out_of_spec for r in rows),
+            "cp": cp,
+            "cpk": cpk,
+        },
+        "series": series,
+        "downsample": {"method": "rollup", "bucket": granularity, "points": len(series)},
+        "range": {"start": rows[0].bucket_start.isoformat(), "end": rows[-1].bucket_start.isoformat()},
+    }
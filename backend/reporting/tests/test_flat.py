@@ -0,0 +1,34 @@
+from django.db import connection
+from django.test import TestCase
+
+from api.tests.fixtures import master_data, readings, schedule
+from reporting.flat import create_flat_readings, drop_flat_readings, refresh_flat_readings
+
+URL = "/api/inspections/actual-readings/"
+EXPORT_URL = "/api/inspections/readings/export/"
+
+
+class FlatSourceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        master = master_data()
+        for inspection_type in ("Inward", "In-process", "Final"):
+            readings(inspection_type, schedule(master, inspection_type), [[9.9, 10.1], [10.0]])
+
+    def tearDown(self):
+        drop_flat_readings(connection)
+
+    def test_unbuilt_table_is_a_503_naming_the_command(self):
+        for url, params in ((URL, {}), (URL, {"stream": "true"}), (URL, {"page_size": "2"}), (EXPORT_URL, {})):
+            response = self.client.get(url, {"inspection_type": "all", "source": "flat", **params})
+            self.assertEqual(response.status_code, 503, url)
+            self.assertIn("refresh_flat_readings", response.json()["error"])
+
+    def test_serves_the_same_rows_as_the_reading_tables(self):
+        create_flat_readings(connection)
+        self.assertEqual(refresh_flat_readings(connection), 9)
+        for inspection_type in ("all", "In-process"):
+            flat = self.client.get(URL, {"inspection_type": inspection_type, "source": "flat"})
+            live = self.client.get(URL, {"inspection_type": inspection_type})
+            self.assertEqual(flat.status_code, 200)
+            self.assertEqual(flat.json(), live.json())
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.readings import chain_models
+from api.tests.fixtures import master_data, readings, schedule
+from reporting.models import ReadingRollup
+from reporting.rollups import refresh_rollups
+
+URL = "/api/parameters/series-and-stats/"
+
+
+class RollupSeriesAndStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = master_data()
+        in_process = schedule(cls.master, "In-process")
+        readings("In-process", in_process, [[9.5, 10.0], [10.5]], order_no="PO1")
+        readings("In-process", in_process, [[11.5, 12.0]], order_no="PO2")
+        readings("Final", schedule(cls.master, "Final", lsl=8.0, usl=12.0), [[8.5]], order_no="PO3")
+        refresh_rollups()
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        return self.client.get(URL, {"factoryId": "P1", "parameter": "Length", **params})
+
+    def test_rollup_stats_match_the_readings(self):
+        rollup = self.get(source="rollup").json()
+        raw = self.get().json()
+        self.assertEqual(rollup["stats"]["count"], raw["stats"]["count"])
+        self.assertEqual(rollup["stats"]["out_of_spec"], raw["stats"]["out_of_spec"])
+        self.assertAlmostEqual(rollup["stats"]["mean"], raw["stats"]["mean"])
+        self.assertAlmostEqual(rollup["stats"]["stddev"], raw["stats"]["stddev"])
+        self.assertEqual(rollup["spec"], raw["spec"])
+
+    def test_rollup_never_reads_the_reading_tables(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.get(source="rollup").status_code, 200)
+        for query in captured.captured_queries:
+            self.assertNotIn("reading", query["sql"].replace("readingrollup", ""))
+
+    def test_spec_of_the_first_matching_schedule(self):
+        spec = self.get(source="rollup", inspection_type="Final").json()["spec"]
+        self.assertEqual((spec["lsl"], spec["usl"]), (8.0, 12.0))
+
+    def test_order_number_filter_is_rejected(self):
+        response = self.get(source="rollup", poNo="PO1")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("poNo", response.json()["error"])
+        self.assertEqual(self.get(poNo="PO1").json()["stats"]["count"], 3)
+
+
+class RefreshRollupsTests(TestCase):
+    def setUp(self):
+        self.schedule = schedule(master_data(), "In-process")
+        _, _, self.actual_model = chain_models("In-process")
+
+    def add(self, values, at=None):
+        headers = readings("In-process", self.schedule, [[value] for value in values], at=at)
+        return list(self.actual_model.objects.filter(reading_id__in=headers).order_by("id"))
+
+    def rolled_up(self, granularity="day"):
+        rows = ReadingRollup.objects.filter(inspection_type="In-process", granularity=granularity)
+        return rows.aggregate(count=Sum("count"), total=Sum("total"))
+
+    def test_lower_id_committed_after_a_higher_one_is_picked_up(self):
+        first, late, last = self.add([9.0, 10.0, 11.0])
+        # the middle reading's transaction has not committed when the refresh runs
+        late_id = late.pk
+        late.delete()
+        refresh_rollups(["In-process"])
+        self.assertEqual(self.rolled_up(), {"count": 2, "total": 20.0})
+        late.pk = late_id
+        self.actual_model.objects.bulk_create([late])
+        refresh_rollups(["In-process"])
+        self.assertEqual(self.rolled_up(), {"count": 3, "total": 30.0})
+        self.assertEqual(self.rolled_up("hour")["count"], 3)
+
+    def test_deactivated_reading_leaves_the_recent_rollups(self):
+        first, second = self.add([9.0, 10.0])
+        refresh_rollups(["In-process"])
+        self.actual_model.objects.filter(pk=second.pk).update(is_active=False)
+        refresh_rollups(["In-process"])
+        self.assertEqual(self.rolled_up(), {"count": 1, "total": 9.0})
+
+    def test_repeated_refreshes_count_each_reading_once(self):
+        self.add([9.0, 10.0])
+        self.add([11.0], at=timezone.now() - timedelta(days=10))
+        for _ in range(3):
+            refresh_rollups(["In-process"])
+        self.assertEqual(self.rolled_up(), {"count": 3, "total": 30.0})
+
+    def test_old_readings_above_the_watermark_are_folded_once(self):
+        self.add([9.0])
+        refresh_rollups(["In-process"])
+        self.add([11.0], at=timezone.now() - timedelta(days=10))
+        refresh_rollups(["In-process"])
+        refresh_rollups(["In-process"])
+        self.assertEqual(self.rolled_up(), {"count": 2, "total": 20.0})
+
+    def test_changes_older_than_the_window_need_a_rebuild(self):
+        (old,) = self.add([11.0], at=timezone.now() - timedelta(days=10))
+        refresh_rollups(["In-process"])
+        self.actual_model.objects.filter(pk=old.pk).update(is_active=False)
+        refresh_rollups(["In-process"])
+        self.assertEqual(self.rolled_up()["count"], 1)
+        refresh_rollups(["In-process"], rebuild=True)
+        self.assertIsNone(self.rolled_up()["count"])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Measure what compression and conditional GET save on the actual-readings endpoint.
+
+Start a server, for example ``python manage.py runserver 8000``, then run:
+
+    python scripts/benchmark_compression.py --base http://127.0.0.1:8000 --inspection-type all
+
+For each of identity, gzip and brotli it prints:
+- the bytes on the wire
+- the server latency (until the last byte, on the local link)
+- an estimate of the total time over a slow link (``--link-mbps``, default 5)
+
+The same is printed for a revalidation with ``If-None-Match``, which is
+answered with an empty ``304``. Only the standard library is used.
+"""
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def fetch(url, headers):
+    """One GET; returns (status, body bytes as sent, response headers, seconds)."""
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            body = response.read()
+            status, response_headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status, response_headers = e.code, e.headers
+    return status, body, response_headers, time.perf_counter() - start
+
+
+def measure(url, headers, repeat):
+    fetch(url, headers)  # warm-up
+    results = [fetch(url, headers) for _ in range(repeat)]
+    status, body, response_headers, _ = results[-1]
+    return {
+        "status": status,
+        "bytes": len(body),
+        "encoding": response_headers.get("Content-Encoding", "identity"),
+        "etag": response_headers.get("ETag"),
+        "p50": statistics.median(seconds for *_, seconds in results) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", default="http://127.0.0.1:8000", help="Base URL of the server.")
+    parser.add_argument("--inspection-type", default="all", help="inspection_type to request (default all).")
+    parser.add_argument("--query", default="", help="Extra query string, e.g. 'plant_id=P1&format=columnar'.")
+    parser.add_argument("--repeat", type=int, default=10, help="Requests per variant (default 10).")
+    parser.add_argument("--link-mbps", type=float, default=5.0, help="Slow-link bandwidth for the estimate (default 5).")
+    args = parser.parse_args()
+
+    query = urllib.parse.urlencode({"inspection_type": args.inspection_type})
+    if args.query:
+        query += "&" + args.query
+    url = f"{args.base}/api/inspections/actual-readings/?{query}"
+    print(f"GET {url}, {args.repeat} requests per variant\n")
+
+    header = f"{'variant':<16} {'status':>6} {'bytes':>12} {'ratio':>7} {'p50 ms':>9} {f'@{args.link_mbps:g} Mbit/s ms':>18}"
+    print(header)
+    print("-" * len(header))
+    baseline = None
+    for name, accept in (("identity", "identity"), ("gzip", "gzip"), ("brotli", "br")):
+        headers = {"Accept-Encoding": accept}
+        full = measure(url, headers, args.repeat)
+        revalidated = measure(url, {**headers, "If-None-Match": full["etag"] or '""'}, args.repeat)
+        if baseline is None:
+            baseline = full["bytes"] or 1
+        for label, r in ((name, full), (f"{name} 304", revalidated)):
+            slow_link = r["p50"] + r["bytes"] * 8 / (args.link_mbps * 1000)
+            print(
+                f"{label:<16} {r['status']:>6} {r['bytes']:>12,} {r['bytes'] / baseline:>7.1%} "
+                f"{r['p50']:>9.1f} {slow_link:>18.1f}"
+            )
+        if full["encoding"] != accept:
+            print(f"  (server answered with {full['encoding']})")
+
+
+if __name__ == "__main__":
+    main()
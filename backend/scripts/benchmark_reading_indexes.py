@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Show query plans and timings for the inspection-reading hot paths before and
+after creating the composite indexes from ``create_reading_indexes``.
+
+    python scripts/benchmark_reading_indexes.py               # drop, measure, create, measure
+    python scripts/benchmark_reading_indexes.py --keep-existing  # only measure the current state
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import Django settings
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qchat.settings")
+
+import django
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+
+from api.analytics import analytics_querysets
+from api.models import MasterInspectionschedule, MasterInprocessinspectionreading
+from api.readings import actual_readings_queryset, ordered_readings, reading_values
+
+
+def sample_filters():
+    """Filter values taken from real data so the planner sees realistic selectivity."""
+    reading = (
+        MasterInprocessinspectionreading.objects.filter(is_active=True, insp_schedule_id__is_active=True)
+        .select_related("insp_schedule_id__plant_id", "insp_schedule_id__item_code")
+        .order_by("-id")
+        .first()
+    )
+    if reading is None:
+        return None
+    schedule = reading.insp_schedule_id
+    return {
+        "plant_id": schedule.plant_id.plant_id,
+        "item_code": schedule.item_code.item_code,
+        "parameter_name": schedule.inspection_parameter_name,
+        "po_no": reading.po_no,
+    }
+
+
+def hot_queries(filters):
+    """Representative querysets for each endpoint that reads the reading tables."""
+    per_schedule = dict(filters)
+    per_schedule.pop("po_no")
+    return {
+        "readings by PO (actual-readings)": reading_values(
+            actual_readings_queryset("In-process", filters).order_by("reading_id__insp_schedule_id", "reading_id", "id"),
+            "In-process",
+        ),
+        "keyset page (actual-readings?page_size=500)": ordered_readings(["In-process"], per_schedule)[:500],
+        "30-day stats (series-and-stats)": analytics_querysets(["In-process"], per_schedule, days=30)["In-process"]
+        .values("r_value"),
+        "schedule lookup": MasterInspectionschedule.objects.filter(
+            is_active=True,
+            plant_id__plant_id=filters["plant_id"],
+            item_code__item_code=filters["item_code"],
+            inspection_type="In-process",
+            inspection_parameter_name=filters["parameter_name"],
+        ).values("id"),
+    }
+
+
+def explain(qs):
+    if connection.vendor == "postgresql":
+        return qs.explain(analyze=True, buffers=True)
+    return qs.explain()
+
+
+def measure(label, runs):
+    filters = sample_filters()
+    if filters is None:
+        print("No in-process readings found; generate some data first.")
+        sys.exit(1)
+    print(f"\n{'=' * 80}\n{label}  (filters: {filters})\n{'=' * 80}")
+    for name, qs in hot_queries(filters).items():
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            list(qs.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"\n--- {name}: median {statistics.median(timings):.2f} ms over {runs} runs")
+        print(explain(qs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per query.")
+    parser.add_argument("--keep-existing", action="store_true", help="Do not drop/create indexes; just measure.")
+    args = parser.parse_args()
+
+    if args.keep_existing:
+        measure("Current indexes", args.runs)
+        return
+    call_command("create_reading_indexes", "--drop")
+    measure("BEFORE: foreign-key indexes only", args.runs)
+    call_command("create_reading_indexes")
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    measure("AFTER: composite partial indexes", args.runs)
+
+
+if __name__ == "__main__":
+    main()
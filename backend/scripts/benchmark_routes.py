@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+"""
+Benchmark every route in ``api/urls.py`` at one or more data sizes and
+store the results as JSON, so two commits can be compared.
+
+    python scripts/benchmark_routes.py                          # small and medium
+    python scripts/benchmark_routes.py --scales small medium large --repeat 50
+    python scripts/benchmark_routes.py --current-db             # the configured database, as it is
+    python scripts/benchmark_routes.py --compare .benchmarks/results/<earlier run>.json
+
+For each scale a SQLite database, ``.benchmarks/synthetic-<scale>.sqlite3``,
+is created once with ``generate_synthetic_data --refresh-reporting`` and
+reused by later runs (``--regenerate`` rebuilds it). Each scale runs in its
+own process, so caches and peak memory do not carry over between sizes.
+
+Requests go through Django's test client: the whole middleware stack runs
+in-process, with no server or network. For every route scenario:
+- a cold request, right after the cache is cleared
+- a warm-up, then ``--repeat`` timed requests: p50/p95/p99, mean and max latency
+- the queries run by the cold request and by a warm one
+- the peak Python memory allocated by a warm request (tracemalloc)
+
+The bulk ingest route is measured inside a transaction that is rolled back,
+so the data stays the same from run to run.
+
+The cache is the process-local one even when ``REDIS_URL`` is set, so
+clearing it touches nothing shared. ``--compare`` prints the change per
+route against an earlier results file. It exits with status 1 when a p95
+grew past ``--threshold`` or a query count went up.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+WORK_DIR = BASE_DIR / ".benchmarks"
+DEFAULT_SCALES = ("small", "medium")
+# Latency below this many milliseconds is noise for --compare
+NOISE_MS = 1.0
+# Routes that write; their requests are rolled back afterwards
+WRITE_ROUTES = {"inspection-readings-bulk"}
+
+
+def git_state():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def setup_django(database_url=None, async_views=False):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qchat.settings")
+    os.environ.setdefault("DJANGO_DEBUG", "false")
+    # set rather than removed, so backend/.env cannot bring them back
+    os.environ["REDIS_URL"] = ""
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+        os.environ["REPLICA_DATABASE_URL"] = ""
+    if async_views:
+        os.environ["ASYNC_READ_VIEWS"] = "true"
+    import django
+    django.setup()
+    from django.test.utils import setup_test_environment
+    setup_test_environment()  # lets the test client's host through ALLOWED_HOSTS
+
+
+# ---------------------------------------------------------------------------
+# Scenarios: what to request for every route, with values from the database
+
+
+def sample_values():
+    """Codes and ids of one In-process schedule that has readings, and of what it hangs off."""
+    from api.models import MasterInprocessinspectionreading, MasterProductionplanner
+
+    reading = (
+        MasterInprocessinspectionreading.objects.filter(is_active=True, insp_schedule_id__is_active=True)
+        .select_related(
+            "insp_schedule_id__plant_id", "insp_schedule_id__building",
+            "insp_schedule_id__item_code", "insp_schedule_id__operation",
+        )
+        .order_by("id")
+        .first()
+    )
+    if reading is None:
+        raise SystemExit("No In-process readings to benchmark; run generate_synthetic_data first")
+    schedule = reading.insp_schedule_id
+    planner = MasterProductionplanner.objects.filter(order_number=reading.po_no).first()
+    return {
+        "schedule": schedule,
+        "plant": schedule.plant_id,
+        "building": schedule.building,
+        "item": schedule.item_code,
+        "operation": schedule.operation,
+        "parameter": schedule.inspection_parameter_name,
+        "po_no": reading.po_no,
+        "planner": planner,
+    }
+
+
+def router_scenarios():
+    """List and detail of every router-registered viewset."""
+    from django.urls import reverse
+    from api.urls import router
+
+    scenarios = []
+    for prefix, viewset, basename in router.registry:
+        scenarios.append((f"{basename}-list", "list", "GET", reverse(f"{basename}-list"), None))
+        lookup = getattr(viewset, "lookup_field", "pk")
+        obj = viewset.queryset.order_by("pk").first()
+        if obj is not None:
+            kwargs = {getattr(viewset, "lookup_url_kwarg", None) or lookup: getattr(obj, lookup)}
+            scenarios.append((f"{basename}-detail", "detail", "GET", reverse(f"{basename}-detail", kwargs=kwargs), None))
+    return scenarios
+
+
+def scenarios():
+    """``(route name, label, method, path, query params or JSON body)`` for each case to measure."""
+    from django.urls import reverse
+    from api.export import pyarrow
+
+    v = sample_values()
+    plant, building, item, operation, schedule = v["plant"], v["building"], v["item"], v["operation"], v["schedule"]
+    analytics = {
+        "factoryId": plant.plant_id, "section": building.building_id, "itemCode": item.item_code,
+        "operation": operation.operation_id if operation else None, "parameter": v["parameter"],
+        "inspection_type": "In-process",
+    }
+    readings = reverse("actual-inspection-readings")
+    export = reverse("inspection-readings-export")
+    cases = [
+        ("api-root", "root", "GET", reverse("api-root"), None),
+        *router_scenarios(),
+        ("initial-data", "all", "GET", reverse("initial-data"), None),
+        ("factory-sections", "plant", "GET", reverse("factory-sections", kwargs={"factory_id": plant.plant_id}), None),
+        ("itemcodes-by-building", "building", "GET", reverse("itemcodes-by-building"), {"building": building.pk}),
+        ("itemcodes-by-building", "prefix", "GET", reverse("itemcodes-by-building"),
+         {"building": building.pk, "prefix": item.item_code[:-2]}),
+        ("po-status", "order", "GET", reverse("po-status", kwargs={"po_id": v["po_no"]}), None),
+        ("inspections-filter", "plant + parameter", "POST", reverse("inspections-filter"),
+         {"factoryId": plant.plant_id, "parameter": v["parameter"]}),
+        ("actual-inspection-readings", "In-process by PO", "GET", readings,
+         {"inspection_type": "In-process", "po_no": v["po_no"]}),
+        ("actual-inspection-readings", "all types, one item", "GET", readings,
+         {"inspection_type": "all", "item_code": item.item_code}),
+        ("actual-inspection-readings", "all types, page of 500", "GET", readings,
+         {"inspection_type": "all", "page_size": 500}),
+        ("actual-inspection-readings", "flat table, page of 500", "GET", readings,
+         {"inspection_type": "all", "page_size": 500, "source": "flat"}),
+        ("actual-inspection-readings", "NDJSON stream, one plant", "GET", readings,
+         {"inspection_type": "In-process", "plant_id": plant.plant_id, "stream": "true"}),
+        ("inspection-readings-export", "csv, one plant", "GET", export,
+         {"inspection_type": "In-process", "plant_id": plant.plant_id}),
+        ("parameters-series-and-stats", "one parameter", "GET", reverse("parameters-series-and-stats"), analytics),
+        ("parameters-series-and-stats", "rollups", "GET", reverse("parameters-series-and-stats"),
+         {**analytics, "source": "rollup"}),
+        ("parameters-distribution", "one item", "GET", reverse("parameters-distribution"),
+         {**analytics, "parameter": None, "operation": None}),
+        ("parameters-lsl-usl-distribution", "one parameter", "GET", reverse("parameters-lsl-usl-distribution"), analytics),
+        ("inspection-schedule-spc", "xbar-r", "GET", reverse("inspection-schedule-spc", kwargs={"schedule_id": schedule.pk}),
+         {"inspection_type": "In-process"}),
+        ("inspection-schedule-spc", "imr", "GET", reverse("inspection-schedule-spc", kwargs={"schedule_id": schedule.pk}),
+         {"inspection_type": "In-process", "chart": "imr"}),
+        # a write: every request adds one reading to the schedule
+        ("inspection-readings-bulk", "one reading", "POST", reverse("inspection-readings-bulk"), {
+            "inspection_type": "In-process",
+            "readings": [{
+                "schedule_id": schedule.pk, "po_no": v["po_no"],
+                "values": [{"r_key": str(n + 1), "r_value": schedule.target_value} for n in range(schedule.sample_size or 5)],
+            }],
+        }),
+    ]
+    if pyarrow is not None:
+        cases.append(("inspection-readings-export", "parquet, one plant", "GET", export,
+                      {"inspection_type": "In-process", "plant_id": plant.plant_id, "output": "parquet"}))
+    if v["planner"] is not None and v["planner"].section_id:
+        cases.append(("masterproductionplanner-by-factory-item", "section + item", "GET",
+                      reverse("masterproductionplanner-by-factory-item"),
+                      {"section": v["planner"].section_id, "item_id": item.pk}))
+    return [
+        (name, label, method, path, {k: val for k, val in data.items() if val is not None} if method == "GET" and data else data)
+        for name, label, method, path, data in cases
+    ]
+
+
+def route_names():
+    """Every named route in ``api/urls.py`` (format-suffix variants share their route's name)."""
+    from django.urls import URLResolver
+    from api import urls
+
+    names = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif pattern.name and pattern.name not in names:
+                names.append(pattern.name)
+    walk(urls.urlpatterns)
+    return names
+
+
+# ---------------------------------------------------------------------------
+# Measuring
+
+
+def perform(client, method, path, data):
+    """One request, with a streamed body read to the end; returns (status, body bytes)."""
+    if method == "GET":
+        response = client.get(path, data or {})
+    else:
+        response = client.post(path, json.dumps(data), content_type="application/json")
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+def measure(client, method, path, data, repeat):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    cache.clear()
+    with CaptureQueriesContext(connection) as captured:
+        start = time.perf_counter()
+        perform(client, method, path, data)
+        cold = time.perf_counter() - start
+    # counted at once: the log is cleared when the next request starts
+    cold_queries = len(captured)
+    perform(client, method, path, data)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        status, size = perform(client, method, path, data)
+        timings.append((time.perf_counter() - start) * 1000)
+    with CaptureQueriesContext(connection) as captured:
+        perform(client, method, path, data)
+    queries = len(captured)
+    tracemalloc.start()
+    perform(client, method, path, data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "status": status,
+        "bytes": size,
+        "cold_ms": round(cold * 1000, 3),
+        "p50_ms": round(percentiles[49], 3),
+        "p95_ms": round(percentiles[94], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": queries,
+        "cold_queries": cold_queries,
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+def row_counts():
+    from django.apps import apps
+
+    return {model._meta.db_table: model.objects.count() for model in apps.get_app_config("api").get_models()}
+
+
+def run_benchmark(scale, repeat):
+    """Measure every scenario against the current database; the result of one scale."""
+    from django.conf import settings
+    from django.db import connection, transaction
+    from django.test import Client
+
+    client = Client()
+    results = []
+    cases = scenarios()
+    for name, label, method, path, data in cases:
+        print(f"  {name} [{label}]", file=sys.stderr, flush=True)
+        if name in WRITE_ROUTES:
+            # rolled back, so the data set is the same for every run
+            with transaction.atomic():
+                result = measure(client, method, path, data, repeat)
+                transaction.set_rollback(True)
+        else:
+            result = measure(client, method, path, data, repeat)
+        results.append({"route": name, "scenario": label, "method": method, "path": path, **result})
+    covered = {name for name, *_ in cases}
+    return {
+        "scale": scale,
+        "database": connection.vendor,
+        "async_read_views": settings.ASYNC_READ_VIEWS,
+        "json_renderer": settings.API_JSON_RENDERER,
+        "rows": row_counts(),
+        "results": results,
+        "not_benchmarked": [name for name in route_names() if name not in covered],
+    }
+
+
+def run_scale(scale, args):
+    """Child process: build the scale's database if needed, then benchmark it."""
+    path = WORK_DIR / f"synthetic-{scale}.sqlite3"
+    if args.regenerate and path.exists():
+        path.unlink()
+    fresh = not path.exists()
+    setup_django(f"sqlite:///{path}", args.async_views)
+    from django.core.management import call_command
+
+    if fresh:
+        print(f"Generating the {scale} data set in {path}", file=sys.stderr, flush=True)
+        call_command("migrate", run_syncdb=True, verbosity=0)
+        call_command("generate_synthetic_data", scale=scale, refresh_reporting=True, stdout=sys.stderr)
+    return run_benchmark(scale, args.repeat)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+
+
+def print_run(run):
+    print(f"\n{run['scale']} ({run['database']}, "
+          f"{sum(n for table, n in run['rows'].items() if table.endswith('actualreading')):,} actual readings)")
+    header = (f"{'route':<42} {'scenario':<26} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'cold ms':>9} {'queries':>7} {'peak KiB':>9} {'bytes':>11}")
+    print(header)
+    print("-" * len(header))
+    for r in run["results"]:
+        print(f"{r['route']:<42} {r['scenario']:<26} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['cold_ms']:>9.2f} {r['queries']:>7} {r['peak_memory_kib']:>9.0f} {r['bytes']:>11,}")
+    if run["not_benchmarked"]:
+        print(f"Not benchmarked: {', '.join(run['not_benchmarked'])}")
+
+
+def compare(baseline, current, threshold):
+    """Print the change per scenario; returns the number of regressions."""
+    before = {
+        (run["scale"], r["route"], r["scenario"]): r
+        for run in baseline["runs"] for r in run["results"]
+    }
+    print(f"\nCompared with {(baseline.get('git') or {}).get('commit') or 'baseline'} (threshold {threshold:g}x)")
+    regressions = 0
+    for run in current["runs"]:
+        for r in run["results"]:
+            old = before.get((run["scale"], r["route"], r["scenario"]))
+            if old is None:
+                continue
+            slower = r["p95_ms"] > old["p95_ms"] * threshold and r["p95_ms"] - old["p95_ms"] > NOISE_MS
+            more_queries = r["queries"] > old["queries"]
+            flag = "REGRESSION" if slower or more_queries else ""
+            regressions += bool(flag)
+            print(f"{run['scale']:<8} {r['route']:<42} {r['scenario']:<26} "
+                  f"p95 {old['p95_ms']:>9.2f} -> {r['p95_ms']:>9.2f} ({r['p95_ms'] / (old['p95_ms'] or 1):>5.2f}x)  "
+                  f"queries {old['queries']:>3} -> {r['queries']:<3} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=list(DEFAULT_SCALES),
+                        help="generate_synthetic_data presets to benchmark (default: small medium).")
+    parser.add_argument("--current-db", action="store_true",
+                        help="Benchmark the configured database as it is instead of synthetic SQLite ones.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per scenario (default 20, at least 2).")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the synthetic databases first.")
+    parser.add_argument("--async-views", action="store_true", help="Route the chatbot read endpoints to the async views.")
+    parser.add_argument("--output", help="Results file (default .benchmarks/results/<time>-<commit>.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare with.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p95 ratio over the earlier run that counts as a regression (default 1.2).")
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.repeat < 2:
+        parser.error("--repeat must be at least 2")
+
+    if args.run_scale:
+        print(json.dumps(run_scale(args.run_scale, args)))
+        return
+
+    WORK_DIR.mkdir(exist_ok=True)
+    runs = []
+    if args.current_db:
+        setup_django(async_views=args.async_views)
+        runs.append(run_benchmark("current", args.repeat))
+    else:
+        for scale in args.scales:
+            print(f"Benchmarking {scale}", file=sys.stderr, flush=True)
+            command = [sys.executable, __file__, "--run-scale", scale, "--repeat", str(args.repeat)]
+            command += ["--regenerate"] * args.regenerate + ["--async-views"] * args.async_views
+            child = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+            if child.returncode:
+                sys.exit(child.returncode)
+            runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    git = git_state()
+    results = {
+        "schema": 1,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git,
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "runs": runs,
+    }
+    output = Path(args.output) if args.output else (
+        WORK_DIR / "results" / f"{datetime.now():%Y%m%d-%H%M%S}-{(git['commit'] or 'unknown')[:10]}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    for run in runs:
+        print_run(run)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), results, args.threshold)
+        if regressions:
+            print(f"{regressions} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Compare the chatbot read endpoints served by the WSGI (sync APIView) and the
+ASGI (async view) entry points under concurrent load.
+
+Start both servers against the same database, for example:
+
+    gunicorn qchat.wsgi:application -w 4 -b 127.0.0.1:8000
+    uvicorn qchat.asgi:application --workers 4 --port 8001
+
+then run:
+
+    python scripts/load_test_read_views.py --wsgi http://127.0.0.1:8000 --asgi http://127.0.0.1:8001
+
+Sample factory / PO values are taken from the API itself. Only the standard
+library is used, so the script can run from any machine that reaches the servers.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url, body=None, timeout=60):
+    """Perform one request; returns (status, seconds)."""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def discover(base):
+    """Pick a factory and a PO number that exist so every endpoint does real work."""
+    initial = get_json(f"{base}/api/initial-data/")
+    factory = initial["plants"][0]["plant_id"] if initial["plants"] else "P1"
+    planners = get_json(f"{base}/api/productionplanners/?page_size=1&fields=order_number")
+    po = planners["results"][0]["order_number"] if planners.get("results") else "PO1"
+    return factory, po
+
+
+def scenarios(factory, po, inspection_type):
+    return {
+        "initial-data": ("/api/initial-data/", None),
+        "factory-sections": (f"/api/factories/{factory}/sections/", None),
+        "po-status": (f"/api/purchase-orders/{po}/status/", None),
+        "inspections-filter": ("/api/inspections/filter/", {"factoryId": factory}),
+        "actual-readings": (f"/api/inspections/actual-readings/?inspection_type={inspection_type}&po_no={po}", None),
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(base, path, body, requests, concurrency):
+    """Fire ``requests`` requests with ``concurrency`` in flight; returns summary numbers."""
+    url = base + path
+    fetch(url, body)  # warm-up (connections, caches)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(url, body), range(requests)))
+    wall = time.perf_counter() - start
+    latencies = sorted(seconds for status, seconds in results if 200 <= status < 300)
+    return {
+        "rps": len(results) / wall if wall else 0.0,
+        "errors": sum(1 for status, _ in results if not 200 <= status < 300),
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "mean": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wsgi", default="http://127.0.0.1:8000", help="Base URL of the WSGI server.")
+    parser.add_argument("--asgi", default="http://127.0.0.1:8001", help="Base URL of the ASGI server.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and server (default 500).")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight (default 32).")
+    parser.add_argument("--inspection-type", default="all", help="inspection_type for actual-readings (default all).")
+    parser.add_argument("--only", nargs="*", help="Restrict to these scenario names.")
+    args = parser.parse_args()
+
+    factory, po = discover(args.wsgi)
+    print(f"Factory {factory}, PO {po}; {args.requests} requests per endpoint, concurrency {args.concurrency}\n")
+    header = f"{'endpoint':<20} {'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, (path, body) in scenarios(factory, po, args.inspection_type).items():
+        if args.only and name not in args.only:
+            continue
+        for server, base in (("wsgi", args.wsgi), ("asgi", args.asgi)):
+            r = run(base, path, body, args.requests, args.concurrency)
+            print(
+                f"{name:<20} {server:<6} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+                f"{r['p99']:>8.1f} {r['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -312,7 +312,7 @@ export default function ChatInterface() {
           setCurrentStep('inspection_select_item');
           const inspType = newSessionData.inspectionType as string | undefined;
           const itemType = inspType === 'Inward' ? 'RM' : (inspType === 'In-process' ? 'SFG' : undefined);
-          const dynItems = await actions.getItemCodesByFactorySection(String(newSessionData.inspection_select_factory), option.value, itemType as any);
+          const dynItems = await actions.getItemCodesByFactorySection(String(newSessionData.inspection_select_factory), option.value, itemType as any, inspType as any);
           console.log('[UI] fetching items', { factory: newSessionData.inspection_select_factory, section: option.value, inspectionType: inspType, itemType, resultCount: dynItems.length });
           addBotMessage("Select an item code:", dynItems, (opt) => handleInspectionDetails('inspection_select_item', opt));
           break;
@@ -320,7 +320,8 @@ export default function ChatInterface() {
           setCurrentStep('inspection_select_po');
           console.log('[UI] inspection_select_item', { newSessionData, option });
           console.log('[UI] initialData.purchaseOrders', initialData?.purchaseOrders);
-          const poOptions = (initialData?.purchaseOrders || []).filter((po: any) => po.factoryId === newSessionData.inspection_select_factory && po.itemCode === option.value).map((po: any) => ({ label: po.id, value: po.id }));
+          // Planners carry the item code text; the option's value is an item master or, for Final, an FAI item master id
+          const poOptions = (initialData?.purchaseOrders || []).filter((po: any) => po.factoryId === newSessionData.inspection_select_factory && po.itemCode === option.label).map((po: any) => ({ label: po.id, value: po.id }));
           console.log('[UI] poOptions', poOptions);
           addBotMessage("Finally, select a PO Number / Lot No.:", poOptions, (opt) => handleInspectionDetails('inspection_select_po', opt));
           break;
@@ -420,11 +421,11 @@ export default function ChatInterface() {
                   break;
                 }
 
-                const analysis = await actions.getParameterSeriesAndStats(factoryId, itemCode, operation, parameter, days);
-
-                switch (option.value) {
-                  case 'results_table': {
-                    const rows = analysis.readings.map((r) => [new Date(r.timestamp).toLocaleString(), r.value, analysis.stats.unit || '', r.operator, r.status]);
+                // Tables list individual readings; everything else only needs the server-side aggregates
+                if (['results_table', 'oos', 'operators'].includes(option.value)) {
+                  const { readings, oos } = await actions.getParameterReadings(factoryId, itemCode, operation, parameter, days);
+                  if (option.value === 'results_table') {
+                    const rows = readings.map((r) => [new Date(r.timestamp).toLocaleString(), r.value, r.unit, r.operator, r.status]);
                     addMessage('bot', (
                       <TableDisplay
                         title={`Readings for ${parameter}`}
@@ -432,8 +433,29 @@ export default function ChatInterface() {
                         rows={rows}
                       />
                     ));
-                    break;
+                  } else if (option.value === 'oos') {
+                    if (oos.length === 0) {
+                      addBotMessage('No readings fall outside the specification range.');
+                    } else {
+                      const rows = oos.map((r) => [new Date(r.timestamp).toLocaleString(), r.value, r.operator]);
+                      addMessage('bot', <TableDisplay title={`Out-of-spec Readings for ${parameter}`} headers={['Timestamp', 'Value', 'Operator']} rows={rows} />);
+                    }
+                  } else {
+                    const rows = readings.map((r) => [new Date(r.timestamp).toLocaleString(), r.operator, r.value]);
+                    addMessage('bot', <TableDisplay title={`Operators for ${parameter}`} headers={['Timestamp', 'Operator', 'Value']} rows={rows} />);
                   }
+                  showEnd();
+                  break;
+                }
+
+                const analysis = await actions.getParameterSeriesAndStats(factoryId, itemCode, operation, parameter, days);
+                if (!analysis) {
+                  addBotMessage(`No readings found for '${parameter}'.`);
+                  showEnd();
+                  break;
+                }
+
+                switch (option.value) {
                   case 'avg': {
                     const rows = [[ 'Average Reading', analysis.stats.avg ]];
                     addMessage('bot', <TableDisplay title={`Average for ${parameter}`} headers={['Metric', 'Value']} rows={rows} />);
@@ -444,20 +466,6 @@ export default function ChatInterface() {
                     addMessage('bot', <TableDisplay title={`Min/Max for ${parameter}`} headers={['Metric', 'Value']} rows={rows} />);
                     break;
                   }
-                  case 'oos': {
-                    if (analysis.oos.length === 0) {
-                      addBotMessage('No readings fall outside the specification range.');
-                    } else {
-                      const rows = analysis.oos.map((r) => [new Date(r.timestamp).toLocaleString(), r.value, r.operator]);
-                      addMessage('bot', <TableDisplay title={`Out-of-spec Readings for ${parameter}`} headers={['Timestamp', 'Value', 'Operator']} rows={rows} />);
-                    }
-                    break;
-                  }
-                  case 'operators': {
-                    const rows = analysis.readings.map((r) => [new Date(r.timestamp).toLocaleString(), r.operator, r.value]);
-                    addMessage('bot', <TableDisplay title={`Operators for ${parameter}`} headers={['Timestamp', 'Operator', 'Value']} rows={rows} />);
-                    break;
-                  }
                   case 'run_chart':
                   default: {
                     addMessage('bot', (
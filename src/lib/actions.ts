@@ -3,19 +3,40 @@ import type { Option } from './types';
 import { parseISO, isAfter, subDays, format } from 'date-fns';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000/api';
+// Largest page the API serves (the backend's API_MAX_PAGE_SIZE)
+const API_MAX_PAGE_SIZE = process.env.NEXT_PUBLIC_API_MAX_PAGE_SIZE || '1000';
+
+// DRF list endpoints are paginated; follow `next` links and collect every row
+async function fetchAllResults(url: string): Promise<any[]> {
+    // Ask for the largest pages, so a list costs as few round trips (and COUNT queries) as possible;
+    // the `next` links carry page_size along
+    const first = new URL(url);
+    if (!first.searchParams.has('page_size')) first.searchParams.set('page_size', API_MAX_PAGE_SIZE);
+    const rows: any[] = [];
+    let next: string | null = first.toString();
+    while (next) {
+        const res: Response = await fetch(next);
+        if (!res.ok) break;
+        const data = await res.json();
+        if (Array.isArray(data)) {
+            rows.push(...data);
+            break;
+        }
+        rows.push(...(data?.results ?? []));
+        next = data?.next ?? null;
+    }
+    return rows;
+}
 
 export async function getInitialData() {
     try {
-        const [factoriesRes, purchaseOrdersRes, itemCodesRes, parametersRes, operationsRes] = await Promise.all([
-            fetch(`${API_BASE_URL}/plants/`),
-            fetch(`${API_BASE_URL}/productionplanners/`),
-            fetch(`${API_BASE_URL}/itemmasters/`),
-            fetch(`${API_BASE_URL}/parameterlists/`),
-            fetch(`${API_BASE_URL}/operationmasters/`),
-        ]);
-
+        // Only request the columns mapped below
         const [factoriesJson, poJson, itemsJson, paramsJson, opsJson] = await Promise.all([
-            factoriesRes.json(), purchaseOrdersRes.json(), itemCodesRes.json(), parametersRes.json(), operationsRes.json()
+            fetchAllResults(`${API_BASE_URL}/plants/?fields=id,plant_id,plant_name`),
+            fetchAllResults(`${API_BASE_URL}/productionplanners/?fields=id,order_number,plant,item_code,status,section`),
+            fetchAllResults(`${API_BASE_URL}/itemmasters/?fields=id,plant,building,item_code`),
+            fetchAllResults(`${API_BASE_URL}/parameterlists/?fields=plant,item_code,inspection_parameter`),
+            fetchAllResults(`${API_BASE_URL}/operationmasters/?fields=plant,item_code,operation_name`),
         ]);
 
         console.log('[API] factories:', factoriesJson);
@@ -63,39 +84,55 @@ export async function getPurchaseOrderStatus(poId: string) {
     };
 }
 
+// The order-number lookup answers in sorted pages; while `has_more` is set, ask again after the last number
+async function fetchAllOrderNumbers(params: Record<string, string>): Promise<string[]> {
+  const orders: string[] = [];
+  let after = '';
+  while (true) {
+    const url = new URL(`${API_BASE_URL}/productionplanners/by-factory-item/`);
+    Object.entries(params).forEach(([key, value]) => url.searchParams.set(key, value));
+    if (after) url.searchParams.set('after', after);
+    const res = await fetch(url.toString());
+    if (!res.ok) break;
+    const data = await res.json();
+    const page: string[] = Array.isArray(data?.orders) ? data.orders : [];
+    orders.push(...page);
+    if (!data?.has_more || !page.length) break;
+    after = page[page.length - 1];
+  }
+  return orders;
+}
+
 export async function getPurchaseOrdersByFactory(factoryId: string) {
-  const res = await fetch(`${API_BASE_URL}/productionplanners/?plant=${encodeURIComponent(factoryId)}`);
-  if (!res.ok) return [] as { id: string }[];
-  const data = await res.json();
-  console.log('[API] productionplanners by plant', factoryId, data);
-  return (Array.isArray(data) ? data : []).map((po: any) => ({
-    id: String(po.order_number ?? po.id),
-  }));
+  // Order numbers only, instead of every planner row
+  const orders = await fetchAllOrderNumbers({ plant: factoryId });
+  console.log('[API] productionplanners by plant', factoryId, orders.length);
+  return orders.map((id: string) => ({ id }));
 }
 
 export async function getPurchaseOrdersByFactoryAndItem(sectionId: string, itemId: string) {
-  const url = new URL(`${API_BASE_URL}/productionplanners/by-factory-item/`);
-  url.searchParams.set('section', sectionId);
-  url.searchParams.set('item_id', itemId);
-  const res = await fetch(url.toString());
-  if (!res.ok) return [] as { label: string; value: string }[];
-  const data = await res.json();
-  const orders = Array.isArray(data?.orders) ? data.orders : [];
+  const orders = await fetchAllOrderNumbers({ section: sectionId, item_id: itemId });
   console.log('[API] productionplanners by section+item', { sectionId, itemId, count: orders.length });
   return orders.map((id: string) => ({ label: id, value: id }));
 }
 
 export async function getFactorySections(factoryId: number): Promise<Option[]> {
-  const sectionsRes = await fetch(`${API_BASE_URL}/buildingsectionlabs/?plant=${factoryId}`);
-  const sections = await sectionsRes.json();
+  const sections = await fetchAllResults(`${API_BASE_URL}/buildingsectionlabs/?plant=${factoryId}&fields=id,building_name`);
   console.log('[API] sections by plant', factoryId, sections);
   return sections.map((s: any) => ({ label: s.building_name, value: s.id.toString() }));
 }
 
-export async function getItemCodesByFactorySection(factoryId: string, sectionId: string, itemType?: 'RM' | 'SFG' | 'FG') {
+export async function getItemCodesByFactorySection(
+  factoryId: string,
+  sectionId: string,
+  itemType?: 'RM' | 'SFG' | 'FG',
+  inspectionType?: 'Inward' | 'In-process' | 'Final'
+) {
   const url = new URL(`${API_BASE_URL}/itemcodes/by-building/`);
   url.searchParams.set('building', sectionId);
   if (itemType) url.searchParams.set('item_type', itemType);
+  // Final inspections pick from the FAI item master
+  if (inspectionType) url.searchParams.set('inspection_type', inspectionType);
   const res = await fetch(url.toString());
   if (!res.ok) return [] as { label: string; value: string }[];
   const data = await res.json();
@@ -161,80 +198,62 @@ export async function getFilteredInspections(filters: {
   return Object.values(groupedBySchedule);
 }
 
-export async function getParameterAnalysis(factoryId: number, itemCode: string, operation: string, parameter: string) {
+// Run chart, spec and summary statistics of one parameter, aggregated server-side
+async function fetchSeriesAndStats(factoryId: number, itemCode: string, operation: string, parameter: string, days?: number) {
   const params = new URLSearchParams({
-    plant_id: factoryId.toString(),
-    item_code: itemCode,
-    operation: operation,
-    parameter_name: parameter,
+    factoryId: factoryId.toString(),
+    itemCode,
+    operation,
+    parameter,
   });
-  
-  // Fetch actual readings from all inspection types
-  const results = [];
-  for (const inspType of ['Inward', 'In-process', 'Final']) {
-    const typeParams = new URLSearchParams(params);
-    typeParams.set('inspection_type', inspType);
-    
-    try {
-      const res = await fetch(`${API_BASE_URL}/inspections/actual-readings/?${typeParams.toString()}`);
-      const data = await res.json();
-      if (data.readings) {
-        results.push(...data.readings);
-      }
-    } catch (e) {
-      console.error(`[API] Error fetching ${inspType} readings:`, e);
-    }
+  if (days) params.set('days', days.toString());
+  try {
+    const res = await fetch(`${API_BASE_URL}/parameters/series-and-stats/?${params.toString()}`);
+    if (!res.ok) return null;
+    return await res.json();
+  } catch (e) {
+    console.error('[API] Error fetching series and stats:', e);
+    return null;
   }
+}
 
-  if (results.length === 0) return null;
-
-  const relevantParams = results.map((r: any) => ({
-    value: r.r_value,  // Use actual r_value
-    unit: r.unit || '',
-    operator: r.operator,
-    lsl: r.lsl,
-    usl: r.usl,
-  }));
+export async function getParameterAnalysis(factoryId: number, itemCode: string, operation: string, parameter: string) {
+  const data = await fetchSeriesAndStats(factoryId, itemCode, operation, parameter);
+  if (!data) return null;
 
-  const values = relevantParams.map(p => p.value);
-  const min = Math.min(...values);
-  const max = Math.max(...values);
-  const avg = values.reduce((sum, v) => sum + v, 0) / values.length;
-  const unit = relevantParams[0].unit;
-  const { lsl, usl } = relevantParams[0];
-  
-  const outsideSpec = values.filter(v => (lsl !== undefined && v < lsl) || (usl !== undefined && v > usl));
+  const { stats } = data;
+  const unit = data.spec.unit || '';
 
   return {
-    'Average Reading': `${avg.toFixed(3)} ${unit}`,
-    'Min Reading': `${min.toFixed(3)} ${unit}`,
-    'Max Reading': `${max.toFixed(3)} ${unit}`,
-    'Readings Outside Spec': outsideSpec.length > 0 ? outsideSpec.join(', ') : 'None',
+    'Average Reading': `${stats.mean.toFixed(3)} ${unit}`,
+    'Min Reading': `${stats.min.toFixed(3)} ${unit}`,
+    'Max Reading': `${stats.max.toFixed(3)} ${unit}`,
+    'Readings Outside Spec': stats.out_of_spec > 0 ? String(stats.out_of_spec) : 'None',
   };
 }
 
 export async function getParameterDistribution(context: 'Inward' | 'In-process' | 'Final', factoryId: number, section: string, itemCode: string) {
     const params = new URLSearchParams({
-        inspection_type: context,
-        plant_id: factoryId.toString(),
-        building: section,
-        item_code: itemCode,
+        context,
+        factoryId: factoryId.toString(),
+        section,
+        itemCode,
     });
     
-    // Fetch actual readings
-    const res = await fetch(`${API_BASE_URL}/inspections/actual-readings/?${params.toString()}`);
+    // Distinct operations/parameters are aggregated server-side
+    const res = await fetch(`${API_BASE_URL}/parameters/distribution/?${params.toString()}`);
+    if (!res.ok) return null;
     const data = await res.json();
     
-    console.log('[API] parameter distribution actual readings:', data);
+    console.log('[API] parameter distribution:', data);
 
-    if (!data.readings || data.readings.length === 0) return null;
-
-    const operations = data.readings.map((r: any) => r.operation_name).filter(Boolean);
-    const parameters = data.readings.map((r: any) => r.parameter_name).filter(Boolean);
+    const operations = (data.operations || []).map((op: any) => op.operation_name);
+    const parameters = data.parameters || [];
+    if (operations.length === 0 && parameters.length === 0) return null;
 
     return {
-        'Operations': [...new Set(operations)].join(', '),
-        'Parameters': [...new Set(parameters)].join(', '),
+        'Operations': operations.join(', '),
+        'Parameters': parameters.join(', '),
     };
 }
 
@@ -245,155 +264,107 @@ export async function getParameterSeriesAndStats(
   parameter: string,
   days?: number
 ) {
-  const now = new Date();
-  const cutoff = days ? subDays(now, days) : null;
+  const data = await fetchSeriesAndStats(factoryId, itemCode, operation, parameter, days);
+  console.log('[API] parameter series and stats:', data?.stats, data?.downsample);
+  if (!data) return null;
 
-  const params = new URLSearchParams({
-    plant_id: factoryId.toString(),
-    item_code: itemCode,
-    operation: operation,
-    parameter_name: parameter,
-  });
-  
-  // Fetch actual readings from all inspection types
-  const results = [];
-  for (const inspType of ['Inward', 'In-process', 'Final']) {
-    const typeParams = new URLSearchParams(params);
-    typeParams.set('inspection_type', inspType);
-    
-    try {
-      const res = await fetch(`${API_BASE_URL}/inspections/actual-readings/?${typeParams.toString()}`);
-      const data = await res.json();
-      if (data.readings) {
-        results.push(...data.readings);
-      }
-    } catch (e) {
-      console.error(`[API] Error fetching ${inspType} readings:`, e);
-    }
-  }
-
-  console.log('[API] parameter series actual readings:', results.length);
-
-  let readings = results.map((r: any) => ({
-    name: r.parameter_name,
-    value: r.r_value,  // Use actual r_value
-    unit: r.unit || '',
-    operator: r.operator,
-    timestamp: r.timestamp,
-    lsl: r.lsl,
-    usl: r.usl,
-    target: r.target_value,
-  })).filter((p) => (cutoff ? isAfter(parseISO(p.timestamp), cutoff) : true))
-  .sort((a, b) => parseISO(a.timestamp).getTime() - parseISO(b.timestamp).getTime());
-
-  if (readings.length === 0) return null;
-
-  const values = readings.map((r) => r.value);
-  const min = Math.min(...values);
-  const max = Math.max(...values);
-  const avg = values.reduce((s, v) => s + v, 0) / values.length;
-  const unit = readings[0].unit;
-
-  const spec = {
-    lsl: readings[0].lsl,
-    usl: readings[0].usl,
-    target: readings[0].target,
-    unit,
-  };
+  const { stats } = data;
+  const unit = data.spec.unit || '';
 
-  const enriched = readings.map((r) => {
-    const isOOS = (spec.lsl !== undefined && r.value < spec.lsl) || (spec.usl !== undefined && r.value > spec.usl);
-    return {
-      timestamp: r.timestamp,
-      value: r.value,
-      unit: r.unit,
-      operator: r.operator,
-      status: isOOS ? 'OOS' : 'OK' as const,
-    };
-  });
-
-  const series = readings.map((r) => ({
-    label: format(parseISO(r.timestamp), 'dd MMM'),
-    value: r.value,
+  // Already downsampled to at most `points` entries
+  const series = (data.series || []).map((p: { timestamp: string; value: number }) => ({
+    label: format(parseISO(p.timestamp), 'dd MMM'),
+    value: p.value,
   }));
 
   return {
     series,
     stats: {
-      min: `${min.toFixed(3)} ${unit}`,
-      max: `${max.toFixed(3)} ${unit}`,
-      avg: `${avg.toFixed(3)} ${unit}`,
-      count: readings.length,
+      min: `${stats.min.toFixed(3)} ${unit}`,
+      max: `${stats.max.toFixed(3)} ${unit}`,
+      avg: `${stats.mean.toFixed(3)} ${unit}`,
+      count: stats.count,
+      outOfSpec: stats.out_of_spec,
+      unit,
+    },
+    spec: {
+      lsl: data.spec.lsl,
+      usl: data.spec.usl,
+      target: data.spec.target,
       unit,
     },
-    spec,
-    readings: enriched,
-    oos: enriched.filter((e) => e.status === 'OOS'),
   };
 }
 
-export async function getLSLUSLDistribution(
+// Individual readings with their operator, for the tables that list readings one by one
+export async function getParameterReadings(
   factoryId: number,
   itemCode: string,
   operation: string,
   parameter: string,
   days?: number
 ) {
-  const analysis = await getParameterSeriesAndStats(factoryId, itemCode, operation, parameter, days);
-  if (!analysis) return null;
-
-  // derive LSL/USL if missing
-  let lsl = analysis.spec.lsl;
-  let usl = analysis.spec.usl;
-  if (lsl === undefined || usl === undefined || usl === lsl) {
-    const vals = (analysis.readings || []).map((r) => r.value);
-    if (vals.length > 0) {
-      const min = Math.min(...vals);
-      const max = Math.max(...vals);
-      if (min !== max) {
-        lsl = min;
-        usl = max;
-      } else {
-        lsl = min;
-        usl = min + 1; // ensure span
-      }
-    } else {
-      lsl = 0; usl = 1;
+  const cutoff = days ? subDays(new Date(), days) : null;
+
+  const params = new URLSearchParams({
+    plant_id: factoryId.toString(),
+    item_code: itemCode,
+    operation: operation,
+    parameter_name: parameter,
+    inspection_type: 'all',
+  });
+  const results = [];
+  try {
+    const res = await fetch(`${API_BASE_URL}/inspections/actual-readings/?${params.toString()}`);
+    const data = await res.json();
+    if (data.readings) {
+      results.push(...data.readings);
     }
+  } catch (e) {
+    console.error('[API] Error fetching readings:', e);
   }
 
-  const labels = ['<LSL', '0-20%', '20-40%', '40-60%', '60-80%', '80-100%', '>USL'] as const;
-  const counts: Record<(typeof labels)[number], number> = {
-    '<LSL': 0,
-    '0-20%': 0,
-    '20-40%': 0,
-    '40-60%': 0,
-    '60-80%': 0,
-    '80-100%': 0,
-    '>USL': 0,
+  // Rows of several inspection types come back merged in time order
+  const readings = results
+    .filter((r: any) => (cutoff ? isAfter(parseISO(r.timestamp), cutoff) : true))
+    .map((r: any) => {
+      const isOOS = (r.lsl != null && r.r_value < r.lsl) || (r.usl != null && r.r_value > r.usl);
+      return {
+        timestamp: r.timestamp,
+        value: r.r_value,
+        unit: r.unit || '',
+        operator: r.operator,
+        status: isOOS ? 'OOS' : 'OK' as const,
+      };
+    });
+
+  return {
+    readings,
+    oos: readings.filter((r) => r.status === 'OOS'),
   };
+}
 
-  const span = (usl! - lsl!);
-  (analysis.readings || []).forEach((r) => {
-    if (lsl !== undefined && r.value < lsl) {
-      counts['<LSL'] += 1;
-      return;
-    }
-    if (usl !== undefined && r.value > usl) {
-      counts['>USL'] += 1;
-      return;
-    }
-    if (lsl === undefined || usl === undefined || span <= 0) {
-      // cannot bucket without a valid range
-      return;
-    }
-    const ratio = (r.value - lsl) / span; // 0..1 inclusive
-    const idx = Math.min(4, Math.max(0, Math.floor(ratio * 5))); // 5 in-spec buckets
-    const bucket = labels[idx + 1];
-    counts[bucket] += 1;
+export async function getLSLUSLDistribution(
+  factoryId: number,
+  itemCode: string,
+  operation: string,
+  parameter: string,
+  days?: number
+) {
+  const params = new URLSearchParams({
+    factoryId: factoryId.toString(),
+    itemCode,
+    operation,
+    parameter,
   });
+  if (days) params.set('days', days.toString());
+
+  // Readings are bucketed against LSL/USL server-side (falling back to the observed range)
+  const res = await fetch(`${API_BASE_URL}/parameters/lsl-usl-distribution/?${params.toString()}`);
+  if (!res.ok) return null;
+  const dist = await res.json();
 
-  const data = labels.map((lab) => ({ value: lab, count: counts[lab] }));
+  const data = (dist.buckets || []).map((b: { label: string; count: number }) => ({ value: b.label, count: b.count }));
 
   return {
     data,